@@ -37,6 +37,7 @@ async def make_admin_command(message: Message, command: CommandObject):
                 ('admin', target_user_id)
             )
             conn.commit()
+            db.invalidate_user_context(target_user_id)
             
             if cursor.rowcount == 0:
                 await message.answer(f"❌ Пользователь с ID {target_user_id} не найден")
@@ -74,6 +75,7 @@ async def make_user_command(message: Message, command: CommandObject):
                 ('user', target_user_id)  # Или 'student', 'tutor' - в зависимости от вашей системы
             )
             conn.commit()
+            db.invalidate_user_context(target_user_id)
             
             if cursor.rowcount == 0:
                 await message.answer(f"❌ Пользователь с ID {target_user_id} не найден")
@@ -11,6 +11,9 @@ import zipfile
 import asyncio
 import subprocess
 import tempfile
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = Router()
 
@@ -93,7 +96,7 @@ async def create_backup(message: Message, backup_type: str = "full"):
         
     except Exception as e:
         await message.answer(f"❌ Ошибка при создании резервной копии: {e}")
-        print(f"Ошибка создания бэкапа: {e}")
+        logger.error(f"Ошибка создания бэкапа: {e}")
 
 async def backup_database_only(temp_dir: Path, message: Message) -> bool:
     """Бэкап только базы данных с использованием SQLite backup API"""
@@ -198,7 +201,7 @@ async def create_sql_dump(db_path: Path, temp_dir: Path):
                     f.write(f'{line}\n')
                     
     except Exception as e:
-        print(f"Ошибка создания SQL дампа: {e}")
+        logger.error(f"Ошибка создания SQL дампа: {e}")
 
 async def create_zip_archive(source_dir: Path, zip_path: Path, message: Message):
     """Создает ZIP архив из папки"""
@@ -257,10 +260,10 @@ async def cleanup_old_backups(backup_dir: Path, keep_last: int = 10):
             
             for old_file in backup_files[keep_last:]:
                 old_file.unlink()
-                print(f"Удален старый бэкап: {old_file.name}")
+                logger.info(f"Удален старый бэкап: {old_file.name}")
                 
     except Exception as e:
-        print(f"Ошибка при очистке старых бэкапов: {e}")
+        logger.error(f"Ошибка при очистке старых бэкапов: {e}")
 
 # Команда для проверки состояния базы данных
 @router.message(Command("db_status"))
@@ -4,6 +4,9 @@ from aiogram.types import Message
 from database import db
 
 from commands.config import SUPER_ADMIN_ID
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = Router()
 
@@ -79,4 +82,4 @@ async def get_last_registered_users(message: Message):
             
     except Exception as e:
         await message.answer(f"❌ Ошибка при получении списка пользователей: {e}")
-        print(f"Ошибка: {e}")
\ No newline at end of file
+        logger.error(f"Ошибка: {e}")
\ No newline at end of file
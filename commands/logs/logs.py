@@ -2,11 +2,22 @@ from aiogram import Router, types
 from aiogram.filters import Command
 from aiogram.types import Message
 from commands.config import SUPER_ADMIN_ID
-import os
+import asyncio
+import gzip
+import re
+from collections import deque
 from pathlib import Path
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = Router()
 
+LOG_FILE = Path("logs/bot.log")
+READ_BLOCK_SIZE = 64 * 1024      # размер блока при чтении файла с конца
+SEARCH_RESULTS_LIMIT = 20        # сколько последних совпадений показывать
+LOG_ENCODINGS = ('utf-8', 'cp1251', 'latin-1')
+
 @router.message(Command("logs"))
 async def admin_view_logs(message: Message):
     # Проверяем, является ли пользователь суперадмином
@@ -38,7 +49,7 @@ async def admin_view_logs(message: Message):
 async def send_logs(message: Message, lines_count: int):
     """Отправить последние N строк логов"""
     try:
-        log_file_path = Path("logs/bot.log")
+        log_file_path = LOG_FILE
         
         # Проверяем существование файла логов
         if not log_file_path.exists():
@@ -51,8 +62,8 @@ async def send_logs(message: Message, lines_count: int):
             await message.answer("📝 Файл логов пуст")
             return
         
-        # Читаем последние N строк из файла
-        logs_content = read_last_lines(log_file_path, lines_count)
+        # Читаем последние N строк из файла (в потоке, не блокируя обработку апдейтов)
+        logs_content = await asyncio.to_thread(read_last_lines, log_file_path, lines_count)
         
         if not logs_content:
             await message.answer("📝 Логи не найдены или файл пуст")
@@ -63,29 +74,77 @@ async def send_logs(message: Message, lines_count: int):
         
     except Exception as e:
         await message.answer(f"❌ Ошибка при чтении логов: {e}")
-        print(f"Ошибка чтения логов: {e}")
+        logger.error(f"Ошибка чтения логов: {e}")
 
 def read_last_lines(file_path: Path, n: int) -> str:
-    """Читает последние N строк из файла"""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            # Читаем все строки и берем последние N
-            lines = file.readlines()
-            last_lines = lines[-n:] if len(lines) > n else lines
-            return ''.join(last_lines)
-    except UnicodeDecodeError:
-        # Пробуем читать в бинарном режиме для файлов с другой кодировкой
-        with open(file_path, 'rb') as file:
-            lines = file.readlines()
-            last_lines = lines[-n:] if len(lines) > n else lines
-            # Пробуем декодировать с разными кодировками
-            for encoding in ['utf-8', 'cp1251', 'latin-1']:
-                try:
-                    decoded_lines = [line.decode(encoding) for line in last_lines]
-                    return ''.join(decoded_lines)
-                except UnicodeDecodeError:
-                    continue
-            return "❌ Не удалось декодировать файл логов"
+    """Читает последние N строк из файла, двигаясь блоками от конца.
+
+    Читается только хвост файла, поэтому память не зависит от размера лога.
+    """
+    with open(file_path, 'rb') as file:
+        file.seek(0, 2)
+        position = file.tell()
+        blocks = []
+        newlines = 0
+        # Последняя строка может не заканчиваться переводом строки - нужна N+1 граница
+        while position > 0 and newlines <= n:
+            size = min(READ_BLOCK_SIZE, position)
+            position -= size
+            file.seek(position)
+            block = file.read(size)
+            blocks.append(block)
+            newlines += block.count(b'\n')
+
+    data = b''.join(reversed(blocks))
+    last_lines = data.splitlines(keepends=True)[-n:]
+    # Пробуем декодировать с разными кодировками
+    for encoding in LOG_ENCODINGS:
+        try:
+            return b''.join(last_lines).decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return "❌ Не удалось декодировать файл логов"
+
+def get_log_files(log_file: Path = LOG_FILE) -> list:
+    """Возвращает файлы лога от самого старого к текущему: bot.log.5[.gz] ... bot.log.1[.gz], bot.log"""
+    pattern = re.compile(re.escape(log_file.name) + r'\.(\d+)(\.gz)?$')
+    rotated = []
+    if log_file.parent.exists():
+        for path in log_file.parent.iterdir():
+            match = pattern.match(path.name)
+            if match:
+                rotated.append((int(match.group(1)), path))
+    files = [path for _, path in sorted(rotated, key=lambda item: item[0], reverse=True)]
+    if log_file.exists():
+        files.append(log_file)
+    return files
+
+def _open_log(path: Path):
+    """Открывает файл лога на чтение построчно, сжатые ротации - через gzip"""
+    if path.suffix == '.gz':
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, 'r', encoding='utf-8', errors='replace')
+
+def search_logs(search_text: str, log_file: Path = LOG_FILE, limit: int = SEARCH_RESULTS_LIMIT):
+    """Ищет текст во всех файлах лога, возвращает (последние limit совпадений, всего совпадений).
+
+    Файлы читаются потоком, а совпадения хранятся в кольцевом буфере,
+    поэтому память не зависит ни от размера логов, ни от числа совпадений.
+    """
+    needle = search_text.lower()
+    found_lines = deque(maxlen=limit)
+    total = 0
+    for path in get_log_files(log_file):
+        try:
+            with _open_log(path) as file:
+                for line in file:
+                    if needle in line.lower():
+                        found_lines.append(line)
+                        total += 1
+        except (OSError, EOFError) as e:
+            # Файл мог уйти в ротацию во время поиска или быть недописанным архивом
+            logger.warning(f"Не удалось прочитать {path}: {e}")
+    return list(found_lines), total
 
 async def send_logs_in_parts(message: Message, logs_content: str, total_lines: int):
     """Отправляет логи частями с учетом ограничений Telegram"""
@@ -141,28 +200,20 @@ async def admin_search_logs(message: Message):
 async def search_in_logs(message: Message, search_text: str):
     """Поиск текста в логах"""
     try:
-        log_file_path = Path("logs/bot.log")
-        
-        if not log_file_path.exists():
+        if not get_log_files():
             await message.answer("❌ Файл логов не найден: logs/bot.log")
             return
         
-        # Читаем файл и ищем совпадения
-        found_lines = []
-        with open(log_file_path, 'r', encoding='utf-8') as file:
-            for line in file:
-                if search_text.lower() in line.lower():
-                    found_lines.append(line)
+        # Ищем по текущему логу и его ротациям в потоке
+        result_lines, total = await asyncio.to_thread(search_logs, search_text)
         
-        if not found_lines:
+        if not result_lines:
             await message.answer(f"🔍 По запросу '{search_text}' ничего не найдено")
             return
         
-        # Берем последние 20 найденных строк
-        result_lines = found_lines[-20:] if len(found_lines) > 20 else found_lines
         result_content = ''.join(result_lines)
         
-        header = f"🔍 Результаты поиска '{search_text}' (последние {len(result_lines)} из {len(found_lines)}):\n\n"
+        header = f"🔍 Результаты поиска '{search_text}' (последние {len(result_lines)} из {total}):\n\n"
         
         if len(header + result_content) > 4000:
             result_content = result_content[-3500:]  # Обрезаем если слишком длинное
@@ -182,7 +233,7 @@ async def admin_logs_info(message: Message):
         return
     
     try:
-        log_file_path = Path("logs/bot.log")
+        log_file_path = LOG_FILE
         
         if not log_file_path.exists():
             await message.answer("❌ Файл логов не найден: logs/bot.log")
@@ -7,6 +7,7 @@ from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from database import db
+from send_queue import send_queue
 
 from commands.config import SUPER_ADMIN_ID
 
@@ -218,34 +219,35 @@ async def confirm_broadcast(message: Message, state: FSMContext, bot: Bot):
         tutors = cursor.fetchall()
     
     total_tutors = len(tutors)
-    successful_sends = 0
-    failed_sends = 0
+    tutor_names = {telegram_id: full_name for telegram_id, full_name in tutors}
+    text = f"📢 <b>Сообщение от администратора:</b>\n\n{broadcast_message}"
     
-    # Отправляем сообщение каждому репетитору
+    # Отправляем сообщение каждому репетитору через общую очередь с лимитами Telegram
     progress_message = await message.answer(f"🔄 Начинаю рассылку для {total_tutors} репетиторов...")
     
-    for i, tutor in enumerate(tutors, 1):
-        telegram_id, full_name = tutor
-        
-        try:
-            await bot.send_message(
-                chat_id=telegram_id,
-                text=f"📢 <b>Сообщение от администратора:</b>\n\n{broadcast_message}",
-                parse_mode="HTML",
-                reply_markup=reply_markup
-            )
-            successful_sends += 1
-            
-            # Обновляем прогресс каждые 10 отправок
-            if i % 10 == 0:
-                await progress_message.edit_text(
-                    f"🔄 Рассылка в процессе...\n"
-                    f"✅ Отправлено: {i}/{total_tutors}"
-                )
-            
-        except Exception as e:
-            logger.error(f"Ошибка отправки сообщения репетитору {full_name} (ID: {telegram_id}): {e}")
-            failed_sends += 1
+    async def deliver(telegram_id):
+        await send_queue.call(telegram_id, lambda: bot.send_message(
+            chat_id=telegram_id,
+            text=text,
+            parse_mode="HTML",
+            reply_markup=reply_markup
+        ))
+    
+    async def show_progress(done, total, sent, failed):
+        status = "🔄 Рассылка в процессе..." if done < total else "🏁 Рассылка завершена"
+        await progress_message.edit_text(
+            f"{status}\n"
+            f"✅ Отправлено: {sent}/{total}\n"
+            f"❌ Ошибок: {failed}"
+        )
+    
+    successful_sends, failed = await send_queue.send_many(
+        tutor_names.keys(), deliver, on_progress=show_progress
+    )
+    failed_sends = len(failed)
+    
+    for telegram_id, error in failed.items():
+        logger.error(f"Ошибка отправки сообщения репетитору {tutor_names[telegram_id]} (ID: {telegram_id}): {error}")
     
     # Формируем отчет о рассылке
     button_report = ""
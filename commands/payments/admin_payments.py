@@ -5,6 +5,9 @@ from database import db
 
 from datetime import datetime
 from commands.config import SUPER_ADMIN_ID
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = Router()
 
@@ -165,7 +168,7 @@ async def show_all_payments(message: Message, month: str, year: str):
             
     except Exception as e:
         await message.answer(f"❌ Ошибка при получении списка платежей: {e}")
-        print(f"Ошибка: {e}")
+        logger.error(f"Ошибка: {e}")
 
 # Дополнительная команда для быстрой статистики
 @router.message(Command("payments_stats"))
@@ -4,6 +4,9 @@ from aiogram.types import Message
 from database import db
 
 from commands.config import SUPER_ADMIN_ID
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = Router()
 
@@ -146,4 +149,4 @@ async def admin_referral_info(message: Message):
             
     except Exception as e:
         await message.answer(f"❌ Ошибка при проверке рефералов: {e}")
-        print(f"Ошибка: {e}")
+        logger.error(f"Ошибка: {e}")
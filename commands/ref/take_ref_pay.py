@@ -5,6 +5,9 @@ from database import db
 
 from datetime import datetime
 from commands.config import SUPER_ADMIN_ID
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = Router()
 
@@ -157,4 +160,4 @@ async def show_paid_referrals(message: Message, telegram_id: str, month: str, ye
             
     except Exception as e:
         await message.answer(f"❌ Ошибка при проверке оплаченных рефералов: {e}")
-        print(f"Ошибка: {e}")
\ No newline at end of file
+        logger.error(f"Ошибка: {e}")
\ No newline at end of file
@@ -1,358 +1,356 @@
 import sqlite3
+import asyncio
+import functools
+import json
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 import uuid
+from collections import OrderedDict
 from datetime import date, datetime, timedelta
 
+from migrations import LATEST_VERSION, get_schema_version, migrate, rebuild_rollups
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Параметры пула соединений
+POOL_SIZE = 8            # максимум одновременно открытых соединений
+POOL_TIMEOUT = 30        # секунд ожидания свободного соединения
+BUSY_TIMEOUT_MS = 5000   # ожидание снятия блокировки записи
+DB_EXECUTOR_WORKERS = 4  # потоков для асинхронного фасада (меньше POOL_SIZE)
+USER_CONTEXT_CACHE_SIZE = 5000  # пользователей в LRU-кэше контекста
+
+# PRAGMA, применяемые один раз при открытии соединения
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA cache_size = -16000',      # ~16 MB страничного кэша
+    'PRAGMA mmap_size = 134217728',    # 128 MB memory-mapped I/O
+    'PRAGMA temp_store = MEMORY',
+    f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}',
+)
+
+
+class PooledConnection(sqlite3.Connection):
+    """Соединение из пула: выход из with и close() возвращают его в пул"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            # Стандартное поведение sqlite3: commit или rollback
+            return super().__exit__(exc_type, exc_value, traceback)
+        finally:
+            self.close()
+
+    def close(self):
+        """Возвращает соединение в пул (или закрывает, если пула нет)"""
+        if self.pool is None:
+            super().close()
+        else:
+            self.pool.release(self)
+
+    def close_raw(self):
+        """Физически закрывает соединение"""
+        super().close()
+
+
+class ConnectionPool:
+    """Ограниченный пул долгоживущих соединений SQLite.
+
+    Соединение закрепляется за потоком на время использования: вложенные
+    get_connection() в одном потоке получают то же соединение, а после
+    выхода из внешнего with оно возвращается в пул.
+    """
+
+    def __init__(self, db_name: str, size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        self.db_name = db_name
+        self.size = size
+        self.timeout = timeout
+        self._idle = []
+        self._created = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._local = threading.local()
+
+    def _connect(self) -> PooledConnection:
+        """Открывает новое соединение и применяет PRAGMA"""
+        conn = sqlite3.connect(
+            self.db_name,
+            factory=PooledConnection,
+            check_same_thread=False,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+        )
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        conn.row_factory = sqlite3.Row
+        conn.pool = self
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        """Выдает соединение текущему потоку"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.depth += 1
+            return conn
+
+        with self._cond:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Пул соединений закрыт")
+            while not self._idle and self._created >= self.size:
+                if not self._cond.wait(self.timeout):
+                    raise sqlite3.OperationalError("Нет свободных соединений в пуле")
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                conn = None
+                self._created += 1
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._created -= 1
+                    self._cond.notify()
+                raise
+
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn: PooledConnection):
+        """Возвращает соединение в пул после выхода из внешнего with"""
+        if getattr(self._local, 'conn', None) is not conn:
+            return
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+        self._local.conn = None
+
+        # Сбрасываем состояние, которое методы могли поменять
+        conn.row_factory = sqlite3.Row
+        if conn.in_transaction:
+            conn.rollback()
+
+        with self._cond:
+            if self._closed:
+                self._created -= 1
+                conn.close_raw()
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    def close_all(self):
+        """Закрывает все свободные соединения; занятые закроются при возврате"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                self._idle.pop().close_raw()
+                self._created -= 1
+            self._cond.notify_all()
+        logger.info("Пул соединений с БД закрыт")
+
+
+class AsyncDatabase:
+    """Асинхронный фасад над Database: методы выполняются в отдельном пуле потоков.
+
+    Пример: lessons = await db.a.get_upcoming_lessons(tutor_id)
+    Произвольную синхронную функцию с запросами можно выполнить через
+    await db.a.run(func, *args).
+    """
+
+    def __init__(self, database, max_workers: int = DB_EXECUTOR_WORKERS):
+        self._db = database
+        self._max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Пул потоков создается при первом обращении"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self._max_workers,
+                        thread_name_prefix='db'
+                    )
+        return self._executor
+
+    async def run(self, func, *args, **kwargs):
+        """Выполняет синхронную функцию в пуле потоков БД"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    def __getattr__(self, name):
+        attr = getattr(self._db, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def wrapper(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+
+        return wrapper
+
+    def shutdown(self):
+        """Дожидается завершения запросов и останавливает пул потоков"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+class UserContextCache:
+    """Ограниченный LRU-кэш контекстов пользователей: telegram_id -> dict"""
+
+    def __init__(self, max_size: int = USER_CONTEXT_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, telegram_id):
+        with self._lock:
+            context = self._entries.get(telegram_id)
+            if context is not None:
+                self._entries.move_to_end(telegram_id)
+            return context
+
+    def set(self, telegram_id, context: dict):
+        with self._lock:
+            self._entries[telegram_id] = context
+            self._entries.move_to_end(telegram_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, telegram_id=None):
+        """Сбрасывает запись пользователя (None - весь кэш)"""
+        with self._lock:
+            if telegram_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(telegram_id, None)
+
+
 class Database:
+    # Файлы БД, для которых схема уже создана в этом процессе
+    _initialized_schemas = set()
+    _schema_lock = threading.Lock()
+
     def __init__(self, db_name='tutor_bot.db'):
         self.db_name = db_name
-        self.init_db()
+        self.pool = ConnectionPool(db_name)
+        self.a = AsyncDatabase(self)
         self.logger = logging.getLogger(__name__)
+        # Подписчики на изменения занятий (например, LessonTimer)
+        self._lesson_listeners = []
+        # Роль и идентификаторы пользователей (см. get_user_context)
+        self.user_contexts = UserContextCache()
 
     def get_connection(self):
-        """Создает и возвращает соединение с базой данных"""
-        conn = sqlite3.connect(self.db_name)
-        conn.row_factory = sqlite3.Row  # Для работы с dict-like строками
-        
-        return conn
+        """Возвращает соединение из пула (with или close() возвращают его обратно)"""
+        if self.db_name not in Database._initialized_schemas:
+            self.ensure_schema()
+        return self.pool.acquire()
+
+    def ensure_schema(self):
+        """Создает схему БД один раз за время жизни процесса"""
+        with Database._schema_lock:
+            if self.db_name in Database._initialized_schemas:
+                return
+            self.init_db()
+            Database._initialized_schemas.add(self.db_name)
+
+    def close(self):
+        """Останавливает асинхронный фасад и закрывает пул соединений"""
+        self.a.shutdown()
+        self.pool.close_all()
+
+    def add_lesson_listener(self, callback):
+        """Подписывает callback(lesson_ids) на добавление и перенос занятий"""
+        if callback not in self._lesson_listeners:
+            self._lesson_listeners.append(callback)
+
+    def remove_lesson_listener(self, callback):
+        """Отписывает callback от изменений занятий"""
+        if callback in self._lesson_listeners:
+            self._lesson_listeners.remove(callback)
+
+    def notify_lessons_changed(self, lesson_ids=None):
+        """Сообщает подписчикам об изменении занятий (None - изменения не перечислены)"""
+        for callback in list(self._lesson_listeners):
+            try:
+                callback(lesson_ids)
+            except Exception as e:
+                logger.error(f"Ошибка в подписчике изменений занятий: {e}")
 
-    def init_db(self):
-        """Инициализирует базу данных и создает таблицы"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # соглашение о конфиденциальности и соглашение пользователя
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_consents (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                telegram_id INTEGER NOT NULL,
-                ip_address TEXT NOT NULL,
-                document_type VARCHAR(50) NOT NULL,
-                document_version VARCHAR(20) NOT NULL,
-                accepted BOOLEAN NOT NULL DEFAULT FALSE,
-                accepted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (telegram_id) REFERENCES tutors (telegram_id)
-            )
-            ''')
+    def get_user_context(self, telegram_id) -> dict:
+        """Возвращает контекст пользователя: роль и его id в таблицах бота.
 
+        {'telegram_id', 'role' ('tutor'/'student'/'parent'/None), 'user_role',
+        'tutor_id', 'student_id', 'parent_student_ids'}. Результат кэшируется
+        в user_contexts и сбрасывается методами, меняющими эти данные.
+        Возвращаемый словарь общий для всех вызовов - не изменяйте его.
+        """
+        context = self.user_contexts.get(telegram_id)
+        if context is not None:
+            return context
 
-            # Таблица пользователей (репетиторов)
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tutors (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                telegram_id INTEGER UNIQUE,
-                full_name TEXT NOT NULL,
-                phone TEXT NOT NULL,
-                promo_code TEXT DEFAULT '0',
-                registration_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status TEXT DEFAULT 'active',
-                user_role TEXT DEFAULT 'user'
-            )
-            ''')
-            
-            # Таблица учеников
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS students (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                full_name TEXT NOT NULL,
-                phone TEXT,
-                parent_phone TEXT,
-                status TEXT DEFAULT 'active',
-                tutor_id INTEGER,
-                registration_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                student_telegram_id INTEGER,
-                parent_telegram_id INTEGER,
-                student_token TEXT UNIQUE,
-                parent_token TEXT UNIQUE,
-                delete_after TIMESTAMP,
-                student_username TEXT,
-                parent_username TEXT,
-                timezone TEXT DEFAULT 'Europe/Moscow',
-                notification_time TEXT DEFAULT '09:00',
-                notification_enabled BOOLEAN DEFAULT TRUE,
-                FOREIGN KEY (tutor_id) REFERENCES tutors (id)
-            )
-            ''')
-                    # НОВАЯ таблица основных учеников (уникальные студенты)
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS main_students (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                full_name TEXT NOT NULL,
-                phone TEXT,
-                parent_phone TEXT,
-                student_telegram_id INTEGER UNIQUE,
-                parent_telegram_id INTEGER UNIQUE,
-                student_username TEXT,
-                parent_username TEXT,
-                timezone TEXT DEFAULT 'Europe/Moscow',
-                notification_time TEXT DEFAULT '09:00',
-                notification_enabled BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            ''')
-                    # таблица родителей
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS main_parents (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                full_name TEXT NOT NULL,
-                phone TEXT,
-                parent_telegram_id INTEGER UNIQUE,
-                parent_username TEXT,
-                timezone TEXT DEFAULT 'Europe/Moscow',
-                notification_time TEXT DEFAULT '09:00',
-                notification_enabled BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            ''')
-            # Таблица занятий
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS lessons (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                tutor_id INTEGER,
-                student_id INTEGER,
-                lesson_date TIMESTAMP,
-                duration INTEGER,
-                price REAL,
-                status TEXT DEFAULT 'planned',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (tutor_id) REFERENCES tutors (id),
-                FOREIGN KEY (student_id) REFERENCES students (id)
-            )
-            ''')
-            # Для существующих таблиц - добавляем поле если его нет
-            try:
-                cursor.execute('ALTER TABLE lessons ADD COLUMN reminder_sent INTEGER DEFAULT 0')
-            except sqlite3.OperationalError:
-                # Поле уже существует - игнорируем ошибку
-                pass
-            # НЕ УДАЛЯТЬ!!! этот метод нужен для создания столбца и индекса для планера, если БД удаляешь,
-            # то он создает дополнительные столбцы
-            # # Сначала добавляем столбец
-            # try:
-            #     cursor.execute('ALTER TABLE lessons ADD COLUMN planner_action_id INTEGER')
-            #     print("✅ Столбец planner_action_id добавлен")
-            # except sqlite3.OperationalError as e:
-            #     print(f"❌ Ошибка добавления столбца: {e}")
-            #     # Поле уже существует - игнорируем ошибку
-            #     pass
-
-            # # Потом создаем индекс
-            # try:
-            #     cursor.execute('CREATE INDEX idx_lessons_planner ON lessons(planner_action_id, lesson_date)')
-            #     print("✅ Индекс создан")
-            # except sqlite3.OperationalError as e:
-            #     print(f"❌ Ошибка создания индекса: {e}")
-            #     pass
-
-            # Таблица подтверждений занятий
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS lesson_confirmations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                lesson_id INTEGER NOT NULL,
-                student_id INTEGER NOT NULL,
-                confirmed BOOLEAN,
-                confirmed_at TIMESTAMP,
-                notified_at TIMESTAMP,
-                FOREIGN KEY (lesson_id) REFERENCES lessons (id),
-                FOREIGN KEY (student_id) REFERENCES students (id)
-            )
-            ''')
-            
-            # Таблица промокодов
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS promo_codes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                code TEXT UNIQUE NOT NULL,
-                discount_percent INTEGER DEFAULT 0,
-                discount_amount REAL DEFAULT 0,
-                valid_until TIMESTAMP,
-                usage_limit INTEGER DEFAULT 1,
-                used_count INTEGER DEFAULT 0,
-                is_active BOOLEAN DEFAULT TRUE
-            )
-            ''')
-            
-            # Таблица групп
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS groups (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                tutor_id INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (tutor_id) REFERENCES tutors (id)
-            )
-            ''')
-            
-            # Таблица связи учеников и групп
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS student_groups (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id INTEGER,
-                group_id INTEGER,
-                added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (student_id) REFERENCES students (id),
-                FOREIGN KEY (group_id) REFERENCES groups (id),
-                UNIQUE(student_id, group_id)
-            )
-            ''')
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS lesson_reports (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                lesson_id INTEGER NOT NULL,
-                student_id INTEGER NOT NULL,
-                lesson_held BOOLEAN,
-                lesson_paid BOOLEAN,
-                homework_done BOOLEAN,
-                student_performance TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (lesson_id) REFERENCES lessons (id),
-                FOREIGN KEY (student_id) REFERENCES students (id),
-                UNIQUE(lesson_id, student_id)
-            )
-            ''')
-                        # МИГРАЦИЯ: Добавляем поле parent_performance если его нет
-            cursor.execute("PRAGMA table_info(lesson_reports)")
-            columns = [column[1] for column in cursor.fetchall()]
-            
-            if 'parent_performance' not in columns:
-                cursor.execute('''
-                ALTER TABLE lesson_reports 
-                ADD COLUMN parent_performance TEXT
-                ''')
-                print("✅ Поле parent_performance добавлено в таблицу lesson_reports")
+        context = {
+            'telegram_id': telegram_id,
+            'role': None,
+            'user_role': None,
+            'tutor_id': None,
+            'student_id': None,
+            'parent_student_ids': (),
+        }
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT id, user_role FROM tutors WHERE telegram_id = ?', (telegram_id,))
+                tutor = cursor.fetchone()
+                cursor.execute(
+                    'SELECT id, student_telegram_id FROM students WHERE student_telegram_id = ? OR parent_telegram_id = ?',
+                    (telegram_id, telegram_id)
+                )
+                students = cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Ошибка при получении контекста пользователя {telegram_id}: {e}")
+            return context  # не кэшируем: при следующем обращении попробуем снова
 
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_subscriptions (
-                user_id INTEGER PRIMARY KEY,
-                valid_until TEXT NOT NULL,
-                tariff TEXT NOT NULL,
-                is_active BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES tutors (telegram_id)
-            )
-            ''')
-            # Обращения
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS feedback_messages (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                user_name TEXT NOT NULL,
-                message TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status TEXT DEFAULT 'new',  -- new, in_progress, resolved
-                FOREIGN KEY (user_id) REFERENCES tutors (telegram_id)
-            )
-            ''')
-            
-            # Таблица платежей
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS payments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                payment_id TEXT UNIQUE NOT NULL,
-                tariff_name TEXT NOT NULL,
-                amount REAL NOT NULL,
-                status TEXT DEFAULT 'pending',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                valid_until TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES tutors (telegram_id)
-            )
-            ''')
-            try:
-                cursor.execute('ALTER TABLE lessons ADD COLUMN group_id INTEGER')
-            except sqlite3.OperationalError:
-                # Поле уже существует - игнорируем ошибку
-                pass
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tutor_settings (
-                tutor_id INTEGER PRIMARY KEY,
-                reminder_hours_before INTEGER DEFAULT 1,
-                FOREIGN KEY (tutor_id) REFERENCES tutors (id)
-            )
-            ''')
-            # Таблица реферальных переходов
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS referrals (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                referrer_id INTEGER NOT NULL,
-                visitor_telegram_id INTEGER NOT NULL,
-                referral_code TEXT NOT NULL,
-                status TEXT DEFAULT 'awaiting',
-                visited_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (referrer_id) REFERENCES tutors (id),
-                UNIQUE(visitor_telegram_id, status)
-            )
-            ''')
+        if tutor:
+            context['tutor_id'], context['user_role'] = tutor[0], tutor[1]
+        for student_id, student_telegram_id in students:
+            if student_telegram_id == telegram_id:
+                context['student_id'] = context['student_id'] or student_id
+            else:
+                context['parent_student_ids'] += (student_id,)
 
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS student_migration_map (
-                old_id INTEGER PRIMARY KEY,
-                main_id INTEGER NOT NULL,
-                migration_status TEXT DEFAULT 'pending',
-                migrated_at TIMESTAMP,
-                FOREIGN KEY (main_id) REFERENCES main_students (id)
-            )
-            ''')
-            # планер регулярных занятий
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS planner_actions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                tutor_id INTEGER NOT NULL,
-                lesson_type TEXT NOT NULL,
-                student_id INTEGER,
-                group_id INTEGER,
-                weekday TEXT NOT NULL,
-                time TEXT NOT NULL,
-                duration INTEGER NOT NULL,
-                price REAL NOT NULL,
-                is_active BOOLEAN DEFAULT TRUE,
-                last_created TIMESTAMP DEFAULT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (tutor_id) REFERENCES tutors (id),
-                FOREIGN KEY (student_id) REFERENCES students (id),
-                FOREIGN KEY (group_id) REFERENCES groups (id)
-            )
-            ''')
-            # Таблица для бонусных рассылок   
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS bonus_mailings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                message_text TEXT NOT NULL,
-                file_paths TEXT,  -- JSON список путей к файлам
-                tariffs TEXT NOT NULL,  -- JSON список тарифов
-                start_date TIMESTAMP NOT NULL,
-                end_date TIMESTAMP NOT NULL,
-                is_active BOOLEAN DEFAULT TRUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            ''')
-            # для логов отправки бонусных рассылок
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS mailing_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                mailing_id INTEGER NOT NULL,
-                user_id INTEGER NOT NULL,
-                sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status TEXT DEFAULT 'sent',
-                error_message TEXT,
-                FOREIGN KEY (mailing_id) REFERENCES bonus_mailings(id) ON DELETE CASCADE
-            )
-            ''')
-            
-            conn.commit()
+        if context['tutor_id']:
+            context['role'] = 'tutor'
+        elif context['student_id']:
+            context['role'] = 'student'
+        elif context['parent_student_ids']:
+            context['role'] = 'parent'
+
+        self.user_contexts.set(telegram_id, context)
+        return context
+
+    def invalidate_user_context(self, telegram_id=None):
+        """Сбрасывает кэш контекста пользователя (None - всех пользователей)"""
+        self.user_contexts.invalidate(telegram_id)
+
+    def init_db(self):
+        """Приводит схему БД к актуальной версии (см. migrations.py)"""
+        with self.pool.acquire() as conn:
+            if get_schema_version(conn) < LATEST_VERSION:
+                applied = migrate(conn)
+                logger.info(f"Применено миграций схемы: {len(applied)}")
         logger.info("База данных инициализирована")
 
     def add_tutor(self, telegram_id, full_name, phone, promo_code='0'):
@@ -365,6 +363,7 @@ class Database:
                 VALUES (?, ?, ?, ?)
                 ''', (telegram_id, full_name, phone, promo_code))
                 conn.commit()
+                self.invalidate_user_context(telegram_id)
                 logger.info(f"Добавлен репетитор: {full_name}")
                 return cursor.lastrowid
         except Exception as e:
@@ -498,16 +497,8 @@ class Database:
             return None
 
     def get_tutor_id_by_telegram_id(self, telegram_id):
-        """Получает ID репетитора по telegram_id"""
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('SELECT id FROM tutors WHERE telegram_id = ?', (telegram_id,))
-                result = cursor.fetchone()
-                return result[0] if result else None
-        except Exception as e:
-            logger.error(f"Ошибка при получении ID репетитора: {e}")
-            return None
+        """Получает ID репетитора по telegram_id (из кэша контекста пользователя)"""
+        return self.get_user_context(telegram_id)['tutor_id']
 
     def generate_invite_token(self):
         """Генерирует уникальный токен для приглашения"""
@@ -573,6 +564,8 @@ class Database:
                     )
                 
                 conn.commit()
+                # Аккаунт мог быть привязан к ученику раньше - сбрасываем кэш целиком
+                self.invalidate_user_context()
                 return cursor.rowcount > 0
                 
         except Exception as e:
@@ -671,6 +664,8 @@ class Database:
                     (field_value, student_id)
                 )
                 conn.commit()
+                if field_name in ('student_telegram_id', 'parent_telegram_id'):
+                    self.invalidate_user_context()
                 return cursor.rowcount > 0
         except sqlite3.Error as e:
             logger.error(f"Ошибка при обновлении поля {field_name} ученика {student_id}: {e}")
@@ -744,13 +739,12 @@ class Database:
                 ''', (tutor_id, days))
                 
                 result = [dict(row) for row in cursor.fetchall()]
-                print(f"Найдено ближайших занятий: {len(result)}")
+                logger.debug(f"Найдено ближайших занятий: {len(result)}")
                 
                 return result
                 
         except Exception as e:
             logger.error(f"Ошибка при получении ближайших занятий: {e}")
-            print(f"Ошибка: {e}")
             return []
         
     def add_lesson(self, tutor_id: int, student_id: int, lesson_date: datetime, 
@@ -765,6 +759,7 @@ class Database:
                 ''', (tutor_id, student_id, lesson_date, duration, price, status, group_id))
                 conn.commit()
                 logger.info(f"Добавлено занятие: student_id={student_id}, group_id={group_id}")
+                self.notify_lessons_changed([cursor.lastrowid])
                 return cursor.lastrowid
         except Exception as e:
             logger.error(f"Ошибка при добавлении занятия: {e}")
@@ -857,41 +852,37 @@ class Database:
                     (student_id, group_id)
                 )
                 
-                # 5. Создаем занятия для ученика на основе существующих групповых занятий
+                # 5. Создаем занятия для ученика в будущих занятиях группы, где его еще нет
+                # (по индексу idx_lessons_group_date)
                 cursor.execute(
                     """
-                    SELECT lesson_date, duration, price 
-                    FROM lessons 
+                    SELECT lesson_date, MAX(duration) as duration, MAX(price) as price,
+                        MAX(planner_action_id) as planner_action_id
+                    FROM lessons
                     WHERE group_id = ? AND lesson_date > datetime('now')
-                    GROUP BY lesson_date, duration, price
+                    GROUP BY lesson_date
+                    HAVING SUM(student_id = ?) = 0
                     """,
-                    (group_id,)
+                    (group_id, student_id)
                 )
                 future_lessons = cursor.fetchall()
                 
-                created_count = 0
+                created_ids = []
                 for lesson in future_lessons:
-                    # Проверяем, нет ли уже занятия для этого ученика в это время
                     cursor.execute(
                         """
-                        SELECT 1 FROM lessons 
-                        WHERE student_id = ? AND lesson_date = ? AND group_id = ?
+                        INSERT INTO lessons 
+                        (tutor_id, student_id, group_id, lesson_date, duration, price, status, planner_action_id)
+                        VALUES (?, ?, ?, ?, ?, ?, 'planned', ?)
                         """,
-                        (student_id, lesson['lesson_date'], group_id)
+                        (tutor_id, student_id, group_id, lesson['lesson_date'],
+                        lesson['duration'], lesson['price'], lesson['planner_action_id'])
                     )
-                    if not cursor.fetchone():
-                        cursor.execute(
-                            """
-                            INSERT INTO lessons 
-                            (tutor_id, student_id, group_id, lesson_date, duration, price, status)
-                            VALUES (?, ?, ?, ?, ?, ?, 'planned')
-                            """,
-                            (tutor_id, student_id, group_id, lesson['lesson_date'], 
-                            lesson['duration'], lesson['price'])
-                        )
-                        created_count += 1
+                    created_ids.append(cursor.lastrowid)
+                created_count = len(created_ids)
                 
                 conn.commit()
+                self.notify_lessons_changed(created_ids)
                 logger.info(f"✅ Ученик {student_id} добавлен в группу {group_id}")
                 logger.info(f"📚 Создано {created_count} будущих занятий")
                 
@@ -1064,33 +1055,38 @@ class Database:
 
     def add_group_lesson(self, tutor_id: int, group_id: int, lesson_date: datetime, 
                     duration: int, price: float, status: str = "planned"):
-        """Добавляет занятие для всей группы"""
+        """Добавляет занятие для всей группы: по строке на каждого ученика одной транзакцией.
+
+        Возвращает id созданных занятий учеников (пустой список при ошибке).
+        """
         try:
             # Получаем всех учеников группы
             students = self.get_students_in_group(group_id)
             if not students:
                 logger.error(f"Группа {group_id} пустая")
-                return False
+                return []
             
             logger.info(f"Добавление занятий для группы {group_id}: {len(students)} учеников")
             
             with self.get_connection() as conn:
                 cursor = conn.cursor()
+                lesson_ids = []
                 
                 for student in students:
-                    logger.info(f"Добавление занятия для student_id={student['id']}, group_id={group_id}")
                     cursor.execute('''
                     INSERT INTO lessons (tutor_id, student_id, lesson_date, duration, price, status, group_id)
                     VALUES (?, ?, ?, ?, ?, ?, ?)
                     ''', (tutor_id, student['id'], lesson_date, duration, price, status, group_id))
+                    lesson_ids.append(cursor.lastrowid)
                 
                 conn.commit()
+                self.notify_lessons_changed(lesson_ids)
                 logger.info(f"Успешно добавлено {len(students)} занятий для группы {group_id}")
-                return True
+                return lesson_ids
                 
         except Exception as e:
             logger.error(f"Ошибка при добавлении группового занятия: {e}")
-            return False
+            return []
 
     def get_lesson_by_id(self, lesson_id):
         """Получить занятие по ID с информацией о студенте и репетиторе"""
@@ -1145,6 +1141,7 @@ class Database:
                 cursor = conn.cursor()
                 cursor.execute('UPDATE lessons SET lesson_date = ? WHERE id = ?', (new_datetime, lesson_id))
                 conn.commit()
+                self.notify_lessons_changed([lesson_id])
                 return cursor.rowcount > 0
         except Exception as e:
             logger.error(f"Ошибка при обновлении даты/времени: {e}")
@@ -1169,6 +1166,7 @@ class Database:
                 cursor = conn.cursor()
                 cursor.execute('UPDATE lessons SET duration = ? WHERE id = ?', (new_duration, lesson_id))
                 conn.commit()
+                self.notify_lessons_changed([lesson_id])
                 return cursor.rowcount > 0
         except Exception as e:
             logger.error(f"Ошибка при обновлении длительности: {e}")
@@ -1210,42 +1208,70 @@ class Database:
             logger.error(f"Ошибка при удалении занятия: {e}")
             return False
         
-    def update_group_lesson_datetime(self, group_id: int, new_datetime: str) -> bool:
-        """Обновить дату/время для всех занятий группы"""
+    def update_group_lesson_datetime(self, lesson_id: int, new_datetime: str) -> bool:
+        """Обновить дату/время группового занятия (занятий всех учеников этого проведения)"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("UPDATE lessons SET lesson_date = ? WHERE group_id = ?", (new_datetime, group_id))
+                cursor.execute('''
+                UPDATE lessons SET lesson_date = ?
+                WHERE (group_id, lesson_date) = (SELECT group_id, lesson_date FROM lessons WHERE id = ?)
+                ''', (new_datetime, lesson_id))
                 conn.commit()
-                return True
+                self.notify_lessons_changed()
+                return cursor.rowcount > 0
         except Exception as e:
             logger.error(f"Ошибка при обновлении даты/времени группы: {e}")
             return False
 
-    def update_group_lesson_price(self, group_id: int, price: float) -> bool:
-        """Обновить стоимость для всех занятий группы"""
+    def update_group_lesson_price(self, lesson_id: int, price: float) -> bool:
+        """Обновить стоимость группового занятия (занятий всех учеников этого проведения)"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("UPDATE lessons SET price = ? WHERE group_id = ?", (price, group_id))
+                cursor.execute('''
+                UPDATE lessons SET price = ?
+                WHERE (group_id, lesson_date) = (SELECT group_id, lesson_date FROM lessons WHERE id = ?)
+                ''', (price, lesson_id))
                 conn.commit()
-                return True
+                return cursor.rowcount > 0
         except Exception as e:
             logger.error(f"Ошибка при обновлении стоимости группы: {e}")
             return False
 
-    def update_group_lesson_duration(self, group_id: int, duration: int) -> bool:
-        """Обновить длительность для всех занятий группы"""
+    def update_group_lesson_duration(self, lesson_id: int, duration: int) -> bool:
+        """Обновить длительность группового занятия (занятий всех учеников этого проведения)"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("UPDATE lessons SET duration = ? WHERE group_id = ?", (duration, group_id))
+                cursor.execute('''
+                UPDATE lessons SET duration = ?
+                WHERE (group_id, lesson_date) = (SELECT group_id, lesson_date FROM lessons WHERE id = ?)
+                ''', (duration, lesson_id))
                 conn.commit()
-                return True
+                self.notify_lessons_changed()
+                return cursor.rowcount > 0
         except Exception as e:
             logger.error(f"Ошибка при обновлении длительности группы: {e}")
             return False
 
+    def delete_group_lesson(self, lesson_id: int) -> int:
+        """Удалить групповое занятие целиком (все строки учеников этого проведения),
+        возвращает число удаленных занятий"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                DELETE FROM lessons
+                WHERE (group_id, lesson_date) = (SELECT group_id, lesson_date FROM lessons WHERE id = ?)
+                ''', (lesson_id,))
+                conn.commit()
+                self.notify_lessons_changed()
+                return cursor.rowcount
+        except Exception as e:
+            logger.error(f"Ошибка при удалении группового занятия {lesson_id}: {e}")
+            return 0
+
     def get_lessons_by_date(self, tutor_id: int, date_str: str) -> list:
         """Получить занятия на определенную дату"""
         try:
@@ -1446,31 +1472,31 @@ class Database:
             logger.error(f"Ошибка при проверке отчета: {e}")
             return False
     def has_free_access(self, telegram_id: int) -> bool:
-        """Проверяет, есть ли у пользователя бесплатный доступ"""
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('SELECT user_role FROM tutors WHERE telegram_id = ?', (telegram_id,))
-                result = cursor.fetchone()
-                
-                if result and result[0] in ['admin', 'vip', 'moderator', 'tester']:
-                    return True
-                return False
-        except Exception as e:
-            logger.error(f"Ошибка при проверке бесплатного доступа: {e}")
-            return False
+        """Проверяет, есть ли у пользователя бесплатный доступ (из кэша контекста пользователя)"""
+        return self.get_user_context(telegram_id)['user_role'] in ['admin', 'vip', 'moderator', 'tester']
 
     def is_admin(self, telegram_id: int) -> bool:
-        """Проверяет, является ли пользователь администратором"""
+        """Проверяет, является ли пользователь администратором (из кэша контекста пользователя)"""
+        return self.get_user_context(telegram_id)['user_role'] == 'admin'
+
+    def get_active_subscriptions(self) -> list:
+        """Все активные подписки одним запросом (представление active_subscriptions).
+
+        Возвращает [{'tutor_id', 'telegram_id', 'tariff', 'valid_until', 'updated_at'}];
+        tutor_id равен None, если оплативший пользователь не зарегистрирован репетитором.
+        При ошибке возвращает None, чтобы вызывающий не принял ее за "подписок нет".
+        """
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('SELECT user_role FROM tutors WHERE telegram_id = ?', (telegram_id,))
-                result = cursor.fetchone()
-                return result and result[0] == 'admin'
+                cursor.execute('''
+                SELECT tutor_id, telegram_id, tariff, valid_until, updated_at
+                FROM active_subscriptions
+                ''')
+                return [dict(row) for row in cursor.fetchall()]
         except Exception as e:
-            logger.error(f"Ошибка при проверке администратора: {e}")
-            return False
+            logger.error(f"Ошибка при получении активных подписок: {e}")
+            return None
     def get_student_unpaid_lessons(self, student_id: int):
         """Получает неоплаченные занятия студента (ТОЛЬКО те, у которых есть отчет и они не оплачены)"""
         try:
@@ -1689,8 +1715,11 @@ class Database:
             ''', (new_comment, report_id))
             conn.commit()
     
-    def get_lessons_for_reminder(self):
-        """Получает все занятия, которые начнутся в ближайшие 60 минут"""
+    def get_lessons_for_reminder(self, lesson_ids=None):
+        """Получает все занятия, которые начнутся в ближайшие 60 минут
+
+        lesson_ids ограничивает выборку занятиями, для которых сработал таймер.
+        """
         try:
             with self.get_connection() as conn:
                 conn.row_factory = sqlite3.Row
@@ -1702,7 +1731,7 @@ class Database:
                 logger.info(f"🕒 UTC время в БД: {times['utc_time']}")
                 logger.info(f"🏠 Локальное время в БД: {times['local_time']}")
                 
-                cursor.execute('''
+                query = '''
                 SELECT 
                     l.id as lesson_id,
                     l.lesson_date,
@@ -1717,9 +1746,16 @@ class Database:
                 JOIN tutors t ON l.tutor_id = t.id
                 WHERE l.status = 'planned'
                 AND l.lesson_date > datetime('now', 'localtime')
-                AND l.lesson_date <= datetime('now', 'localtime', '+60 minutes')
                 AND l.reminder_sent = 0
-                ''')
+                '''
+                params = []
+                if lesson_ids:
+                    # Время уже выбрал таймер: проверяем только, что занятие не началось
+                    query += f"AND l.id IN ({','.join('?' * len(lesson_ids))})"
+                    params = list(lesson_ids)
+                else:
+                    query += "AND l.lesson_date <= datetime('now', 'localtime', '+60 minutes')"
+                cursor.execute(query, params)
                 
                 results = [dict(row) for row in cursor.fetchall()]
                 return results
@@ -1742,6 +1778,42 @@ class Database:
             logger.error(f"Ошибка при отметке отправленного напоминания: {e}")
             return False
 
+    def get_lessons_for_timer(self, start: str, end: str):
+        """Возвращает запланированные занятия, не закончившиеся к start и начинающиеся до end, для LessonTimer"""
+        try:
+            with self.get_connection() as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                # Диапазон по idx_lessons_status_end
+                cursor.execute('''
+                SELECT id, lesson_date, duration, lesson_end, reminder_sent
+                FROM lessons
+                WHERE status = 'planned' AND lesson_end >= ? AND lesson_date <= ?
+                ''', (start, end))
+                return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке занятий для таймера: {e}")
+            return []
+
+    def get_lessons_for_timer_by_ids(self, lesson_ids):
+        """Возвращает запланированные занятия из lesson_ids для LessonTimer"""
+        if not lesson_ids:
+            return []
+        try:
+            with self.get_connection() as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                placeholders = ','.join('?' * len(lesson_ids))
+                cursor.execute(f'''
+                SELECT id, lesson_date, duration, lesson_end, reminder_sent
+                FROM lessons
+                WHERE status = 'planned' AND id IN ({placeholders})
+                ''', list(lesson_ids))
+                return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Ошибка при получении занятий для таймера: {e}")
+            return []
+
     def reset_reminders_for_past_lessons(self):
         """Сбрасывает флаги напоминаний для прошедших занятий"""
         try:
@@ -1873,40 +1945,11 @@ class Database:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Создаем таблицу для платежей если ее нет
-                cursor.execute('''
-                CREATE TABLE IF NOT EXISTS payments (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    payment_id TEXT UNIQUE NOT NULL,
-                    tariff_name TEXT NOT NULL,
-                    amount REAL NOT NULL,
-                    status TEXT DEFAULT 'pending',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES tutors (telegram_id)
-                )
-                ''')
-                
                 # Вставляем запись о платеже
                 cursor.execute('''
                 INSERT INTO payments (user_id, payment_id, tariff_name, amount)
                 VALUES (?, ?, ?, ?)
                 ''', (user_id, payment_id, tariff_name, amount))
-                                # Создаем таблицу для платежей если ее нет
-                cursor.execute('''
-                CREATE TABLE IF NOT EXISTS payments (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    payment_id TEXT UNIQUE NOT NULL,
-                    tariff_name TEXT NOT NULL,
-                    amount REAL NOT NULL,
-                    status TEXT DEFAULT 'pending',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES tutors (telegram_id)
-                )
-                ''')
                 conn.commit()
                 logger.info(f"Payment saved: user_id={user_id}, payment_id={payment_id}")
                 return True
@@ -1986,26 +2029,86 @@ class Database:
         except sqlite3.Error as e:
             logger.error(f"Error getting user payments: {e}")
             return []
-    def get_earnings_by_period(self, tutor_id: int, start_date: date, end_date: date) -> float:
-        """Возвращает сумму заработка за указанный период по оплаченным занятиям"""
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
+    @staticmethod
+    def _period_bound(value) -> str:
+        """Граница периода в формате lesson_date"""
+        if isinstance(value, datetime):
+            return value.strftime('%Y-%m-%d %H:%M:%S')
+        if isinstance(value, date):
+            return value.strftime('%Y-%m-%d')
+        return value
+
+    def get_tutor_statistics(self, tutor_id: int, periods: dict) -> dict:
+        """Статистика репетитора за несколько периодов одним обращением к БД.
+
+        periods - {имя: (начало, конец)}, период - полуинтервал [начало, конец).
+        Возвращает {'periods': {имя: {...}}, 'total_students': n, 'active_students': n},
+        где для каждого периода: total_lessons, total_earnings (все занятия),
+        paid_earnings (проведенные и оплаченные), completed_lessons, planned_lessons,
+        individual_lessons, group_lessons, group_sessions и students (разных учеников).
+        """
+        empty = {
+            'total_lessons': 0, 'total_earnings': 0.0, 'paid_earnings': 0.0,
+            'completed_lessons': 0, 'planned_lessons': 0,
+            'individual_lessons': 0, 'group_lessons': 0, 'group_sessions': 0, 'students': 0
+        }
+        result = {
+            'periods': {name: dict(empty) for name in periods},
+            'total_students': 0,
+            'active_students': 0
+        }
+        bounds = [
+            [name, self._period_bound(start), self._period_bound(end)]
+            for name, (start, end) in periods.items()
+        ]
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                # Каждый период - поиск по индексу (tutor_id, lesson_date)
                 cursor.execute('''
-                SELECT COALESCE(SUM(l.price), 0) as total_earnings
-                FROM lessons l
-                LEFT JOIN lesson_reports lr ON l.id = lr.lesson_id
-                WHERE l.tutor_id = ? 
-                AND DATE(l.lesson_date) BETWEEN ? AND ?
-                AND l.status = 'completed'
-                AND lr.lesson_paid = 1  -- Добавляем проверку оплаты
-                ''', (tutor_id, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')))
-                
-                result = cursor.fetchone()
-                return float(result[0]) if result and result[0] is not None else 0.0
+                WITH periods AS (
+                    SELECT json_extract(value, '$[0]') AS name,
+                           json_extract(value, '$[1]') AS start_date,
+                           json_extract(value, '$[2]') AS end_date
+                    FROM json_each(?)
+                )
+                SELECT
+                    p.name,
+                    COUNT(l.id),
+                    TOTAL(l.price),
+                    TOTAL(CASE WHEN l.status = 'completed' AND EXISTS (
+                        SELECT 1 FROM lesson_reports lr WHERE lr.lesson_id = l.id AND lr.lesson_paid = 1
+                    ) THEN l.price END),
+                    COUNT(CASE WHEN l.status = 'completed' THEN 1 END),
+                    COUNT(CASE WHEN l.status = 'planned' THEN 1 END),
+                    COUNT(CASE WHEN l.id IS NOT NULL AND l.group_id IS NULL THEN 1 END),
+                    COUNT(l.group_id),
+                    COUNT(DISTINCT CASE WHEN l.group_id IS NOT NULL THEN l.group_id || ' ' || l.lesson_date END),
+                    COUNT(DISTINCT l.student_id)
+                FROM periods p
+                LEFT JOIN lessons l
+                    ON l.tutor_id = ? AND l.lesson_date >= p.start_date AND l.lesson_date < p.end_date
+                GROUP BY p.name
+                ''', (json.dumps(bounds), tutor_id))
+                for row in cursor.fetchall():
+                    result['periods'][row[0]] = dict(zip(empty, row[1:]))
+
+                cursor.execute('''
+                SELECT COUNT(*), COUNT(CASE WHEN status != 'inactive' THEN 1 END)
+                FROM students
+                WHERE tutor_id = ?
+                ''', (tutor_id,))
+                row = cursor.fetchone()
+                if row:
+                    result['total_students'], result['active_students'] = row[0], row[1]
         except Exception as e:
-            logger.error(f"Ошибка при получении заработка за период: {e}")
-            return 0.0
+            logger.error(f"Ошибка при получении статистики репетитора: {e}")
+        return result
+
+    def get_earnings_by_period(self, tutor_id: int, start_date: date, end_date: date) -> float:
+        """Возвращает сумму заработка за указанный период по оплаченным занятиям"""
+        stats = self.get_tutor_statistics(tutor_id, {'period': (start_date, end_date + timedelta(days=1))})
+        return stats['periods']['period']['paid_earnings']
         
     def get_total_students_count(self, tutor_id: int) -> int:
         """Возвращает общее количество учеников у репетитора"""
@@ -2528,7 +2631,11 @@ class Database:
             return []
 
     def get_parent_unpaid_lessons(self, parent_telegram_id: int):
-        """Получает неоплаченные занятия родителя - УЛУЧШЕННАЯ ВЕРСИЯ"""
+        """Получает неоплаченные (проведенные и не оплаченные) занятия детей родителя.
+
+        Ученики без долгов отсекаются по student_rollups, занятия с долгом
+        читаются по частичному индексу idx_lesson_reports_unpaid.
+        """
         try:
             with self.get_connection() as conn:
                 conn.row_factory = sqlite3.Row
@@ -2542,16 +2649,17 @@ class Database:
                     l.price,
                     s.full_name as student_name,
                     t.full_name as tutor_name,
-                    COALESCE(lr.lesson_held, 1) as lesson_held,
+                    lr.lesson_held,
                     COALESCE(lr.lesson_paid, 0) as lesson_paid,
-                    lr.parent_performance as parent_performance  -- Получаем комментарий
-                FROM lessons l
-                JOIN students s ON l.student_id = s.id
+                    lr.parent_performance as parent_performance
+                FROM students s
+                JOIN student_rollups ro ON ro.student_id = s.id AND ro.unpaid_count > 0
+                JOIN lesson_reports lr ON lr.student_id = s.id
+                    AND lr.lesson_held = 1 AND COALESCE(lr.lesson_paid, 0) = 0
+                JOIN lessons l ON l.id = lr.lesson_id AND l.student_id = lr.student_id
                 JOIN tutors t ON l.tutor_id = t.id
-                LEFT JOIN lesson_reports lr ON l.id = lr.lesson_id AND lr.student_id = s.id
                 WHERE s.parent_telegram_id = ?
-                AND l.status = 'completed'
-                AND (lr.lesson_paid = 0 OR lr.lesson_paid IS NULL)  -- УСЛОВИЕ ИЗМЕНЕНО
+                AND l.status != 'cancelled'
                 ORDER BY l.lesson_date DESC
                 ''', (parent_telegram_id,))
                 
@@ -2563,11 +2671,8 @@ class Database:
             logger.error(f"Ошибка при получении неоплаченных занятий родителя: {e}")
             return []
 
-
-        
-        
     def get_parent_homeworks(self, parent_telegram_id: int):
-        """Получает домашние задания родителя - ИСПРАВЛЕННАЯ ВЕРСИЯ"""
+        """Получает невыполненные домашние задания детей родителя (по student_rollups и частичному индексу)"""
         try:
             with self.get_connection() as conn:
                 conn.row_factory = sqlite3.Row
@@ -2581,14 +2686,15 @@ class Database:
                     t.full_name as tutor_name,
                     lr.homework_done,
                     lr.student_performance,
-                    lr.parent_performance    -- ДОБАВЛЕНО: комментарий для родителя
-                FROM lessons l
-                JOIN students s ON l.student_id = s.id
+                    lr.parent_performance
+                FROM students s
+                JOIN student_rollups ro ON ro.student_id = s.id AND ro.undone_homework_count > 0
+                JOIN lesson_reports lr ON lr.student_id = s.id
+                    AND lr.lesson_held = 1 AND COALESCE(lr.homework_done, 0) = 0
+                JOIN lessons l ON l.id = lr.lesson_id AND l.student_id = lr.student_id
                 JOIN tutors t ON l.tutor_id = t.id
-                LEFT JOIN lesson_reports lr ON l.id = lr.lesson_id
                 WHERE s.parent_telegram_id = ?
-                AND l.status = 'completed'
-                AND (lr.homework_done = FALSE OR lr.homework_done IS NULL)
+                AND l.status != 'cancelled'
                 ORDER BY l.lesson_date DESC
                 ''', (parent_telegram_id,))
                 return [dict(row) for row in cursor.fetchall()]
@@ -2596,6 +2702,143 @@ class Database:
             logger.error(f"Ошибка при получении домашних заданий родителя: {e}")
             return []
 
+    @staticmethod
+    def _rollup_dict(row) -> dict:
+        """Строка student_rollups с вычисленной долей посещенных занятий"""
+        rollup = dict(row)
+        reported = rollup.get('reported_count') or 0
+        rollup['attendance_rate'] = rollup.get('held_count', 0) / reported if reported else None
+        return rollup
+
+    def get_student_rollup(self, student_id: int) -> dict:
+        """Сводка по ученику: неоплаченные занятия и сумма, долги по ДЗ, посещаемость"""
+        empty = {
+            'student_id': student_id, 'unpaid_count': 0, 'unpaid_amount': 0.0,
+            'undone_homework_count': 0, 'held_count': 0, 'reported_count': 0, 'attendance_rate': None
+        }
+        try:
+            with self.get_connection() as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                cursor.execute('SELECT * FROM student_rollups WHERE student_id = ?', (student_id,))
+                row = cursor.fetchone()
+                return self._rollup_dict(row) if row else empty
+        except Exception as e:
+            logger.error(f"Ошибка при получении сводки ученика: {e}")
+            return empty
+
+    def get_tutor_debt_rollups(self, tutor_id: int) -> list:
+        """Ученики репетитора с долгами по оплате или ДЗ и их сводки"""
+        try:
+            with self.get_connection() as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                cursor.execute('''
+                SELECT ro.*, s.full_name as student_name
+                FROM students s
+                JOIN student_rollups ro ON ro.student_id = s.id
+                WHERE s.tutor_id = ?
+                AND (ro.unpaid_count > 0 OR ro.undone_homework_count > 0)
+                ORDER BY s.full_name
+                ''', (tutor_id,))
+                return [self._rollup_dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Ошибка при получении сводок долгов репетитора: {e}")
+            return []
+
+    def get_parent_debt_rollups(self, parent_telegram_id: int) -> list:
+        """Сводки по всем детям родителя"""
+        try:
+            with self.get_connection() as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                cursor.execute('''
+                SELECT ro.*, s.full_name as student_name
+                FROM students s
+                JOIN student_rollups ro ON ro.student_id = s.id
+                WHERE s.parent_telegram_id = ?
+                ORDER BY s.full_name
+                ''', (parent_telegram_id,))
+                return [self._rollup_dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Ошибка при получении сводок родителя: {e}")
+            return []
+
+    def get_student_payment_debts(self, student_id: int, tutor_id: int) -> list:
+        """Проведенные и не оплаченные занятия ученика (по частичному индексу, без просмотра истории)"""
+        try:
+            with self.get_connection() as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                # CROSS JOIN фиксирует порядок: сначала долги по индексу, затем их занятия
+                cursor.execute('''
+                SELECT l.id as lesson_id, l.lesson_date, l.price
+                FROM lesson_reports lr
+                CROSS JOIN lessons l ON l.id = lr.lesson_id AND l.student_id = lr.student_id
+                WHERE lr.student_id = ?
+                AND lr.lesson_held = 1 AND COALESCE(lr.lesson_paid, 0) = 0
+                AND l.tutor_id = ?
+                AND l.status != 'cancelled'
+                ORDER BY l.lesson_date DESC
+                ''', (student_id, tutor_id))
+                return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Ошибка при получении долгов ученика по оплате: {e}")
+            return []
+
+    def get_student_homework_debts(self, student_id: int, tutor_id: int) -> list:
+        """Проведенные занятия ученика с невыполненным ДЗ (по частичному индексу)"""
+        try:
+            with self.get_connection() as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                cursor.execute('''
+                SELECT l.id as lesson_id, l.lesson_date, lr.student_performance
+                FROM lesson_reports lr
+                CROSS JOIN lessons l ON l.id = lr.lesson_id AND l.student_id = lr.student_id
+                WHERE lr.student_id = ?
+                AND lr.lesson_held = 1 AND COALESCE(lr.homework_done, 0) = 0
+                AND l.tutor_id = ?
+                AND l.status != 'cancelled'
+                ORDER BY l.lesson_date DESC
+                ''', (student_id, tutor_id))
+                return [dict(row) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Ошибка при получении долгов ученика по ДЗ: {e}")
+            return []
+
+    def get_tutor_monthly_earnings(self, tutor_id: int, months: list) -> dict:
+        """Заработок репетитора по месяцам 'YYYY-MM' из tutor_monthly_rollups"""
+        result = {month: {'completed_count': 0, 'earnings': 0.0, 'paid_earnings': 0.0} for month in months}
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                SELECT month, completed_count, earnings, paid_earnings
+                FROM tutor_monthly_rollups
+                WHERE tutor_id = ? AND month IN (SELECT value FROM json_each(?))
+                ''', (tutor_id, json.dumps(months)))
+                for month, completed_count, earnings, paid_earnings in cursor.fetchall():
+                    result[month] = {
+                        'completed_count': completed_count,
+                        'earnings': earnings,
+                        'paid_earnings': paid_earnings
+                    }
+        except Exception as e:
+            logger.error(f"Ошибка при получении заработка по месяцам: {e}")
+        return result
+
+    def rebuild_rollups(self) -> bool:
+        """Пересчитывает сводные таблицы с нуля (обслуживание; обычно их ведут триггеры)"""
+        try:
+            with self.get_connection() as conn:
+                rebuild_rollups(conn.cursor())
+                conn.commit()
+                return True
+        except Exception as e:
+            logger.error(f"Ошибка при пересчете сводных таблиц: {e}")
+            return False
+
     def get_parent_students(self, parent_telegram_id: int):
         """Получает всех учеников родителя"""
         try:
@@ -3035,7 +3278,7 @@ class Database:
                 conn.commit()
                 return True
         except Exception as e:
-            print(f"❌ Ошибка обновления заметки для родителей: {e}")
+            logger.error(f"❌ Ошибка обновления заметки для родителей: {e}")
             return False
-# Создаем глобальный экземпляр базы данных
+# Создаем глобальный экземпляр базы данных (схема создается при первом обращении)
 db = Database()
\ No newline at end of file
@@ -0,0 +1,184 @@
+"""Хранилище состояний FSM в SQLite с кэшем в памяти и отложенной записью"""
+
+import asyncio
+import copy
+import logging
+import pickle
+import time
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 1.0             # секунд между пакетными записями изменений в БД
+STATE_TTL = 7 * 24 * 3600        # брошенные состояния удаляются через неделю
+CACHE_IDLE_TTL = 30 * 60         # неактивные записи вытесняются из памяти (остаются в БД)
+CLEANUP_INTERVAL = 3600          # как часто удалять устаревшие состояния из БД
+
+
+class SQLiteStorage(BaseStorage):
+    """aiogram-хранилище FSM в таблице fsm_states файла БД бота.
+
+    Чтение и запись идут через словарь в памяти, поэтому шаг диалога не ждет
+    диск. Измененные ключи раз в FLUSH_INTERVAL записываются в БД одной
+    транзакцией, а close() сбрасывает оставшиеся изменения. Данные сериализуются
+    pickle: в FSM лежат datetime и словари занятий, а пишет их только сам бот.
+    """
+
+    def __init__(self, database, flush_interval: float = FLUSH_INTERVAL, state_ttl: float = STATE_TTL,
+                 cache_idle_ttl: float = CACHE_IDLE_TTL):
+        self.db = database
+        self.flush_interval = flush_interval
+        self.state_ttl = state_ttl
+        self.cache_idle_ttl = cache_idle_ttl
+        self.key_builder = DefaultKeyBuilder(with_bot_id=True, with_business_connection_id=True,
+                                             with_destiny=True)
+        self._cache = {}      # ключ -> [состояние, данные, время последнего изменения или чтения]
+        self._dirty = set()   # ключи, еще не записанные в БД
+        self._flusher = None
+        self._last_cleanup = 0.0
+
+    # ---- интерфейс BaseStorage ----
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        entry = await self._entry(key)
+        entry[0] = state.state if isinstance(state, State) else state
+        self._touch(key, entry)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._entry(key))[0]
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise TypeError(f"Data must be a dict, not {type(data).__name__}")
+        entry = await self._entry(key)
+        entry[1] = copy.deepcopy(data)
+        self._touch(key, entry)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return copy.deepcopy((await self._entry(key))[1])
+
+    async def close(self) -> None:
+        """Останавливает фоновую запись и сохраняет оставшиеся изменения"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
+
+    # ---- кэш в памяти ----
+
+    async def _entry(self, key: StorageKey) -> list:
+        storage_key = self.key_builder.build(key)
+        entry = self._cache.get(storage_key)
+        if entry is None:
+            loaded = await self.db.a.run(self._load, storage_key)
+            # Пока шло чтение, ключ мог быть записан - свежие данные в памяти важнее
+            entry = self._cache.setdefault(storage_key, loaded)
+            self._ensure_flusher()
+        entry[2] = time.time()
+        return entry
+
+    def _touch(self, key: StorageKey, entry: list):
+        entry[2] = time.time()
+        self._dirty.add(self.key_builder.build(key))
+        self._ensure_flusher()
+
+    def _ensure_flusher(self):
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    def _load(self, storage_key: str) -> list:
+        """Читает состояние из БД (выполняется в пуле потоков БД)"""
+        try:
+            with self.db.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    'SELECT state, data FROM fsm_states WHERE storage_key = ? AND updated_at >= ?',
+                    (storage_key, time.time() - self.state_ttl)
+                )
+                row = cursor.fetchone()
+        except Exception as e:
+            logger.error(f"Ошибка при чтении состояния FSM {storage_key}: {e}")
+            row = None
+
+        if not row:
+            return [None, {}, time.time()]
+        try:
+            data = pickle.loads(row[1]) if row[1] else {}
+        except Exception as e:
+            logger.error(f"Не удалось прочитать данные FSM {storage_key}: {e}")
+            data = {}
+        return [row[0], data, time.time()]
+
+    # ---- отложенная запись ----
+
+    async def _flush_loop(self):
+        """Фоновая задача: пишет изменения и вытесняет неактивные ключи, пока кэш не пуст"""
+        try:
+            while self._dirty or self._cache:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+                self._evict_idle()
+        except asyncio.CancelledError:
+            pass
+
+    async def flush(self):
+        """Записывает все измененные ключи в БД одной транзакцией"""
+        if not self._dirty:
+            return
+
+        upserts, deletes = [], []
+        for storage_key in self._dirty:
+            state, data, updated_at = self._cache[storage_key]
+            if state is None and not data:
+                deletes.append((storage_key,))
+                continue
+            try:
+                payload = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL) if data else None
+            except Exception as e:
+                logger.error(f"Данные FSM {storage_key} не сериализуются, остаются только в памяти: {e}")
+                continue
+            upserts.append((storage_key, state, payload, updated_at))
+        flushed = self._dirty
+        self._dirty = set()
+
+        cleanup_before = None
+        if time.time() - self._last_cleanup >= CLEANUP_INTERVAL:
+            cleanup_before = time.time() - self.state_ttl
+            self._last_cleanup = time.time()
+
+        try:
+            await self.db.a.run(self._write, upserts, deletes, cleanup_before)
+        except Exception as e:
+            logger.error(f"Ошибка при записи состояний FSM: {e}")
+            self._dirty |= flushed
+
+    def _write(self, upserts: list, deletes: list, cleanup_before: Optional[float]):
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            if upserts:
+                cursor.executemany('''
+                    INSERT INTO fsm_states (storage_key, state, data, updated_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(storage_key) DO UPDATE SET
+                        state = excluded.state,
+                        data = excluded.data,
+                        updated_at = excluded.updated_at
+                ''', upserts)
+            if deletes:
+                cursor.executemany('DELETE FROM fsm_states WHERE storage_key = ?', deletes)
+            if cleanup_before is not None:
+                cursor.execute('DELETE FROM fsm_states WHERE updated_at < ?', (cleanup_before,))
+                if cursor.rowcount:
+                    logger.info(f"Удалено устаревших состояний FSM: {cursor.rowcount}")
+            conn.commit()
+
+    def _evict_idle(self):
+        """Убирает из памяти давно не использованные и уже записанные ключи"""
+        threshold = time.time() - self.cache_idle_ttl
+        for storage_key in [k for k, entry in self._cache.items() if entry[2] < threshold]:
+            if storage_key not in self._dirty:
+                del self._cache[storage_key]
@@ -11,6 +11,9 @@ from database import db
 
 # Импортируем необходимые функции
 from handlers.start.welcome import show_main_menu
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 router = Router()
@@ -123,7 +126,7 @@ async def process_feedback_message(message: types.Message, state: FSMContext, bo
         await message.answer(
             "❌ Произошла ошибка при отправке обращения. Попробуйте позже."
         )
-        print(f"Error saving feedback: {e}")
+        logger.error(f"Error saving feedback: {e}")
     
     await state.clear()
 
@@ -76,26 +76,18 @@ async def process_confirmation(callback_query: types.CallbackQuery, state: FSMCo
                         await state.clear()
                         return
                     
-                    success_count = 0
-                    for student in group_students:
-                        # ИСПРАВЛЕННЫЙ ЛОГ - используем student из цикла
-                        logger.info(f"🔥 BEFORE ADD LESSON: tutor={tutor_id}, student={student['id']}, "
-                                f"date={full_datetime}, duration=60, price=500.0, group={group_id}")
-                        
-                        lesson_id = db.add_lesson(
-                            tutor_id=tutor_id,
-                            student_id=student['id'],
-                            lesson_date=full_datetime,
-                            duration=60,
-                            price=500.0,
-                            group_id=group_id
-                        )
-                        
-                        logger.info(f"🔥 AFTER ADD LESSON: result={lesson_id}")
-                        
-                        if lesson_id:
-                            success_count += 1
-                            created_lesson_ids.append(lesson_id)
+                    # Сессия группы и занятия всех учеников - одной транзакцией
+                    lesson_ids = db.add_group_lesson(
+                        tutor_id=tutor_id,
+                        group_id=group_id,
+                        lesson_date=full_datetime,
+                        duration=60,
+                        price=500.0
+                    )
+                    logger.info(f"🔥 AFTER ADD GROUP LESSON: result={lesson_ids}")
+                    
+                    success_count = len(lesson_ids)
+                    created_lesson_ids.extend(lesson_ids)
             
         else:
             # Единоразовые занятия
@@ -132,23 +124,16 @@ async def process_confirmation(callback_query: types.CallbackQuery, state: FSMCo
             else:
                 # Групповое единоразовое занятие
                 group_id = data.get('group_id')
-                group_students = db.get_students_by_group(group_id)
-                success_count = 0
-                
-                for student in group_students:
-                    logger.info(f"🔥 BEFORE ADD LESSON: tutor={tutor_id}, student={data.get('student_id')}, "
-                            f"date={full_datetime}, duration=60, price=1000, group=None")
-                    lesson_id = db.add_lesson(
-                        tutor_id=tutor_id,
-                        student_id=student['id'],
-                        lesson_date=full_datetime,
-                        duration=60,
-                        price=500.0,
-                        group_id=group_id
-                    )
-                    if lesson_id:
-                        success_count += 1
-                        created_lesson_ids.append(lesson_id)
+                # Сессия группы и занятия всех учеников - одной транзакцией
+                lesson_ids = db.add_group_lesson(
+                    tutor_id=tutor_id,
+                    group_id=group_id,
+                    lesson_date=full_datetime,
+                    duration=60,
+                    price=500.0
+                )
+                success_count = len(lesson_ids)
+                created_lesson_ids.extend(lesson_ids)
                 
                 if success_count == 0:
                     await callback_query.message.edit_text(
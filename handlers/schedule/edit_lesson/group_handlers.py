@@ -6,6 +6,9 @@ from database import db
 from .keyboards import *
 from .utils import *
 from handlers.schedule.states import EditLessonStates
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = Router()
 
@@ -39,6 +42,7 @@ async def show_group_edit_options(callback_query: types.CallbackQuery, state: FS
     
     await state.update_data(
         group_id=group_id,
+        lesson_id=representative_lesson['id'],
         group_lessons=group_lessons,
         selected_date=selected_date,
         selected_time=selected_time,
@@ -71,7 +75,7 @@ async def handle_group_back_button(callback_query: types.CallbackQuery, state: F
         from .utils import show_lessons_for_editing
         await show_lessons_for_editing(callback_query, state, selected_date)
     except Exception as e:
-        print(f"Ошибка в handle_group_back_button: {e}")
+        logger.error(f"Ошибка в handle_group_back_button: {e}")
         await callback_query.answer("⚠️ Произошла ошибка при загрузке занятий", show_alert=True)
 
 async def edit_group_datetime_start(callback_query: types.CallbackQuery, state: FSMContext):
@@ -112,12 +116,12 @@ async def process_new_group_time(message: types.Message, state: FSMContext):
     
     data = await state.get_data()
     new_date = data.get('new_date')
-    group_id = data.get('group_id')
+    lesson_id = data.get('lesson_id')
     
     db_datetime = format_datetime_for_db(new_date, message.text)
     
     # Обновляем в БД
-    success = db.update_group_lesson_datetime(group_id, db_datetime)
+    success = db.update_group_lesson_datetime(lesson_id, db_datetime)
     
     if success:
         await message.answer("✅ Дата и время ВСЕХ занятий группы успешно изменены!")
@@ -146,9 +150,9 @@ async def process_new_group_price(message: types.Message, state: FSMContext):
     
     price = result
     data = await state.get_data()
-    group_id = data.get('group_id')
+    lesson_id = data.get('lesson_id')
     
-    success = db.update_group_lesson_price(group_id, price)
+    success = db.update_group_lesson_price(lesson_id, price)
     
     if success:
         await message.answer(f"✅ Стоимость ВСЕХ занятий группы изменена на {price} руб.!")
@@ -177,9 +181,9 @@ async def process_new_group_duration(message: types.Message, state: FSMContext):
     
     duration = result
     data = await state.get_data()
-    group_id = data.get('group_id')
+    lesson_id = data.get('lesson_id')
     
-    success = db.update_group_lesson_duration(group_id, duration)
+    success = db.update_group_lesson_duration(lesson_id, duration)
     
     if success:
         await message.answer(f"✅ Длительность ВСЕХ занятий группы изменена на {duration} минут!")
@@ -216,10 +220,7 @@ async def confirm_delete_group_lessons(callback_query: types.CallbackQuery, stat
     data = await state.get_data()
     group_lessons = data.get('group_lessons', [])
     
-    success_count = 0
-    for lesson in group_lessons:
-        if db.delete_lesson(lesson['id']):
-            success_count += 1
+    success_count = db.delete_group_lesson(data.get('lesson_id'))
     
     # Получаем ID репетитора
     tutor_id = db.get_tutor_id_by_telegram_id(callback_query.from_user.id)
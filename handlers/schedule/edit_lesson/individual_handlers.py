@@ -95,7 +95,7 @@ async def process_new_time(message: types.Message, state: FSMContext):
     # Обновляем в БД
     success = False
     if lesson['group_id']:
-        success = db.update_group_lesson_datetime(lesson['group_id'], db_datetime)
+        success = db.update_group_lesson_datetime(lesson['id'], db_datetime)
         if success:
             await message.answer("✅ Дата и время ВСЕХ занятий группы успешно изменены!")
     else:
@@ -136,7 +136,7 @@ async def process_new_price(message: types.Message, state: FSMContext):
     
     success = False
     if lesson['group_id']:
-        success = db.update_group_lesson_price(lesson['group_id'], price)
+        success = db.update_group_lesson_price(lesson['id'], price)
         if success:
             await message.answer(f"✅ Стоимость ВСЕХ занятий группы изменена на {price} руб.!")
     else:
@@ -177,7 +177,7 @@ async def process_new_duration(message: types.Message, state: FSMContext):
     
     success = False
     if lesson['group_id']:
-        success = db.update_group_lesson_duration(lesson['group_id'], duration)
+        success = db.update_group_lesson_duration(lesson['id'], duration)
         if success:
             await message.answer(f"✅ Длительность ВСЕХ занятий группы изменена на {duration} минут!")
     else:
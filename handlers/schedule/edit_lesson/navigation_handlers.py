@@ -4,6 +4,9 @@ from aiogram.fsm.context import FSMContext
 from database import db
 
 from keyboards.main_menu import get_main_menu_keyboard
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = Router()
 
@@ -21,7 +24,7 @@ async def back_to_main_menu(callback_query: types.CallbackQuery, state: FSMConte
             parse_mode="HTML"
         )
     except Exception as e:
-        print(f"Ошибка в back_to_main_menu: {e}")
+        logger.error(f"Ошибка в back_to_main_menu: {e}")
         await callback_query.answer("⚠️ Произошла ошибка", show_alert=True)
 
 @router.callback_query(F.data == "edit_lesson")
@@ -45,7 +48,7 @@ async def back_to_edit_lesson(callback_query: types.CallbackQuery, state: FSMCon
             reply_markup=keyboard
         )
     except Exception as e:
-        print(f"Ошибка в back_to_edit_lesson: {e}")
+        logger.error(f"Ошибка в back_to_edit_lesson: {e}")
         await callback_query.answer("⚠️ Произошла ошибка при загрузке занятий", show_alert=True)
 
 @router.callback_query(F.data.startswith("edit_date_"))
@@ -59,7 +62,7 @@ async def back_to_date_lessons(callback_query: types.CallbackQuery, state: FSMCo
         from .utils import show_lessons_for_editing
         await show_lessons_for_editing(callback_query, state, selected_date)
     except Exception as e:
-        print(f"Ошибка в back_to_date_lessons: {e}")
+        logger.error(f"Ошибка в back_to_date_lessons: {e}")
         await callback_query.answer("⚠️ Произошла ошибка при загрузке занятий", show_alert=True)
 
 # Дополнительные обработчики для других кнопок "Назад"
@@ -77,7 +80,7 @@ async def back_to_schedule(callback_query: types.CallbackQuery, state: FSMContex
             parse_mode="HTML"
         )
     except Exception as e:
-        print(f"Ошибка в back_to_schedule: {e}")
+        logger.error(f"Ошибка в back_to_schedule: {e}")
         await callback_query.answer("⚠️ Произошла ошибка", show_alert=True)
 
 @router.callback_query(F.data == "back_to_students")
@@ -94,5 +97,5 @@ async def back_to_students(callback_query: types.CallbackQuery, state: FSMContex
             parse_mode="HTML"
         )
     except Exception as e:
-        print(f"Ошибка в back_to_students: {e}")
+        logger.error(f"Ошибка в back_to_students: {e}")
         await callback_query.answer("⚠️ Произошла ошибка", show_alert=True)
\ No newline at end of file
@@ -341,6 +341,7 @@ async def planner_enter_price(message: Message, state: FSMContext):
                 price
             ))
             conn.commit()
+            task_id = cursor.lastrowid
             
             # Получаем информацию о занятии для подтверждения
             lesson_info = await get_lesson_info_text(data, price)
@@ -348,8 +349,8 @@ async def planner_enter_price(message: Message, state: FSMContext):
             # Запускаем планер автоматически
             await planner_manager.start_planner()
             
-            # Сразу выполняем проверку для создания занятий
-            await planner_manager.force_check()
+            # Сразу создаем занятия только для новой задачи
+            await planner_manager.on_task_changed(task_id)
             
             # НОВОЕ СООБЩЕНИЕ С ОБНОВЛЕННЫМ ФОРМАТОМ
             await message.answer(
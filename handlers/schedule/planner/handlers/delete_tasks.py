@@ -94,6 +94,8 @@ async def planner_delete_task(callback: CallbackQuery):
             cursor.execute("DELETE FROM planner_actions WHERE id = ?", (task_id,))
             
             conn.commit()
+        # Таймер занятий перечитывает расписание без удаленных занятий
+        db.notify_lessons_changed()
         
         # Возвращаемся к списку задач
         tutor_id = db.get_tutor_id_by_telegram_id(callback.from_user.id)
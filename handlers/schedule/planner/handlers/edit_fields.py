@@ -7,7 +7,7 @@ import re
 import logging
 
 from handlers.schedule.planner.utils.task_helpers import get_task_by_id, show_task_edit_menu_after_edit
-from database import db
+from handlers.schedule.planner.timer.planner_manager import planner_manager
 
 
 router = Router()
@@ -107,13 +107,9 @@ async def process_time_input(message: Message, state: FSMContext):
     task_id = data.get('task_id')
     
     try:
-        with db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "UPDATE planner_actions SET time = ? WHERE id = ?",
-                (time_input, task_id)
-            )
-            conn.commit()
+        # Вместе с задачей меняются ее будущие запланированные занятия
+        if not await planner_manager.update_task_field(task_id, 'time', time_input):
+            raise RuntimeError(f"задача {task_id} не обновлена")
         
         # Получаем обновленную задачу
         task = get_task_by_id(task_id)
@@ -146,13 +142,9 @@ async def process_duration_input(message: Message, state: FSMContext):
     task_id = data.get('task_id')
     
     try:
-        with db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "UPDATE planner_actions SET duration = ? WHERE id = ?",
-                (duration, task_id)
-            )
-            conn.commit()
+        # Вместе с задачей меняются ее будущие запланированные занятия
+        if not await planner_manager.update_task_field(task_id, 'duration', duration):
+            raise RuntimeError(f"задача {task_id} не обновлена")
         
         task = get_task_by_id(task_id)
         await message.answer(f"✅ Длительность успешно изменена на <b>{duration}</b> минут")
@@ -183,13 +175,9 @@ async def process_price_input(message: Message, state: FSMContext):
     task_id = data.get('task_id')
     
     try:
-        with db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                "UPDATE planner_actions SET price = ? WHERE id = ?",
-                (price, task_id)
-            )
-            conn.commit()
+        # Вместе с задачей меняются ее будущие запланированные занятия
+        if not await planner_manager.update_task_field(task_id, 'price', price):
+            raise RuntimeError(f"задача {task_id} не обновлена")
         
         task = get_task_by_id(task_id)
         await message.answer(f"✅ Стоимость успешно изменена на <b>{price}</b> рублей")
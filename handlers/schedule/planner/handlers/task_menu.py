@@ -5,6 +5,7 @@ import logging
 
 from handlers.schedule.planner.utils.task_helpers import get_task_by_id, show_task_edit_menu
 from database import db
+from handlers.schedule.planner.timer.planner_manager import planner_manager
 
 
 router = Router()
@@ -82,6 +83,9 @@ async def planner_activate(callback: CallbackQuery):
             )
             conn.commit()
         
+        # Достраиваем расписание, пропущенное на время паузы
+        await planner_manager.on_task_changed(task_id)
+        
         # Получаем обновленную задачу и показываем обновленное меню
         task = get_task_by_id(task_id)
         if task:
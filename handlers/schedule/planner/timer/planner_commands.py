@@ -9,7 +9,6 @@ from commands.config import SUPER_ADMIN_ID
 from .planner_manager import planner_manager
 from database import db
 
-from payment.models import PaymentManager  # Добавляем импорт
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -144,28 +143,14 @@ async def _get_subscription_info() -> dict:
         with db.get_connection() as conn:
             cursor = conn.cursor()
             
-            # Получаем всех репетиторов с активными задачами планера
+            # Репетиторы с активными задачами планера и их подписки одним запросом
             cursor.execute('''
-            SELECT DISTINCT t.telegram_id 
-            FROM tutors t 
-            JOIN planner_actions pa ON pa.tutor_id = t.id 
-            WHERE pa.is_active = TRUE
+            SELECT COUNT(*), COUNT(s.tutor_id)
+            FROM (SELECT DISTINCT tutor_id FROM planner_actions WHERE is_active = TRUE) pa
+            LEFT JOIN active_subscriptions s ON s.tutor_id = pa.tutor_id
             ''')
-            tutors = cursor.fetchall()
-            
-            with_subscription = 0
-            without_subscription = 0
-            
-            # Проверяем подписку для каждого репетитора
-            for tutor in tutors:
-                telegram_id = tutor[0] if isinstance(tutor, tuple) else tutor['telegram_id']
-                
-                has_subscription = await PaymentManager.check_subscription(telegram_id)
-                
-                if has_subscription:
-                    with_subscription += 1
-                else:
-                    without_subscription += 1
+            total, with_subscription = cursor.fetchone()
+            without_subscription = total - with_subscription
             
             return {
                 'with_subscription': with_subscription,
@@ -1,14 +1,22 @@
 # handlers/schedule/planner/timer/planner_engine.py
 import asyncio
 import logging
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from datetime import date, datetime, time, timedelta
+from typing import List, Dict, Any, Optional
 from database import db
 
-from payment.models import PaymentManager  # Добавляем импорт
 
 logger = logging.getLogger(__name__)
 
+WEEKDAY_MAP = {
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+    'friday': 4, 'saturday': 5, 'sunday': 6
+}
+SQL_CHUNK = 500  # параметров в одном IN (...)
+HORIZON_DAYS = 21               # на сколько дней вперед поддерживается расписание
+DAILY_RUN_TIME = time(0, 5)     # ежедневный прогон: в горизонт входит новый день
+EDITABLE_FIELDS = ('time', 'duration', 'price')
+
 class PlannerEngine:
     def __init__(self):
         self.is_running = False
@@ -39,218 +47,316 @@ class PlannerEngine:
         logger.info("Планер остановлен")
     
     async def _planner_loop(self):
-        """Основной цикл планера"""
+        """Основной цикл планера: раз в сутки достраивает расписание на новый день горизонта"""
         while self.is_running:
             try:
-                # Проверяем каждые 6 часов
                 await self._check_and_create_lessons()
-                await asyncio.sleep(7 * 24 * 60 * 60)  # 6 часов (было 7 дней)
+                await asyncio.sleep(self._seconds_until_next_run())
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"Ошибка в цикле планера: {e}")
                 await asyncio.sleep(60)
     
-    async def _check_and_create_lessons(self):
-        """Проверяет и создает занятия на 2 недели вперед с проверкой подписки"""
+    @staticmethod
+    def _seconds_until_next_run() -> float:
+        now = datetime.now()
+        next_run = datetime.combine(now.date() + timedelta(days=1), DAILY_RUN_TIME)
+        return (next_run - now).total_seconds()
+
+    async def refresh(self, action_id: Optional[int] = None, tutor_id: Optional[int] = None) -> int:
+        """Сразу достраивает расписание одной задачи или всех задач репетитора
+        (после добавления, включения задачи или продления подписки)"""
+        return await self._check_and_create_lessons(action_id=action_id, tutor_id=tutor_id)
+
+    async def _check_and_create_lessons(self, force: bool = False, action_id: Optional[int] = None,
+                                        tutor_id: Optional[int] = None) -> int:
+        """Проверяет подписки и создает занятия на еще не покрытые дни горизонта.
+
+        force - пересчитать весь горизонт, а не только дни после covered_until
+        (недели, где занятие задачи есть, все равно пропускаются).
+        action_id / tutor_id - обработать только эту задачу / задачи репетитора.
+        Возвращает число созданных занятий.
+        """
         logger.info("Проверка планера: начало")
         
         try:
-            planner_tasks = self._get_all_planner_tasks()
+            planner_tasks = await db.a.run(self._get_all_planner_tasks, action_id, tutor_id)
             
             if not planner_tasks:
                 logger.info("Нет активных задач планера")
-                return
+                return 0
             
             # 🔥 ГРУППИРУЕМ ЗАДАЧИ ПО РЕПЕТИТОРАМ И ПРОВЕРЯЕМ ПОДПИСКУ
             tutors_tasks = {}
             for task in planner_tasks:
-                tutor_id = task['tutor_id']
-                if tutor_id not in tutors_tasks:
-                    tutors_tasks[tutor_id] = []
-                tutors_tasks[tutor_id].append(task)
+                tutors_tasks.setdefault(task['tutor_id'], []).append(task)
+            
+            # 🔥 ПОДПИСКИ ВСЕХ РЕПЕТИТОРОВ ОДНИМ ЗАПРОСОМ
+            subscriptions = await db.a.get_active_subscriptions()
+            if subscriptions is None:
+                logger.error("Проверка планера прервана: не удалось получить подписки")
+                return 0
+            subscribed_tutors = {row['tutor_id'] for row in subscriptions}
             
+            tasks_to_generate = []
+            unsubscribed_tutors = []
             for tutor_id, tasks in tutors_tasks.items():
-                # Получаем telegram_id репетитора для проверки подписки
-                telegram_id = self._get_tutor_telegram_id(tutor_id)
-                if not telegram_id:
-                    logger.warning(f"Не найден telegram_id для репетитора {tutor_id}")
-                    continue
-                
-                # 🔥 ПРОВЕРЯЕМ ПОДПИСКУ
-                has_active_subscription = await PaymentManager.check_subscription(telegram_id)
-                
-                if not has_active_subscription:
-                    # Отключаем все задачи этого репетитора
-                    self._deactivate_tutor_tasks(tutor_id)
-                    logger.info(f"Планер отключен для репетитора {tutor_id} (нет подписки)")
+                if tutor_id not in subscribed_tutors:
+                    unsubscribed_tutors.append(tutor_id)
                     continue
                 
-                # Если подписка активна - создаем занятия
-                for task in tasks:
-                    await self._create_lessons_for_task(task)
+                tasks_to_generate.extend(tasks)
+            
+            # Отключаем задачи репетиторов без подписки одним обращением к пулу БД
+            if unsubscribed_tutors:
+                await db.a.run(self._deactivate_tutor_tasks, unsubscribed_tutors)
+            
+            # Если подписка активна - создаем занятия одним проходом
+            created_count = await db.a.run(self._generate_lessons, tasks_to_generate, force)
             
-            logger.info(f"Проверка планера завершена. Обработано репетиторов: {len(tutors_tasks)}")
+            logger.info(
+                f"Проверка планера завершена. Обработано репетиторов: {len(tutors_tasks)}, "
+                f"создано занятий: {created_count}"
+            )
+            return created_count
             
         except Exception as e:
             logger.error(f"Ошибка при проверке планера: {e}")
+            return 0
     
-    def _get_tutor_telegram_id(self, tutor_id: int) -> int:
-        """Получает telegram_id репетитора"""
+    def _deactivate_tutor_tasks(self, tutor_ids: List[int]):
+        """Отключает все задачи планера для репетиторов без подписки одной транзакцией"""
         try:
             with db.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('SELECT telegram_id FROM tutors WHERE id = ?', (tutor_id,))
-                result = cursor.fetchone()
-                return result[0] if result else None
-        except Exception as e:
-            logger.error(f"Ошибка при получении telegram_id репетитора {tutor_id}: {e}")
-            return None
-    
-    def _deactivate_tutor_tasks(self, tutor_id: int):
-        """Отключает все задачи планера для репетитора"""
-        try:
-            with db.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
+                cursor.executemany('''
                 UPDATE planner_actions SET is_active = 0 WHERE tutor_id = ?
-                ''', (tutor_id,))
+                ''', [(tutor_id,) for tutor_id in tutor_ids])
                 conn.commit()
-                logger.info(f"Отключено задач планера для репетитора {tutor_id}")
+                for tutor_id in tutor_ids:
+                    logger.info(f"Планер отключен для репетитора {tutor_id} (нет подписки)")
         except Exception as e:
-            logger.error(f"Ошибка при отключении задач репетитора {tutor_id}: {e}")
+            logger.error(f"Ошибка при отключении задач репетиторов {tutor_ids}: {e}")
     
-    def _get_all_planner_tasks(self) -> List[Dict[str, Any]]:
-        """Получает все активные задачи планера"""
+    def _get_all_planner_tasks(self, action_id: Optional[int] = None,
+                               tutor_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Получает активные задачи планера (все, одну задачу или задачи репетитора)"""
         try:
             with db.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
+                query = '''
                 SELECT pa.*, 
                     s.full_name as student_name,
-                    g.name as group_name,
-                    (SELECT COUNT(*) FROM lessons l WHERE l.planner_action_id = pa.id) as lessons_count
+                    g.name as group_name
                 FROM planner_actions pa
                 LEFT JOIN students s ON pa.student_id = s.id
                 LEFT JOIN groups g ON pa.group_id = g.id
                 WHERE pa.is_active = TRUE
-                ORDER BY pa.tutor_id, pa.weekday, pa.time
-                ''')
+                '''
+                params = []
+                if action_id is not None:
+                    query += ' AND pa.id = ?'
+                    params.append(action_id)
+                if tutor_id is not None:
+                    query += ' AND pa.tutor_id = ?'
+                    params.append(tutor_id)
+                query += ' ORDER BY pa.tutor_id, pa.weekday, pa.time'
+                cursor.execute(query, params)
                 rows = cursor.fetchall()
                 return [dict(row) for row in rows]
         except Exception as e:
             logger.error(f"Ошибка при получении задач планера: {e}")
             return []
     
-    async def _create_lessons_for_task(self, task: Dict[str, Any]):
-        """Создает только недостающие занятия, не трогая существующие"""
+    def _generate_lessons(self, tasks: List[Dict[str, Any]], force: bool = False) -> int:
+        """Создает недостающие занятия для задач одной транзакцией, возвращает число занятий.
+
+        Каждая задача хранит covered_until - день, до которого расписание уже
+        построено, поэтому ежедневный прогон рассматривает только вошедший в
+        горизонт день. Существующие пары (задача, неделя) читаются одним запросом
+        по idx_lessons_planner, недостающие даты вставляются через executemany.
+        """
+        if not tasks:
+            return 0
+
+        now = datetime.now()
+        today = now.date()
+        horizon_end = today + timedelta(days=HORIZON_DAYS - 1)
+        window_start = (today - timedelta(days=today.weekday())).strftime('%Y-%m-%d')
+
+        # Дни каждой задачи, которые еще не покрыты расписанием
+        task_dates = {}
+        for task in tasks:
+            first_date = today
+            if task.get('covered_until') and not force:
+                covered_until = date.fromisoformat(str(task['covered_until'])[:10])
+                first_date = max(today, covered_until + timedelta(days=1))
+            dates = self._get_target_dates_for_weekday(task['weekday'], first_date)
+            if dates:
+                task_dates[task['id']] = dates
+
         try:
-            # Проверяем, нужно ли создавать занятия для этой задачи
-            if not self._should_create_lessons(task):
-                logger.debug(f"Пропускаем задачу {task['id']} - занятия уже актуальны")
-                return
-            
-            target_dates = self._get_target_dates_for_weekday(task['weekday'])
-            created_count = 0
-            
-            for target_date in target_dates:
-                # Создаем только если занятия НЕТ или оно было удалено
-                if not self._lesson_exists(task, target_date):
-                    self._create_lesson(task, target_date)
-                    created_count += 1
-                    logger.info(f"Создано занятие: {task.get('student_name') or task.get('group_name')} на {target_date}")
-                else:
-                    logger.debug(f"Занятие уже существует: {target_date} - пропускаем")
-            
-            # Обновляем время последнего создания ТОЛЬКО если создали новые занятия
-            if created_count > 0:
-                self._update_last_created(task['id'])
-                logger.info(f"Для задачи {task['id']} создано {created_count} новых занятий")
-            else:
-                logger.info(f"Для задачи {task['id']} все занятия уже существуют - ничего не создано")
-        
+            with db.get_connection() as conn:
+                cursor = conn.cursor()
+
+                existing_weeks = set()   # (id задачи, понедельник недели)
+                task_ids = list(task_dates)
+                for i in range(0, len(task_ids), SQL_CHUNK):
+                    chunk = task_ids[i:i + SQL_CHUNK]
+                    placeholders = ','.join('?' * len(chunk))
+                    cursor.execute(f'''
+                    SELECT DISTINCT planner_action_id, date(lesson_date, 'weekday 0', '-6 days')
+                    FROM lessons
+                    WHERE planner_action_id IN ({placeholders}) AND lesson_date >= ?
+                    ''', chunk + [window_start])
+                    existing_weeks.update((row[0], row[1]) for row in cursor.fetchall())
+
+                group_members = {}
+                group_ids = sorted({task['group_id'] for task in tasks
+                                    if task['id'] in task_dates and not task.get('student_id') and task.get('group_id')})
+                for i in range(0, len(group_ids), SQL_CHUNK):
+                    chunk = group_ids[i:i + SQL_CHUNK]
+                    placeholders = ','.join('?' * len(chunk))
+                    cursor.execute(
+                        f'SELECT group_id, student_id FROM student_groups WHERE group_id IN ({placeholders})',
+                        chunk
+                    )
+                    for group_id, student_id in cursor.fetchall():
+                        group_members.setdefault(group_id, []).append(student_id)
+
+                individual_rows, group_rows, updated_tasks = [], [], []
+                covered_tasks = [task['id'] for task in tasks if task['id'] not in task_dates]
+                for task in tasks:
+                    if task['id'] not in task_dates:
+                        continue
+                    if not task.get('student_id') and not group_members.get(task['group_id']):
+                        # В группе пока нет учеников: горизонт не считаем покрытым,
+                        # занятия создадутся следующим прогоном после добавления учеников
+                        continue
+                    covered_tasks.append(task['id'])
+
+                    lesson_time = datetime.strptime(task['time'], '%H:%M').time()
+                    created_dates = 0
+                    for target_date in task_dates[task['id']]:
+                        week_start = (target_date - timedelta(days=target_date.weekday())).strftime('%Y-%m-%d')
+                        if (task['id'], week_start) in existing_weeks:
+                            continue
+
+                        lesson_datetime = datetime.combine(target_date, lesson_time).strftime('%Y-%m-%d %H:%M:%S')
+                        if task.get('student_id'):
+                            # Индивидуальное занятие
+                            individual_rows.append((task['tutor_id'], task['student_id'], lesson_datetime,
+                                                    task['duration'], task['price'], task['id']))
+                        else:
+                            # Групповое занятие: по строке на каждого ученика группы
+                            for student_id in group_members[task['group_id']]:
+                                group_rows.append((task['tutor_id'], student_id, task['group_id'], lesson_datetime,
+                                                   task['duration'], task['price'], task['id']))
+                        created_dates += 1
+
+                    if created_dates:
+                        updated_tasks.append((now, task['id']))
+                        logger.info(f"Для задачи {task['id']} создано {created_dates} новых занятий")
+
+                if individual_rows:
+                    cursor.executemany('''
+                    INSERT INTO lessons (tutor_id, student_id, lesson_date, duration, price, status, planner_action_id)
+                    VALUES (?, ?, ?, ?, ?, 'planned', ?)
+                    ''', individual_rows)
+                if group_rows:
+                    cursor.executemany('''
+                    INSERT INTO lessons (tutor_id, student_id, group_id, lesson_date, duration, price, status,
+                                         planner_action_id)
+                    VALUES (?, ?, ?, ?, ?, ?, 'planned', ?)
+                    ''', group_rows)
+                # Время последнего создания обновляем ТОЛЬКО если создали новые занятия
+                if updated_tasks:
+                    cursor.executemany('''
+                    UPDATE planner_actions SET last_created = ? WHERE id = ?
+                    ''', updated_tasks)
+                # Горизонт покрыт: удаленные репетитором занятия не будут созданы снова
+                cursor.executemany('''
+                UPDATE planner_actions SET covered_until = ? WHERE id = ?
+                ''', [(horizon_end.isoformat(), task_id) for task_id in covered_tasks])
+
+                conn.commit()
         except Exception as e:
-            logger.error(f"Ошибка при создании занятий для задачи {task['id']}: {e}")
-    
-    def _should_create_lessons(self, task: Dict[str, Any]) -> bool:
-        """Проверяет, нужно ли создавать занятия для этой задачи"""
-        # Проверяем, есть ли вообще будущие занятия для этой задачи
-        with db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-            SELECT COUNT(*) FROM lessons 
-            WHERE planner_action_id = ? 
-            AND lesson_date > datetime('now')
-            ''', (task['id'],))
-            
-            has_future_lessons = cursor.fetchone()[0] > 0
-        
-        # Если есть будущие занятия - не создаем новые
-        if has_future_lessons:
-            logger.debug(f"Задача {task['id']} имеет будущие занятия - пропускаем")
-            return False
-        
-        # Если будущих занятий нет - создаем
-        logger.debug(f"Задача {task['id']} не имеет будущих занятий - создаем")
-        return True
+            logger.error(f"Ошибка при создании занятий планера: {e}")
+            return 0
 
-    def _get_target_dates_for_weekday(self, weekday: str) -> List[datetime]:
-        """Получает даты на 2 недели вперед для указанного дня недели"""
-        weekday_map = {
-            'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
-            'friday': 4, 'saturday': 5, 'sunday': 6
-        }
-        
-        target_weekday = weekday_map[weekday.lower()]
+        created_count = len(individual_rows) + len(group_rows)
+        if created_count:
+            # id вставленных строк executemany не возвращает - таймер перечитает горизонт
+            db.notify_lessons_changed()
+        return created_count
+
+    def _get_target_dates_for_weekday(self, weekday: str, start: Optional[date] = None) -> List[date]:
+        """Получает даты указанного дня недели от start (по умолчанию сегодня) до конца горизонта"""
+        target_weekday = WEEKDAY_MAP[weekday.lower()]
         today = datetime.now().date()
+        start = start or today
+        horizon_end = today + timedelta(days=HORIZON_DAYS - 1)
+
+        first = start + timedelta(days=(target_weekday - start.weekday()) % 7)
         dates = []
-        
-        # Смотрим на 2 недели вперед (14 дней)
-        for days_ahead in range(21):
-            future_date = today + timedelta(days=days_ahead)
-            if future_date.weekday() == target_weekday:
-                dates.append(future_date)
-        
+        while first <= horizon_end:
+            dates.append(first)
+            first += timedelta(days=7)
         return dates
-    
-    def _lesson_exists(self, task: Dict[str, Any], planned_date: datetime) -> bool:
-        """Проверяет, есть ли уже занятие для этой задачи на ЭТОЙ неделе"""
+
+    def update_action(self, action_id: int, field: str, value) -> bool:
+        """Меняет время, длительность или стоимость задачи вместе с ее будущими занятиями.
+
+        Время меняется только у занятий, которые стоят на прежнем времени задачи
+        (перенесенные вручную не трогаем).
+        """
+        if field not in EDITABLE_FIELDS:
+            raise ValueError(f"Поле задачи планера нельзя изменить: {field}")
+
+        now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        future = "planner_action_id = ? AND status = 'planned' AND lesson_date > ?"
         try:
             with db.get_connection() as conn:
                 cursor = conn.cursor()
-                
-                # Находим начало и конец недели для planned_date
-                week_start = planned_date - timedelta(days=planned_date.weekday())
-                week_end = week_start + timedelta(days=6)
-                
-                # Проверяем, есть ли ЛЮБОЕ занятие этой задачи на этой неделе
-                cursor.execute('''
-                SELECT COUNT(*) FROM lessons 
-                WHERE planner_action_id = ? 
-                AND DATE(lesson_date) BETWEEN DATE(?) AND DATE(?)
-                ''', (task['id'], week_start, week_end))
-                
-                exists = cursor.fetchone()[0] > 0
-                
-                if exists:
-                    # Логируем для отладки
-                    cursor.execute('''
-                    SELECT lesson_date FROM lessons 
-                    WHERE planner_action_id = ? 
-                    AND DATE(lesson_date) BETWEEN DATE(?) AND DATE(?)
-                    LIMIT 1
-                    ''', (task['id'], week_start, week_end))
-                    
-                    existing_lesson_date = cursor.fetchone()
-                    if existing_lesson_date:
-                        logger.debug(f"Занятие на неделе {week_start.strftime('%Y-%m-%d')} уже существует: {existing_lesson_date[0]}")
-                
-                return exists
-                    
+                cursor.execute('SELECT time FROM planner_actions WHERE id = ?', (action_id,))
+                row = cursor.fetchone()
+                if not row:
+                    return False
+
+                cursor.execute(f'UPDATE planner_actions SET {field} = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+                               (value, action_id))
+
+                if field == 'time':
+                    old_time = datetime.strptime(row[0], '%H:%M').strftime('%H:%M')
+                    new_time = datetime.strptime(value, '%H:%M').strftime('%H:%M')
+                    assignment = "lesson_date = date(lesson_date) || ' ' || ?"
+                    new_value = new_time + ':00'
+                    same_time = " AND strftime('%H:%M', lesson_date) = ?"
+                    params = (action_id, now_str, old_time)
+                else:
+                    assignment = f'{field} = ?'
+                    new_value = value
+                    same_time = ''
+                    params = (action_id, now_str)
+
+                cursor.execute(f'SELECT id FROM lessons WHERE {future}{same_time}', params)
+                lesson_ids = [r[0] for r in cursor.fetchall()]
+                cursor.execute(
+                    f'UPDATE lessons SET {assignment} WHERE {future}{same_time}',
+                    (new_value,) + params
+                )
+
+                conn.commit()
         except Exception as e:
-            logger.error(f"Ошибка при проверке существования занятия: {e}")
-            return True
+            logger.error(f"Ошибка при изменении задачи планера {action_id}: {e}")
+            return False
 
+        if lesson_ids:
+            db.notify_lessons_changed(lesson_ids)
+        logger.info(f"Задача планера {action_id}: {field} = {value}, обновлено занятий: {len(lesson_ids)}")
+        return True
+    
     def delete_lessons_by_planner_action(self, planner_action_id: int):
         """Удаляет все занятия, связанные с задачей планера"""
         try:
@@ -260,6 +366,7 @@ class PlannerEngine:
                 DELETE FROM lessons WHERE planner_action_id = ?
                 ''', (planner_action_id,))
                 conn.commit()
+                db.notify_lessons_changed()
                 logger.info(f"Удалены занятия для задачи планера {planner_action_id}")
         except Exception as e:
             logger.error(f"Ошибка при удалении занятий для задачи {planner_action_id}: {e}")
@@ -278,53 +385,4 @@ class PlannerEngine:
             logger.error(f"Ошибка при получении занятий для задачи {planner_action_id}: {e}")
             return []
 
-    def _create_lesson(self, task: Dict[str, Any], lesson_date: datetime):
-        """Создает занятие в базе данных"""
-        try:
-            with db.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                lesson_time = datetime.strptime(task['time'], '%H:%M').time()
-                lesson_datetime = datetime.combine(lesson_date, lesson_time)
-                
-                if task.get('student_id'):
-                    # Индивидуальное занятие
-                    cursor.execute('''
-                    INSERT INTO lessons (tutor_id, student_id, lesson_date, duration, price, status, planner_action_id)
-                    VALUES (?, ?, ?, ?, ?, 'planned', ?)
-                    ''', (task['tutor_id'], task['student_id'], lesson_datetime, 
-                        task['duration'], task['price'], task['id']))
-                else:
-                    # Групповое занятие
-                    cursor.execute('''
-                    SELECT student_id FROM student_groups WHERE group_id = ?
-                    ''', (task['group_id'],))
-                    
-                    students = cursor.fetchall()
-                    
-                    for student in students:
-                        cursor.execute('''
-                        INSERT INTO lessons (tutor_id, student_id, group_id, lesson_date, duration, price, status, planner_action_id)
-                        VALUES (?, ?, ?, ?, ?, ?, 'planned', ?)
-                        ''', (task['tutor_id'], student[0], task['group_id'], lesson_datetime,
-                            task['duration'], task['price'], task['id']))
-                
-                conn.commit()
-                
-        except Exception as e:
-            logger.error(f"Ошибка при создании занятия: {e}")
-            raise
-
-    def _update_last_created(self, task_id: int):
-        """Обновляет время последнего создания занятий для задачи"""
-        try:
-            with db.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                UPDATE planner_actions SET last_created = ? WHERE id = ?
-                ''', (datetime.now(), task_id))
-                conn.commit()
-        except Exception as e:
-            logger.error(f"Ошибка при обновлении last_created для задачи {task_id}: {e}")
-
 planner_engine = PlannerEngine()
@@ -30,14 +30,8 @@ class PlannerManager:
     async def force_check(self):
         """Принудительная проверка и создание занятий (игнорируя last_created)"""
         try:
-            # Временно отключаем проверку last_created для принудительной проверки
-            original_method = planner_engine._should_create_lessons
-            planner_engine._should_create_lessons = lambda task: True
-            
-            await planner_engine._check_and_create_lessons()
-            
-            # Восстанавливаем оригинальный метод
-            planner_engine._should_create_lessons = original_method
+            # force: не пропускаем задачи, у которых уже есть будущие занятия
+            await planner_engine._check_and_create_lessons(force=True)
             
             logger.info("Принудительная проверка планера выполнена")
             return True
@@ -45,6 +39,22 @@ class PlannerManager:
             logger.error(f"Ошибка при принудительной проверке: {e}")
             return False
     
+    async def on_task_changed(self, task_id: int):
+        """Сразу строит расписание добавленной или включенной задачи"""
+        try:
+            created = await planner_engine.refresh(action_id=task_id)
+            logger.info(f"Задача планера {task_id}: создано занятий {created}")
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка при обновлении расписания задачи {task_id}: {e}")
+            return False
+
+    async def update_task_field(self, task_id: int, field: str, value) -> bool:
+        """Меняет поле задачи и ее будущие запланированные занятия"""
+        from database import db
+
+        return await db.a.run(planner_engine.update_action, task_id, field, value)
+
     def get_planner_status(self) -> dict:
         """Возвращает статус планера"""
         return {
@@ -81,7 +91,11 @@ class PlannerManager:
                     logger.info(f"Планер отключен для репетитора {tutor_id}")
                 
                 conn.commit()
-                return True
+
+            if has_subscription:
+                # Дни, пропущенные без подписки, достраиваем сразу
+                await planner_engine.refresh(tutor_id=tutor_id)
+            return True
                 
         except Exception as e:
             logger.error(f"Ошибка при обновлении статуса планера для репетитора {telegram_id}: {e}")
@@ -69,7 +69,7 @@ async def is_user_tutor(telegram_id: int) -> bool:
 
 async def handle_deep_link(message: types.Message):
     args = message.text.split()
-    print(args)
+    logger.debug(f"Аргументы deep link: {args}")
     
     if len(args) < 2:
         await show_welcome_message(message)
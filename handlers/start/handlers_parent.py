@@ -248,47 +248,24 @@ async def handle_parent_tutors(callback_query: types.CallbackQuery):
 async def handle_parent_debts(callback_query: types.CallbackQuery):
     """Обработчик кнопки 'Посмотреть задолженности' - ИСПРАВЛЕННАЯ ВЕРСИЯ С parent_performance"""
     try:
-        # Получаем неоплаченные занятия родителя
-        unpaid_lessons = db.get_parent_unpaid_lessons(callback_query.from_user.id)
-        
-        # ОТЛАДОЧНАЯ ИНФОРМАЦИЯ - посмотрим что приходит
-        logger.info(f"🔍 ДАННЫЕ ОТ БАЗЫ: {unpaid_lessons}")
-        
-        # Дополнительная фильтрация на случай, если SQL запрос возвращает лишние записи
-        filtered_unpaid = []
-        for lesson in unpaid_lessons:
-            # Проверяем, что занятие действительно не оплачено
-            if lesson.get('lesson_paid') == 0 or lesson.get('lesson_paid') is None:
-                filtered_unpaid.append(lesson)
+        # Сводки по детям: количество и сумма долга без просмотра истории занятий
+        debtors = [
+            row for row in await db.a.get_parent_debt_rollups(callback_query.from_user.id)
+            if row['unpaid_count'] > 0
+        ]
         
-        if filtered_unpaid:
+        if debtors:
             response_text = "💰 <b>Неоплаченные занятия:</b>\n\n"
             total_debt = 0
             
-            # Группируем по ученикам
-            students_debts = {}
-            for lesson in filtered_unpaid:
-                student_name = lesson.get('student_name', 'Неизвестный ученик')
-                if student_name not in students_debts:
-                    students_debts[student_name] = []
-                students_debts[student_name].append(lesson)
-                total_debt += lesson['price']
-            
-            # ДОПОЛНИТЕЛЬНАЯ ОТЛАДКА - посмотрим структуру данных
-            logger.info(f"🔍 ГРУППИРОВКА ПО УЧЕНИКАМ: {students_debts}")
-            
-            for student_name, lessons in students_debts.items():
-                student_total = sum(lesson['price'] for lesson in lessons)
-                response_text += f"👤 <b>{student_name}:</b>\n"
-                response_text += f"   Неоплачено занятий: {len(lessons)}\n"
-                response_text += f"   Сумма: {student_total} руб.\n"
-                
-                # # Добавляем parent_performance для каждого ученика
-                # parent_performance = lessons[0].get('parent_performance')
-                
+            for debtor in debtors:
+                response_text += f"👤 <b>{debtor['student_name']}:</b>\n"
+                response_text += f"   Неоплачено занятий: {debtor['unpaid_count']}\n"
+                response_text += f"   Сумма: {debtor['unpaid_amount']:g} руб.\n"
                 response_text += "\n"
+                total_debt += debtor['unpaid_amount']
             
-            response_text += f"💵 <b>Общая задолженность:</b> {total_debt} руб.\n\n"
+            response_text += f"💵 <b>Общая задолженность:</b> {total_debt:g} руб.\n\n"
             response_text += "💳 Для оплаты свяжитесь с репетитором."
             
         else:
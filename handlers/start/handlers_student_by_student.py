@@ -6,6 +6,9 @@ from datetime import datetime
 
 from handlers.start.keyboards_start import get_student_welcome_keyboard
 from handlers.start.welcome import show_student_welcome  # Импортируем функцию из welcome.py
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Создаем роутер для учеников
 student_router = Router()
@@ -87,7 +90,7 @@ async def handle_student_settings(callback_query: types.CallbackQuery):
         )
         
     except Exception as e:
-        print(f"❌ Ошибка в handle_student_settings: {e}")
+        logger.error(f"❌ Ошибка в handle_student_settings: {e}")
         await callback_query.message.answer("❌ Произошла ошибка при отображении настроек")
     
     await callback_query.answer()
@@ -172,7 +175,7 @@ async def handle_student_homeworks(callback_query: types.CallbackQuery):
         )
         
     except Exception as e:
-        print(f"❌ Ошибка в handle_student_homeworks: {e}")
+        logger.error(f"❌ Ошибка в handle_student_homeworks: {e}")
         await callback_query.message.answer("❌ Произошла ошибка при получении данных о домашних работах")
     
     await callback_query.answer()
@@ -260,7 +263,7 @@ async def handle_student_upcoming_lessons(callback_query: types.CallbackQuery):
         
     except Exception as e:
         await callback_query.message.answer("❌ Произошла ошибка при получении данных о предстоящих занятиях")
-        print(f"Ошибка в handle_student_upcoming_lessons: {e}")
+        logger.error(f"Ошибка в handle_student_upcoming_lessons: {e}")
     
     await callback_query.answer()
 
@@ -282,7 +285,7 @@ async def handle_back_to_student_menu(callback_query: types.CallbackQuery):
         
     except Exception as e:
         await callback_query.message.answer("❌ Произошла ошибка при возврате в меню")
-        print(f"Ошибка в handle_back_to_student_menu: {e}")
+        logger.error(f"Ошибка в handle_back_to_student_menu: {e}")
     
     await callback_query.answer()
 
@@ -377,7 +380,7 @@ async def handle_student_unpaid_lessons(callback_query: types.CallbackQuery):
         )
         
     except Exception as e:
-        print(f"❌ Ошибка в handle_student_unpaid_lessons: {e}")
+        logger.error(f"❌ Ошибка в handle_student_unpaid_lessons: {e}")
         await callback_query.message.answer("❌ Произошла ошибка при получении данных о неоплаченных занятиях")
     
     await callback_query.answer()
\ No newline at end of file
@@ -203,18 +203,15 @@ async def show_registration_message(message: types.Message):
 
 async def show_main_menu(chat_id: int, message: types.Message = None, callback_query: types.CallbackQuery = None):
     """Универсальная функция для показа главного меню"""
-    from database import Database
     from aiogram.exceptions import TelegramBadRequest
     from datetime import datetime, date, timedelta
     
-    db = Database()
-    
     # Функция для форматирования чисел с пробелами
     def format_currency(amount):
         return f"{int(amount):,}".replace(",", " ") + " руб"
     
     # Получаем данные репетитора
-    tutor = db.get_tutor_by_telegram_id(chat_id)
+    tutor = await db.a.get_tutor_by_telegram_id(chat_id)
     
     if not tutor:
         error_text = "❌ Ошибка: не найдены данные репетитора"
@@ -263,7 +260,7 @@ async def show_main_menu(chat_id: int, message: types.Message = None, callback_q
                 has_active_subscription = bool(subscription_data)
     except Exception as e:
         logger.error(f"Error checking subscription: {e}")
-        has_active_subscription = db.check_tutor_subscription(tutor_id)
+        has_active_subscription = await db.a.check_tutor_subscription(tutor_id)
 
     # Получаем расписание на сегодня (без статистики)
     schedule_text = await get_today_schedule_text(tutor_id)
@@ -276,48 +273,23 @@ async def show_main_menu(chat_id: int, message: types.Message = None, callback_q
     
     if has_active_subscription:
         try:
-            # Получаем статистику заработка за сегодня (ВСЕ занятия, любой статус)
-            today_earnings = 0
-            try:
-                today = datetime.now().date()
-                with db.get_connection() as conn:
-                    cursor = conn.cursor()
-                    cursor.execute('''
-                    SELECT COALESCE(SUM(price), 0) as total_earnings
-                    FROM lessons 
-                    WHERE tutor_id = ? 
-                    AND DATE(lesson_date) = DATE('now')
-                    ''', (tutor_id,))
-                    result = cursor.fetchone()
-                    today_earnings = result[0] if result else 0
-            except Exception as e:
-                logger.error(f"Error calculating today earnings: {e}")
-                today_earnings = 0
+            # Статистика за сегодня - одним запросом, заработок за месяцы - из tutor_monthly_rollups
+            today = datetime.now().date()
+            tomorrow = today + timedelta(days=1)
+            current_month = today.month
+            month_start = today.replace(day=1)
+            prev_month_start = (month_start - timedelta(days=1)).replace(day=1)
+            prev_month = prev_month_start.month
+            current_key = month_start.strftime('%Y-%m')
+            prev_key = prev_month_start.strftime('%Y-%m')
 
-            # Получаем статистику заработка за месяц
-            current_month = datetime.now().month
-            current_year = datetime.now().year
-            
-            current_month_earnings = db.get_earnings_by_period(
-                tutor_id, 
-                date(current_year, current_month, 1), 
-                datetime.now().date()
-            )
-            
-            if current_month == 1:
-                prev_month = 12
-                prev_year = current_year - 1
-            else:
-                prev_month = current_month - 1
-                prev_year = current_year
-            
-            prev_month_earnings = db.get_earnings_by_period(
-                tutor_id,
-                date(prev_year, prev_month, 1),
-                date(prev_year, prev_month, 1).replace(day=28) + timedelta(days=4)
-            )
-            
-            active_students_count = db.get_active_students_count(tutor_id)
+            stats = await db.a.get_tutor_statistics(tutor_id, {'today': (today, tomorrow)})
+            monthly = await db.a.get_tutor_monthly_earnings(tutor_id, [current_key, prev_key])
+            # Сегодня - ВСЕ занятия, любой статус; за месяцы - проведенные и оплаченные
+            today_earnings = stats['periods']['today']['total_earnings']
+            current_month_earnings = monthly[current_key]['paid_earnings']
+            prev_month_earnings = monthly[prev_key]['paid_earnings']
+            active_students_count = stats['active_students']
             
             # Обновляем статистику с форматированием валюты
             statistics_text = (
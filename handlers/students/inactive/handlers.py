@@ -2,7 +2,7 @@ from aiogram import Router, F, types
 from aiogram.fsm.context import FSMContext
 import logging
 import asyncio
-from database import Database
+from database import db
 
 from .keyboards import (
     get_inactive_students_keyboard,
@@ -27,7 +27,6 @@ async def show_inactive_students(callback: types.CallbackQuery, state: FSMContex
         logger.info(f"🔄 Показать неактивных учеников. User: {callback.from_user.id}")
         await callback.answer()
         
-        db = Database()
         telegram_id = callback.from_user.id
         
         # Сначала получаем tutor_id из базы данных
@@ -76,7 +75,6 @@ async def handle_inactive_pagination(callback: types.CallbackQuery, state: FSMCo
         await callback.answer()
         
         page = int(callback.data.split("_")[2])
-        db = Database()
         telegram_id = callback.from_user.id
         
         # Сначала получаем tutor_id
@@ -111,7 +109,6 @@ async def show_inactive_student_detail(callback: types.CallbackQuery, state: FSM
         await callback.answer()
         
         student_id = int(callback.data.split("_")[2])
-        db = Database()
         
         student = await run_in_executor(db.get_student_by_id, student_id)
         
@@ -146,7 +143,6 @@ async def activate_student_handler(callback: types.CallbackQuery, state: FSMCont
         student_id = int(callback.data.split("_")[2])
         logger.info(f"🔄 Активация ученика ID: {student_id}")
         
-        db = Database()
         success = await run_in_executor(db.activate_student, student_id)
         
         if success:
@@ -19,8 +19,8 @@ async def start_student_comment_editing(callback_query: CallbackQuery, state: FS
     """Начало редактирования комментария ученику"""
     await callback_query.answer()
 
-    print(f"DEBUG: callback data = {callback_query.data}")
-    print(f"DEBUG: split result = {callback_query.data.split('_')}")
+    logger.debug(f"callback data = {callback_query.data}")
+    logger.debug(f"split result = {callback_query.data.split('_')}")
     
     try:
         # Берем ID отчета (последний элемент после разделения по '_')
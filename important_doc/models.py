@@ -2,6 +2,9 @@ import sqlite3
 import os
 from typing import List, Tuple, Optional
 from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
 
 class DatabaseManager:
     """Менеджер для работы с базой данных"""
@@ -71,7 +74,7 @@ class ConsentManager:
                 return True
                 
         except sqlite3.Error as e:
-            print(f"Database error in save_consent: {e}")
+            logger.error(f"Database error in save_consent: {e}")
             return False
     
     def has_user_consents(self, telegram_id: int) -> bool:
@@ -90,7 +93,7 @@ class ConsentManager:
                 return count >= 2  # Оба согласия приняты
                 
         except sqlite3.Error as e:
-            print(f"Database error in has_user_consents: {e}")
+            logger.error(f"Database error in has_user_consents: {e}")
             return False
     
     def get_user_consent_status(self, telegram_id: int) -> List[Tuple]:
@@ -109,7 +112,7 @@ class ConsentManager:
                 return cursor.fetchall()
                 
         except sqlite3.Error as e:
-            print(f"Database error in get_user_consent_status: {e}")
+            logger.error(f"Database error in get_user_consent_status: {e}")
             return []
     
     def get_user_consent_details(self, telegram_id: int, document_type: str) -> Optional[Tuple]:
@@ -130,7 +133,7 @@ class ConsentManager:
                 return cursor.fetchone()
                 
         except sqlite3.Error as e:
-            print(f"Database error in get_user_consent_details: {e}")
+            logger.error(f"Database error in get_user_consent_details: {e}")
             return None
     
     def get_all_user_consents(self, telegram_id: int) -> List[Tuple]:
@@ -150,7 +153,7 @@ class ConsentManager:
                 return cursor.fetchall()
                 
         except sqlite3.Error as e:
-            print(f"Database error in get_all_user_consents: {e}")
+            logger.error(f"Database error in get_all_user_consents: {e}")
             return []
     
     def get_users_without_consents(self) -> List[int]:
@@ -173,7 +176,7 @@ class ConsentManager:
                 return [row[0] for row in cursor.fetchall()]
                 
         except sqlite3.Error as e:
-            print(f"Database error in get_users_without_consents: {e}")
+            logger.error(f"Database error in get_users_without_consents: {e}")
             return []
     
     def get_consent_statistics(self) -> dict:
@@ -215,7 +218,7 @@ class ConsentManager:
                 }
                 
         except sqlite3.Error as e:
-            print(f"Database error in get_consent_statistics: {e}")
+            logger.error(f"Database error in get_consent_statistics: {e}")
             return {}
 
 # Создаем экземпляры менеджеров для импорта
@@ -80,9 +80,9 @@ class LessonReportHandlers:
             self.utils.cancel_report
         )
 
-    async def notify_tutor_about_lesson_end(self, bot):
+    async def notify_tutor_about_lesson_end(self, bot, lesson_ids):
         """Прокси-метод для планировщика"""
-        return await self.scheduler.notify_tutor_about_lesson_end(bot)
+        return await self.scheduler.notify_tutor_about_lesson_end(bot, lesson_ids)
 
     def get_handlers(self):
         """Возвращает обработчики для отчетов"""
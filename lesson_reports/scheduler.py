@@ -1,7 +1,5 @@
 import logging
 import sqlite3
-import asyncio
-from datetime import datetime
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 logger = logging.getLogger(__name__)
@@ -10,50 +8,49 @@ class LessonScheduler:
     def __init__(self, db):
         self.db = db
 
-    async def notify_tutor_about_lesson_end(self, bot):
-        """Уведомляет репетитора об окончании занятия"""
-        logger.info("🚀 Запуск планировщика уведомлений о завершении занятий")
-        while True:
-            try:
-                logger.info("🔍 Проверка завершенных занятий...")
-                now = datetime.now()
-                now_str = now.strftime('%Y-%m-%d %H:%M:%S')
-                
-                with self.db.get_connection() as conn:
-                    conn.row_factory = sqlite3.Row
-                    cursor = conn.cursor()
-                    
-                    # Получаем ID первого занятия в группе для callback_data
-                    cursor.execute('''
-                    SELECT l.group_id, l.lesson_date, l.duration, 
-                        t.telegram_id as tutor_telegram_id,
-                        g.name as group_name,
-                        COUNT(l.id) as student_count,
-                        GROUP_CONCAT(s.full_name) as student_names,
-                        MIN(l.id) as first_lesson_id
-                    FROM lessons l
-                    JOIN tutors t ON l.tutor_id = t.id
-                    LEFT JOIN groups g ON l.group_id = g.id
-                    LEFT JOIN students s ON l.student_id = s.id
-                    WHERE l.status = 'planned'
-                    AND datetime(l.lesson_date, '+' || l.duration || ' minutes') 
-                    BETWEEN datetime(?) AND datetime(?, '+5 minutes')
-                    GROUP BY l.group_id, l.lesson_date, l.duration, t.telegram_id, g.name
-                    ''', (now_str, now_str))
-                    
-                    lessons = cursor.fetchall()
-                    logger.info(f"Найдено завершенных занятий (группировано): {len(lessons)}")
-                    
-                    for lesson in lessons:
-                        await self._send_lesson_notification(bot, conn, cursor, dict(lesson))
-                
-                await asyncio.sleep(60)
+    async def notify_tutor_about_lesson_end(self, bot, lesson_ids):
+        """Уведомляет репетитора об окончании занятий (вызывается LessonTimer в момент окончания)"""
+        try:
+            # Запрос выполняется в пуле потоков БД, не блокируя обработку апдейтов
+            lessons = await self.db.a.run(self._get_finished_lessons, lesson_ids)
+            logger.info(f"Найдено завершенных занятий (группировано): {len(lessons)}")
+            
+            for lesson in lessons:
+                await self._send_lesson_notification(bot, lesson)
                 
-            except Exception as e:
-                logger.error(f"❌ Ошибка в фоновой задаче: {e}")
-                await asyncio.sleep(60)
+        except Exception as e:
+            logger.error(f"❌ Ошибка при уведомлении о завершении занятий: {e}")
+
+    def _get_finished_lessons(self, lesson_ids):
+        """Возвращает завершившиеся занятия из lesson_ids (группы свернуты в одну строку)"""
+        if not lesson_ids:
+            return []
 
-    async def _send_lesson_notification(self, bot, conn, cursor, lesson_dict):
+        with self.db.get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            # Получаем ID первого занятия в группе для callback_data
+            placeholders = ','.join('?' * len(lesson_ids))
+            cursor.execute(f'''
+            SELECT l.group_id, l.lesson_date, l.duration, 
+                t.telegram_id as tutor_telegram_id,
+                g.name as group_name,
+                COUNT(l.id) as student_count,
+                GROUP_CONCAT(s.full_name) as student_names,
+                MIN(l.id) as first_lesson_id
+            FROM lessons l
+            JOIN tutors t ON l.tutor_id = t.id
+            LEFT JOIN groups g ON l.group_id = g.id
+            LEFT JOIN students s ON l.student_id = s.id
+            WHERE l.status = 'planned'
+            AND l.id IN ({placeholders})
+            GROUP BY COALESCE(l.group_id || ' ' || l.lesson_date, -l.id)
+            ''', list(lesson_ids))
+            
+            return [dict(row) for row in cursor.fetchall()]
+
+    async def _send_lesson_notification(self, bot, lesson_dict):
         """Отправляет уведомление о завершении занятия"""
         tutor_id = lesson_dict['tutor_telegram_id']
         group_id = lesson_dict['group_id']
@@ -101,28 +98,29 @@ class LessonScheduler:
             )
             
             # Обновляем статус ВСЕХ занятий этой группы
-            await self._update_lesson_status(conn, cursor, group_id, start_time, lesson_dict['student_names'])
+            await self.db.a.run(self._update_lesson_status, lesson_dict['group_id'], lesson_dict['lesson_date'],
+                                first_lesson_id)
             
             logger.info(f"✅ Уведомление отправлено репетитору {tutor_id}")
             
         except Exception as e:
             logger.error(f"❌ Ошибка отправки уведомления: {e}")
 
-    async def _update_lesson_status(self, conn, cursor, group_id, start_time, student_names):
-        """Обновляет статус занятий"""
-        if group_id:
-            cursor.execute('''
-            UPDATE lessons 
-            SET status = 'completed' 
-            WHERE group_id = ? AND lesson_date = ? AND status = 'planned'
-            ''', (group_id, start_time))
-        else:
-            cursor.execute('''
-            UPDATE lessons 
-            SET status = 'completed' 
-            WHERE student_id IN (
-                SELECT id FROM students WHERE full_name = ?
-            ) AND lesson_date = ? AND status = 'planned'
-            ''', (student_names, start_time))
-        
-        conn.commit()
+    def _update_lesson_status(self, group_id, lesson_date, lesson_id):
+        """Отмечает занятие проведенным: групповое - все строки учеников этого проведения, индивидуальное - по id"""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            if group_id:
+                cursor.execute('''
+                UPDATE lessons 
+                SET status = 'completed' 
+                WHERE group_id = ? AND lesson_date = ? AND status = 'planned'
+                ''', (group_id, lesson_date))
+            else:
+                cursor.execute('''
+                UPDATE lessons 
+                SET status = 'completed' 
+                WHERE id = ? AND status = 'planned'
+                ''', (lesson_id,))
+            
+            conn.commit()
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""Логирование бота через очередь: обработчики пишут в фоне, ротированные файлы сжимаются gzip"""
+
+import atexit
+import gzip
+import logging
+import os
+import queue
+import shutil
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_DIR = 'logs'
+LOG_FILE = os.path.join(LOG_DIR, 'bot.log')
+LOG_MAX_BYTES = 10 * 1024 * 1024   # 10 MB
+LOG_BACKUP_COUNT = 5
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_listener = None
+
+
+class GzipRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler, который сжимает ротированные файлы: bot.log.1.gz ... bot.log.5.gz"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.namer = self._gzip_name
+        self.rotator = self._gzip_rotate
+
+    @staticmethod
+    def _gzip_name(name: str) -> str:
+        return name if name.endswith('.gz') else name + '.gz'
+
+    @staticmethod
+    def _gzip_rotate(source: str, dest: str):
+        with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+
+def setup_logging(log_file: str = LOG_FILE, level: int = logging.INFO) -> QueueListener:
+    """Настраивает корневой логгер на запись через очередь.
+
+    В корневом логгере остается только QueueHandler: вызов logger.info() в
+    обработчике лишь кладет запись в очередь. Запись в файл, ротацию и вывод
+    в консоль выполняет поток QueueListener. Повторный вызов перенастраивает
+    логирование, останавливая предыдущий поток.
+    """
+    global _listener
+    stop_logging()
+
+    os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+    formatter = logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+
+    # Файловый обработчик с ротацией и сжатием
+    file_handler = GzipRotatingFileHandler(
+        filename=log_file,
+        maxBytes=LOG_MAX_BYTES,
+        backupCount=LOG_BACKUP_COUNT,
+        encoding='utf-8'
+    )
+    file_handler.setFormatter(formatter)
+    file_handler.setLevel(level)
+
+    # Консольный обработчик
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+    console_handler.setLevel(level)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.handlers.clear()
+    root.addHandler(QueueHandler(log_queue))
+
+    _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+
+    # Устанавливаем уровень для библиотек
+    logging.getLogger('aiogram').setLevel(logging.WARNING)
+    logging.getLogger('asyncio').setLevel(logging.WARNING)
+
+    return _listener
+
+
+def stop_logging():
+    """Дописывает оставшиеся в очереди записи и закрывает файлы логов"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+atexit.register(stop_logging)
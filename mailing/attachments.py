@@ -0,0 +1,92 @@
+# mailing/attachments.py
+import asyncio
+import logging
+import os
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile
+
+from .models import BonusMailing
+from database import db
+from send_queue import send_queue
+
+logger = logging.getLogger(__name__)
+
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif')
+
+
+class MailingAttachments:
+    """Вложения рассылок: файл загружается в Telegram один раз, дальше уходит по file_id.
+
+    file_id хранятся в bonus_mailings.file_ids рядом с file_paths и переживают рестарт.
+    """
+
+    def __init__(self, bonus_mailing: BonusMailing):
+        self.bonus_mailing = bonus_mailing
+        self._file_ids = {}  # (mailing_id, путь, тип) -> file_id
+        self._locks = {}
+
+    async def send(self, bot, chat_id, mailing: dict, file_path: str, caption: str = None,
+                   photos: bool = False) -> bool:
+        """Отправляет вложение рассылки; возвращает False, если файла нет на диске.
+
+        photos=True отправляет изображения как фото, остальное - документом.
+        """
+        is_photo = photos and os.path.splitext(file_path)[1].lower() in PHOTO_EXTENSIONS
+        kind = 'photo' if is_photo else 'document'
+        key = (mailing['id'], file_path, kind)
+
+        if key not in self._file_ids:
+            stored = BonusMailing.parse_file_ids(mailing).get(file_path, {}).get(kind)
+            if stored:
+                self._file_ids[key] = stored
+
+        file_id = self._file_ids.get(key)
+        if file_id:
+            try:
+                await self._send(bot, chat_id, kind, file_id, caption)
+                return True
+            except TelegramBadRequest as e:
+                # file_id мог устареть (например, сменился токен бота) - загрузим заново
+                logger.warning(f"file_id для {file_path} не принят: {e}")
+                self._file_ids.pop(key, None)
+
+        # Первую загрузку делает один получатель, остальные ждут готовый file_id
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            file_id = self._file_ids.get(key)
+            if file_id:
+                await self._send(bot, chat_id, kind, file_id, caption)
+                return True
+
+            if not os.path.exists(file_path):
+                logger.error(f"Файл не найден: {file_path}")
+                return False
+
+            with open(file_path, 'rb') as file:
+                input_file = BufferedInputFile(file.read(), filename=os.path.basename(file_path))
+
+            sent = await self._send(bot, chat_id, kind, input_file, caption)
+            file_id = sent.photo[-1].file_id if kind == 'photo' else sent.document.file_id
+            self._file_ids[key] = file_id
+            await db.a.run(self.bonus_mailing.save_file_id, mailing['id'], file_path, kind, file_id)
+            logger.info(f"Файл {os.path.basename(file_path)} загружен, file_id сохранен")
+            return True
+
+    def forget(self, mailing_id: int):
+        """Сбрасывает закэшированные file_id рассылки (файлы заменены или удалены)"""
+        for key in [key for key in self._file_ids if key[0] == mailing_id]:
+            self._file_ids.pop(key, None)
+            self._locks.pop(key, None)
+
+    async def _send(self, bot, chat_id, kind, file, caption):
+        if kind == 'photo':
+            return await send_queue.call(chat_id, lambda: bot.send_photo(
+                chat_id=chat_id, photo=file, caption=caption
+            ))
+        return await send_queue.call(chat_id, lambda: bot.send_document(
+            chat_id=chat_id, document=file, caption=caption
+        ))
+
+
+# Общий кэш вложений для планировщика и команд рассылки
+attachments = MailingAttachments(BonusMailing(db))
@@ -12,8 +12,12 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.utils.keyboard import InlineKeyboardButton, InlineKeyboardMarkup
 
 from commands.config import SUPER_ADMIN_ID
+from .attachments import attachments
 from .models import BonusMailing, MailingConfig
 from database import db
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 # Создаем роутер
@@ -501,7 +505,7 @@ async def toggle_mailing(callback: CallbackQuery):
         
     except Exception as e:
         await callback.answer("❌ Ошибка при обработке запроса", show_alert=True)
-        print(f"Ошибка в toggle_mailing: {e}")
+        logger.error(f"Ошибка в toggle_mailing: {e}")
 
 @mailing_router.callback_query(F.data.startswith("change_start_"))
 async def change_start_date(callback: CallbackQuery, state: FSMContext):
@@ -609,6 +613,7 @@ async def save_files(callback: CallbackQuery, state: FSMContext):
                 pass
     
     bonus_mailing.update_mailing(mailing_id, file_paths=file_paths)
+    attachments.forget(mailing_id)
     await callback.answer("✅ Файлы обновлены!", show_alert=True)
     await state.clear()
     
@@ -651,6 +656,7 @@ async def delete_mailing(callback: CallbackQuery):
                 pass
     
     bonus_mailing.delete_mailing(mailing_id)
+    attachments.forget(mailing_id)
     await callback.answer("✅ Рассылка удалена!", show_alert=True)
     await show_bonus_planner(callback)
 
@@ -846,30 +852,8 @@ async def test_mailing_now(message: Message):
                     for file_path in files:
                         if os.path.exists(file_path):
                             try:
-                                # Определяем тип файла по расширению
-                                file_ext = os.path.splitext(file_path)[1].lower()
-                                
-                                with open(file_path, 'rb') as file:
-                                    file_data = file.read()
-                                
-                                from aiogram.types import BufferedInputFile
-                                input_file = BufferedInputFile(
-                                    file_data,
-                                    filename=os.path.basename(file_path)
-                                )
-                                
-                                if file_ext in ['.jpg', '.jpeg', '.png', '.gif']:
-                                    # Отправляем как фото
-                                    await message.bot.send_photo(
-                                        chat_id=message.from_user.id,
-                                        photo=input_file
-                                    )
-                                else:
-                                    # Отправляем как документ
-                                    await message.bot.send_document(
-                                        chat_id=message.from_user.id,
-                                        document=input_file
-                                    )
+                                # Файл загружается один раз, дальше отправляется по file_id
+                                await attachments.send(message.bot, message.from_user.id, mailing, file_path, photos=True)
                                     
                             except Exception as file_error:
                                 await message.answer(f"❌ Ошибка отправки файла: {str(file_error)}")
@@ -956,30 +940,8 @@ async def final_test_mailing(message: Message):
                     for file_path in files:
                         if os.path.exists(file_path):
                             try:
-                                # Определяем тип файла по расширению
-                                file_ext = os.path.splitext(file_path)[1].lower()
-                                
-                                with open(file_path, 'rb') as file:
-                                    file_data = file.read()
-                                
-                                from aiogram.types import BufferedInputFile
-                                input_file = BufferedInputFile(
-                                    file_data,
-                                    filename=os.path.basename(file_path)
-                                )
-                                
-                                if file_ext in ['.jpg', '.jpeg', '.png', '.gif']:
-                                    # Отправляем как фото
-                                    await message.bot.send_photo(
-                                        chat_id=message.from_user.id,
-                                        photo=input_file
-                                    )
-                                else:
-                                    # Отправляем как документ
-                                    await message.bot.send_document(
-                                        chat_id=message.from_user.id,
-                                        document=input_file
-                                    )
+                                # Файл загружается один раз, дальше отправляется по file_id
+                                await attachments.send(message.bot, message.from_user.id, mailing, file_path, photos=True)
                                     
                             except Exception as file_error:
                                 await message.answer(f"❌ Ошибка отправки файла: {str(file_error)}")
@@ -1075,33 +1037,11 @@ async def start_mailing(message: Message):
                         for file_path in files:
                             if os.path.exists(file_path):
                                 try:
-                                    # Определяем тип файла по расширению
-                                    file_ext = os.path.splitext(file_path)[1].lower()
-                                    
-                                    with open(file_path, 'rb') as file:
-                                        file_data = file.read()
-                                    
-                                    from aiogram.types import BufferedInputFile
-                                    input_file = BufferedInputFile(
-                                        file_data,
-                                        filename=os.path.basename(file_path)
-                                    )
-                                    
-                                    if file_ext in ['.jpg', '.jpeg', '.png', '.gif']:
-                                        # Отправляем как фото
-                                        await message.bot.send_photo(
-                                            chat_id=user_id,
-                                            photo=input_file
-                                        )
-                                    else:
-                                        # Отправляем как документ
-                                        await message.bot.send_document(
-                                            chat_id=user_id,
-                                            document=input_file
-                                        )
+                                    # Файл загружается один раз, дальше отправляется по file_id
+                                    await attachments.send(message.bot, user_id, mailing, file_path, photos=True)
                                         
                                 except Exception as file_error:
-                                    print(f"Ошибка отправки файла пользователю {user_id}: {str(file_error)}")
+                                    logger.error(f"Ошибка отправки файла пользователю {user_id}: {str(file_error)}")
                     
                     mailing_sent += 1
                     total_sent += 1
@@ -1112,7 +1052,7 @@ async def start_mailing(message: Message):
                 except Exception as e:
                     mailing_errors += 1
                     total_errors += 1
-                    print(f"Ошибка отправки пользователю {user_id}: {str(e)}")
+                    logger.error(f"Ошибка отправки пользователю {user_id}: {str(e)}")
             
             await message.answer(
                 f"📊 Результаты рассылки #{mailing['id']}:\n"
@@ -1346,30 +1286,8 @@ async def start_real_mailing(message: Message):
                         for file_path in files:
                             if os.path.exists(file_path):
                                 try:
-                                    # Определяем тип файла по расширению
-                                    file_ext = os.path.splitext(file_path)[1].lower()
-                                    
-                                    with open(file_path, 'rb') as file:
-                                        file_data = file.read()
-                                    
-                                    from aiogram.types import BufferedInputFile
-                                    input_file = BufferedInputFile(
-                                        file_data,
-                                        filename=os.path.basename(file_path)
-                                    )
-                                    
-                                    if file_ext in ['.jpg', '.jpeg', '.png', '.gif']:
-                                        # Отправляем как фото
-                                        await message.bot.send_photo(
-                                            chat_id=user_id,
-                                            photo=input_file
-                                        )
-                                    else:
-                                        # Отправляем как документ
-                                        await message.bot.send_document(
-                                            chat_id=user_id,
-                                            document=input_file
-                                        )
+                                    # Файл загружается один раз, дальше отправляется по file_id
+                                    await attachments.send(message.bot, user_id, mailing, file_path, photos=True)
                                         
                                 except Exception as file_error:
                                     logger.error(f"Ошибка отправки файла пользователю {user_id}: {file_error}")
@@ -1611,7 +1529,7 @@ async def cleanup_mailings(message: Message):
                             os.remove(file_path)
                             file_count += 1
                     except Exception as e:
-                        print(f"Ошибка удаления файла {file_path}: {e}")
+                        logger.error(f"Ошибка удаления файла {file_path}: {e}")
                 
                 # Удаляем рассылку из БД
                 cursor.execute('DELETE FROM bonus_mailings WHERE id = ?', (mailing_id,))
@@ -1849,47 +1767,25 @@ async def auto_send_mailings(bot):
                             for file_path in files:
                                 if os.path.exists(file_path):
                                     try:
-                                        # Определяем тип файла по расширению
-                                        file_ext = os.path.splitext(file_path)[1].lower()
-                                        
-                                        with open(file_path, 'rb') as file:
-                                            file_data = file.read()
-                                        
-                                        from aiogram.types import BufferedInputFile
-                                        input_file = BufferedInputFile(
-                                            file_data,
-                                            filename=os.path.basename(file_path)
-                                        )
-                                        
-                                        if file_ext in ['.jpg', '.jpeg', '.png', '.gif']:
-                                            # Отправляем как фото
-                                            await bot.send_photo(
-                                                chat_id=user_id,
-                                                photo=input_file
-                                            )
-                                        else:
-                                            # Отправляем как документ
-                                            await bot.send_document(
-                                                chat_id=user_id,
-                                                document=input_file
-                                            )
+                                        # Файл загружается один раз, дальше отправляется по file_id
+                                        await attachments.send(bot, user_id, mailing, file_path, photos=True)
                                             
                                     except Exception as file_error:
-                                        print(f"Ошибка отправки файла пользователю {user_id}: {str(file_error)}")
+                                        logger.error(f"Ошибка отправки файла пользователю {user_id}: {str(file_error)}")
                         
                         sent_count += 1
                         await asyncio.sleep(0.1)
                         
                     except Exception as e:
-                        print(f"Ошибка отправки пользователю {user_id}: {str(e)}")
+                        logger.error(f"Ошибка отправки пользователю {user_id}: {str(e)}")
                 
                 # Сохраняем дату отправки
                 bonus_mailing.update_setting(last_sent_key, current_time.strftime('%Y-%m-%d'))
                 
-                print(f"✅ Автоматическая рассылка #{mailing['id']} отправлена {sent_count} пользователям")
+                logger.info(f"✅ Автоматическая рассылка #{mailing['id']} отправлена {sent_count} пользователям")
                 
     except Exception as e:
-        print(f"❌ Ошибка автоматической рассылки: {str(e)}")
+        logger.error(f"❌ Ошибка автоматической рассылки: {str(e)}")
 
 
 
@@ -1901,7 +1797,7 @@ async def mailing_errors_handler(event, exception):
     if hasattr(event, 'message') and event.message:
         await event.message.answer("❌ Произошла ошибка при обработке запроса. Попробуйте позже.")
     
-    print(f"Ошибка в модуле рассылок: {exception}")
+    logger.error(f"Ошибка в модуле рассылок: {exception}")
     return True
 
 
@@ -1912,43 +1808,14 @@ def init_mailing_system():
         # Создаем директорию для файлов если не существует
         if not os.path.exists(MailingConfig.FILES_DIR):
             os.makedirs(MailingConfig.FILES_DIR)
-            print(f"✅ Создана директория для файлов: {MailingConfig.FILES_DIR}")
+            logger.info(f"✅ Создана директория для файлов: {MailingConfig.FILES_DIR}")
         
-        # Создаем таблицы если не существуют
-        with db.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Таблица рассылок
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS bonus_mailings (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    message_text TEXT NOT NULL,
-                    file_paths TEXT,
-                    tariffs TEXT NOT NULL,
-                    start_date DATETIME NOT NULL,
-                    end_date DATETIME NOT NULL,
-                    is_active BOOLEAN DEFAULT 1,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Таблица логов отправок
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS mailing_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    mailing_id INTEGER NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    sent_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (mailing_id) REFERENCES bonus_mailings (id)
-                )
-            ''')
-            
-            conn.commit()
+        # Таблицы bonus_mailings и mailing_logs создаются миграциями (migrations.py)
         
-        print("✅ Система рассылок инициализирована")
+        logger.info("✅ Система рассылок инициализирована")
         
     except Exception as e:
-        print(f"❌ Ошибка инициализации системы рассылок: {e}")
+        logger.error(f"❌ Ошибка инициализации системы рассылок: {e}")
 
 @mailing_router.message(Command("test_single_file"))
 async def test_single_file(message: Message):
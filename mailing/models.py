@@ -4,6 +4,9 @@ import os
 import sqlite3
 from datetime import datetime
 from typing import List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
 
 class MailingConfig:
     # Путь к папке с файлами
@@ -37,7 +40,7 @@ class BonusMailing:
                 conn.commit()
                 return cursor.lastrowid
         except Exception as e:
-            print(f"Ошибка при создании рассылки: {e}")
+            logger.error(f"Ошибка при создании рассылки: {e}")
             return None
     
     def get_all_mailings(self) -> List[dict]:
@@ -51,7 +54,7 @@ class BonusMailing:
                 ''')
                 return [dict(row) for row in cursor.fetchall()]
         except Exception as e:
-            print(f"Ошибка при получении рассылок: {e}")
+            logger.error(f"Ошибка при получении рассылок: {e}")
             return []
     
     def get_mailing_by_id(self, mailing_id: int) -> Optional[dict]:
@@ -64,7 +67,7 @@ class BonusMailing:
                 row = cursor.fetchone()
                 return dict(row) if row else None
         except Exception as e:
-            print(f"Ошибка при получении рассылки: {e}")
+            logger.error(f"Ошибка при получении рассылки: {e}")
             return None
     
     def update_mailing(self, mailing_id: int, **kwargs):
@@ -82,6 +85,9 @@ class BonusMailing:
                         value = value.isoformat()
                     updates.append(f"{field} = ?")
                     values.append(value)
+                    if field == 'file_paths':
+                        # Новые файлы нужно будет загрузить заново
+                        updates.append("file_ids = NULL")
             
             if updates:
                 values.append(mailing_id)
@@ -94,7 +100,34 @@ class BonusMailing:
                     ''', values)
                     conn.commit()
         except Exception as e:
-            print(f"Ошибка при обновлении рассылки: {e}")
+            logger.error(f"Ошибка при обновлении рассылки: {e}")
+    
+    @staticmethod
+    def parse_file_ids(mailing: dict) -> dict:
+        """Возвращает сохраненные file_id вложений: {путь: {тип: file_id}}"""
+        try:
+            return json.loads(mailing.get('file_ids') or '{}')
+        except (TypeError, ValueError):
+            return {}
+    
+    def save_file_id(self, mailing_id: int, file_path: str, kind: str, file_id: str):
+        """Сохраняет file_id загруженного вложения рядом с file_paths"""
+        try:
+            with self.db.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT file_ids FROM bonus_mailings WHERE id = ?', (mailing_id,))
+                row = cursor.fetchone()
+                if not row:
+                    return
+                file_ids = self.parse_file_ids({'file_ids': row[0]})
+                file_ids.setdefault(file_path, {})[kind] = file_id
+                cursor.execute(
+                    'UPDATE bonus_mailings SET file_ids = ? WHERE id = ?',
+                    (json.dumps(file_ids), mailing_id)
+                )
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Ошибка сохранения file_id: {e}")
     
     def delete_mailing(self, mailing_id: int):
         """Удаляет рассылку"""
@@ -104,7 +137,7 @@ class BonusMailing:
                 cursor.execute('DELETE FROM bonus_mailings WHERE id = ?', (mailing_id,))
                 conn.commit()
         except Exception as e:
-            print(f"Ошибка при удалении рассылки: {e}")
+            logger.error(f"Ошибка при удалении рассылки: {e}")
     
     def is_mailing_sent_to_user(self, mailing_id: int, user_id: int) -> bool:
         """Проверяет, была ли уже отправлена рассылка пользователю"""
@@ -117,20 +150,43 @@ class BonusMailing:
                 ''', (mailing_id, user_id))
                 return cursor.fetchone() is not None
         except Exception as e:
-            print(f"Ошибка проверки отправки: {e}")
+            logger.error(f"Ошибка проверки отправки: {e}")
             return False
     
+    # Повторная запись обновляет статус, но не затирает успешную отправку
+    LOG_UPSERT = '''
+    INSERT INTO mailing_logs (mailing_id, user_id, status, error_message)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(mailing_id, user_id) DO UPDATE SET
+        status = excluded.status,
+        error_message = excluded.error_message,
+        sent_at = CURRENT_TIMESTAMP
+    WHERE mailing_logs.status != 'sent'
+    '''
+    
     def log_mailing_sent(self, mailing_id: int, user_id: int, status: str = 'sent', error_message: str = None):
         """Логирует отправку рассылки"""
         try:
             with self.db.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                INSERT INTO mailing_logs 
-                (mailing_id, user_id, status, error_message)
-                VALUES (?, ?, ?, ?)
-                ''', (mailing_id, user_id, status, error_message))
+                cursor.execute(self.LOG_UPSERT, (mailing_id, user_id, status, error_message))
+                conn.commit()
+                logger.debug(f"✅ Запись добавлена в mailing_logs: mailing_id={mailing_id}, user_id={user_id}, status={status}")
+        except Exception as e:
+            logger.error(f"❌ Ошибка логирования отправки: {e}")
+    
+    def log_mailing_results(self, mailing_id: int, results: List[tuple]):
+        """Логирует пачку отправок одной транзакцией: results = [(user_id, status, error_message)]"""
+        if not results:
+            return
+        try:
+            with self.db.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    self.LOG_UPSERT,
+                    [(mailing_id, user_id, status, error) for user_id, status, error in results]
+                )
                 conn.commit()
-                print(f"✅ Запись добавлена в mailing_logs: mailing_id={mailing_id}, user_id={user_id}, status={status}")
+                logger.info(f"✅ В mailing_logs записано {len(results)} отправок рассылки #{mailing_id}")
         except Exception as e:
-            print(f"❌ Ошибка логирования отправки: {e}")
+            logger.error(f"❌ Ошибка логирования отправок: {e}")
@@ -4,9 +4,15 @@ import json
 import os
 from datetime import datetime
 from aiogram import Bot
-from aiogram.types import BufferedInputFile
+from .attachments import attachments
 from .models import BonusMailing
 from database import db
+from send_queue import send_queue
+import logging
+
+logger = logging.getLogger(__name__)
+
+LOG_BATCH_SIZE = 100  # записей mailing_logs на одну транзакцию
 
 
 class MailingSender:
@@ -17,14 +23,19 @@ class MailingSender:
     async def check_db_time(self):
         """Проверяет текущее время в БД"""
         try:
-            with db.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT datetime('now'), datetime('now', 'localtime')")
-                result = cursor.fetchone()
-                print(f"🕒 Время в БД: UTC={result[0]}, Local={result[1]}")
-                print(f"🕒 Время Python: {datetime.now()}")
+            result = await db.a.run(self._query_db_time)
+            if result:
+                logger.debug(f"🕒 Время в БД: UTC={result[0]}, Local={result[1]}")
+                logger.debug(f"🕒 Время Python: {datetime.now()}")
         except Exception as e:
-            print(f"❌ Ошибка проверки времени БД: {e}")
+            logger.error(f"❌ Ошибка проверки времени БД: {e}")
+    
+    def _query_db_time(self):
+        """Возвращает (UTC, localtime) по часам SQLite"""
+        with db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT datetime('now'), datetime('now', 'localtime')")
+            return cursor.fetchone()
     
     async def send_active_mailings(self):
         """Отправляет активные рассылки"""
@@ -32,10 +43,10 @@ class MailingSender:
             # Проверяем время
             await self.check_db_time()
             
-            mailings = self.bonus_mailing.get_all_mailings()
+            mailings = await db.a.run(self.bonus_mailing.get_all_mailings)
             current_time = datetime.now()
             
-            print(f"🕒 Проверка рассылок в {current_time}")
+            logger.debug(f"🕒 Проверка рассылок в {current_time}")
             
             sent_count = 0
             for mailing in mailings:
@@ -45,25 +56,25 @@ class MailingSender:
                 start_date = datetime.fromisoformat(mailing['start_date'])
                 end_date = datetime.fromisoformat(mailing['end_date'])
                 
-                print(f"📧 Рассылка #{mailing['id']}: {start_date} - {end_date}")
-                print(f"🕒 Текущее время: {current_time}")
-                print(f"✅ Активна: {start_date <= current_time <= end_date}")
+                logger.debug(f"📧 Рассылка #{mailing['id']}: {start_date} - {end_date}")
+                logger.debug(f"🕒 Текущее время: {current_time}")
+                logger.debug(f"✅ Активна: {start_date <= current_time <= end_date}")
                 
                 # Проверяем, что текущее время в периоде рассылки
                 if start_date <= current_time <= end_date:
                     count = await self._send_mailing(mailing)
                     sent_count += count
-                    print(f"✅ Рассылка #{mailing['id']} отправлена {count} пользователям")
+                    logger.info(f"✅ Рассылка #{mailing['id']} отправлена {count} пользователям")
                 else:
-                    print(f"⏸️ Рассылка #{mailing['id']} не активна в данный момент")
+                    logger.debug(f"⏸️ Рассылка #{mailing['id']} не активна в данный момент")
                     
             if sent_count > 0:
-                print(f"📧 Всего отправлено {sent_count} рассылок")
+                logger.info(f"📧 Всего отправлено {sent_count} рассылок")
             else:
-                print("ℹ️ Активных рассылок для отправки не найдено")
+                logger.info("ℹ️ Активных рассылок для отправки не найдено")
                 
         except Exception as e:
-            print(f"❌ Ошибка при отправке рассылок: {e}")
+            logger.error(f"❌ Ошибка при отправке рассылок: {e}")
     
     async def _send_mailing(self, mailing: dict) -> int:
         """Отправляет конкретную рассылку и возвращает количество отправленных"""
@@ -72,74 +83,75 @@ class MailingSender:
             # Получаем пользователей по тарифам
             users = await self._get_users_by_tariffs(mailing)
             
-            print(f"👥 Для рассылки #{mailing['id']} найдено пользователей: {len(users)}")
+            logger.info(f"👥 Для рассылки #{mailing['id']} ожидают отправки пользователей: {len(users)}")
             
             if not users:
-                print(f"⚠️ Для рассылки #{mailing['id']} не найдено подходящих пользователей")
+                logger.warning(f"⚠️ Для рассылки #{mailing['id']} не найдено подходящих пользователей")
                 return 0
             
             file_paths = json.loads(mailing['file_paths']) if mailing['file_paths'] else []
+            delivered = []
+            pending_logs = []
             
-            for user_id in users:
+            async def flush_logs():
+                # Журнал пишется пачками одной транзакцией, а не INSERT+commit на пользователя
+                batch = pending_logs[:]
+                pending_logs.clear()
+                await db.a.run(self.bonus_mailing.log_mailing_results, mailing['id'], batch)
+            
+            async def deliver(user_id):
                 try:
-                    # Проверяем, не отправляли ли уже эту рассылку пользователю
-                    if self.bonus_mailing.is_mailing_sent_to_user(mailing['id'], user_id):
-                        print(f"⚠️ Рассылка #{mailing['id']} уже отправлена пользователю {user_id}")
-                        continue
-                    
                     # Отправляем сообщение
-                    await self.bot.send_message(
+                    await send_queue.call(user_id, lambda: self.bot.send_message(
                         chat_id=user_id,
                         text=mailing['message_text'],
                         parse_mode="HTML"
-                    )
+                    ))
                     
-                    # Отправляем файлы через BufferedInputFile
+                    # Файл загружается один раз, остальным получателям уходит file_id
                     for file_path in file_paths:
                         try:
-                            if os.path.exists(file_path):
-                                # Читаем файл в память и создаем BufferedInputFile
-                                with open(file_path, 'rb') as file:
-                                    file_data = file.read()
-                                
-                                input_file = BufferedInputFile(
-                                    file_data,
-                                    filename=os.path.basename(file_path)
-                                )
-                                
-                                await self.bot.send_document(
-                                    chat_id=user_id,
-                                    document=input_file,
-                                    caption="🎁 Бонусный материал"
-                                )
-                                print(f"✅ Файл {os.path.basename(file_path)} отправлен пользователю {user_id}")
+                            if await attachments.send(self.bot, user_id, mailing, file_path,
+                                                      caption="🎁 Бонусный материал"):
+                                logger.debug(f"✅ Файл {os.path.basename(file_path)} отправлен пользователю {user_id}")
                             else:
-                                print(f"❌ Файл не найден: {file_path}")
+                                logger.error(f"❌ Файл не найден: {file_path}")
                                 
                         except Exception as e:
-                            print(f"❌ Ошибка отправки файла {file_path}: {e}")
-                    
-                    sent_count += 1
+                            logger.error(f"❌ Ошибка отправки файла {file_path}: {e}")
                     
                     # Логируем отправку
-                    self.bonus_mailing.log_mailing_sent(mailing['id'], user_id, 'sent')
-                    print(f"✅ Отправлено пользователю {user_id}")
-                    
-                    # Пауза между отправками
-                    await asyncio.sleep(0.1)
+                    pending_logs.append((user_id, 'sent', None))
+                    delivered.append(user_id)
+                    logger.debug(f"✅ Отправлено пользователю {user_id}")
                     
                 except Exception as e:
-                    print(f"❌ Ошибка отправки пользователю {user_id}: {e}")
+                    logger.error(f"❌ Ошибка отправки пользователю {user_id}: {e}")
                     # Логируем ошибку
-                    self.bonus_mailing.log_mailing_sent(mailing['id'], user_id, 'error', str(e))
+                    pending_logs.append((user_id, 'error', str(e)))
+                    raise
+                finally:
+                    if len(pending_logs) >= LOG_BATCH_SIZE:
+                        await flush_logs()
+            
+            # Очередь соблюдает лимиты Telegram вместо фиксированной паузы между пользователями
+            try:
+                await send_queue.send_many(users, deliver)
+            finally:
+                await flush_logs()
+            sent_count = len(delivered)
                     
         except Exception as e:
-            print(f"❌ Ошибка при отправке рассылки {mailing['id']}: {e}")
+            logger.error(f"❌ Ошибка при отправке рассылки {mailing['id']}: {e}")
         
         return sent_count
     
     async def _get_users_by_tariffs(self, mailing: dict) -> list:
         """Получает список пользователей по выбранным тарифам из таблицы payments"""
+        return await db.a.run(self._query_users_by_tariffs, mailing)
+    
+    def _query_users_by_tariffs(self, mailing: dict) -> list:
+        """Синхронный запрос получателей рассылки (выполняется в пуле потоков БД)"""
         tariffs = json.loads(mailing['tariffs'])
         users = []
         
@@ -147,36 +159,30 @@ class MailingSender:
             with db.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Используем Python datetime для получения текущего времени
-                current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                 start_date_str = mailing['start_date'].replace('T', ' ').split('.')[0]  # Форматируем дату начала
                 
+                # Активные подписчики из active_subscriptions (тот же набор, что видит планер)
+                # и anti-join с mailing_logs: только те, кому рассылка еще не доставлена
+                query = '''
+                    SELECT s.telegram_id 
+                    FROM active_subscriptions s
+                    LEFT JOIN mailing_logs ml
+                        ON ml.mailing_id = ? AND ml.user_id = s.telegram_id AND ml.status = 'sent'
+                    WHERE ml.id IS NULL
+                    AND s.updated_at >= ?
+                '''
+                params = [mailing['id'], start_date_str]
+                
                 if tariffs:  # Если выбраны конкретные тарифы
-                    placeholders = ','.join(['?'] * len(tariffs))
-                    query = f'''
-                        SELECT DISTINCT user_id 
-                        FROM payments 
-                        WHERE tariff_name IN ({placeholders}) 
-                        AND status = 'succeeded'
-                        AND valid_until >= ?
-                        AND updated_at >= ?
-                    '''
-                    cursor.execute(query, tariffs + [current_time, start_date_str])
-                else:  # Если все тарифы (пустой список)
-                    query = '''
-                        SELECT DISTINCT user_id 
-                        FROM payments 
-                        WHERE status = 'succeeded'
-                        AND valid_until >= ?
-                        AND updated_at >= ?
-                    '''
-                    cursor.execute(query, [current_time, start_date_str])
+                    query += f"AND s.tariff IN ({','.join(['?'] * len(tariffs))})"
+                    params += tariffs
                 
+                cursor.execute(query, params)
                 users = [row[0] for row in cursor.fetchall()]
                 
-                print(f"🔍 Запрос: {query}")
-                print(f"🔍 Параметры: {tariffs + [current_time, start_date_str] if tariffs else [current_time, start_date_str]}")
-                print(f"🔍 Найдено записей: {len(users)}")
+                logger.debug(f"🔍 Запрос: {query}")
+                logger.debug(f"🔍 Параметры: {params}")
+                logger.debug(f"🔍 Найдено записей: {len(users)}")
                 
                 # Дополнительная отладочная информация
                 if users:
@@ -190,10 +196,10 @@ class MailingSender:
                     ''', (users[0],))
                     user_info = cursor.fetchone()
                     if user_info:
-                        print(f"🔍 Пример пользователя: ID={user_info[0]}, тариф='{user_info[1]}', valid_until={user_info[2]}, updated_at={user_info[3]}")
+                        logger.debug(f"🔍 Пример пользователя: ID={user_info[0]}, тариф='{user_info[1]}', valid_until={user_info[2]}, updated_at={user_info[3]}")
             
         except Exception as e:
-            print(f"❌ Ошибка получения пользователей: {e}")
+            logger.error(f"❌ Ошибка получения пользователей: {e}")
         
         return users
 
@@ -202,7 +208,7 @@ async def mailing_scheduler(bot: Bot):
     """Планировщик рассылок"""
     sender = MailingSender(bot)
     
-    print("🚀 Планировщик рассылок запущен")
+    logger.info("🚀 Планировщик рассылок запущен")
     
     while True:
         try:
@@ -210,5 +216,5 @@ async def mailing_scheduler(bot: Bot):
             # Проверяем каждые 5 минут
             await asyncio.sleep(300)
         except Exception as e:
-            print(f"❌ Ошибка в планировщике рассылок: {e}")
+            logger.error(f"❌ Ошибка в планировщике рассылок: {e}")
             await asyncio.sleep(60)
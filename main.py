@@ -1,22 +1,29 @@
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
-from aiogram.fsm.storage.memory import MemoryStorage
 import asyncio
 import logging
 import signal
+from functools import partial
 import traceback
 
-from config import BOT_TOKEN
+from config import (
+    BOT_TOKEN, BOT_MODE, WEBHOOK_BASE_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_HOST, WEBHOOK_PORT,
+    MONTH_END_DELIVER_REPORTS
+)
 from handlers.start import start_router
 from handlers.start import about_router
 from handlers.registration import registration_router
 from handlers.groups.handlers import router as groups_router
 from handlers.schedule import setup_schedule_handlers
-from notify import NotificationManager, lesson_notification_scheduler, setup_notification_handlers
+from notify import NotificationManager, send_lesson_notifications, setup_notification_handlers
+from notify.lesson_timer import LessonTimer, REMINDER, CONFIRMATION, LESSON_END
 from lesson_reports.handlers import LessonReportHandlers
 from keyboards import main_menu # на время разработки кнопок
 from database import db
 from payment.middleware import SubscriptionMiddleware
+from user_context import UserContextMiddleware
+from fsm_storage import SQLiteStorage
+from webhook import create_webhook_app, start_webhook_server
 from payment.handlers import router as payment_router
 from commands.admin.admin import router as admin_router
 from handlers.start.handlers_parent import parent_router
@@ -39,58 +46,15 @@ from payment.notifications.trial_notification_task import start_trial_notificati
 from handlers.schedule.planner.timer.planner_manager import planner_manager
 from handlers.schedule.planner.timer.planner_commands import router as planner_commands_router
 from report_pdf.handlers import router as report_router
+from report_pdf.render_service import pdf_renderer
+from report_pdf.month_end import month_end_report_task
 from handlers.debt import payment_debts_router
 from handlers.homework import homework_debts_router
 from commands.time_commands.time_commands import time_router
 from mailing.handlers import mailing_router
 from mailing.sender import mailing_scheduler
 
-# Настройка логирования
-from logging.handlers import RotatingFileHandler
-import os
-
-# Создаем папку для логов если её нет
-log_dir = 'logs'
-if not os.path.exists(log_dir):
-    os.makedirs(log_dir)
-
-# Настройка логирования
-def setup_logging():
-    # Основной логгер
-    logger = logging.getLogger()
-    logger.setLevel(logging.INFO)
-    
-    # Форматтер
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
-    # Файловый обработчик с ротацией
-    file_handler = RotatingFileHandler(
-        filename=os.path.join(log_dir, 'bot.log'),
-        maxBytes=10*1024*1024,  # 10 MB
-        backupCount=5,
-        encoding='utf-8'
-    )
-    file_handler.setFormatter(formatter)
-    file_handler.setLevel(logging.INFO)
-    
-    # Консольный обработчик
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
-    console_handler.setLevel(logging.INFO)
-    
-    # Очищаем существующие обработчики и добавляем новые
-    logger.handlers.clear()
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
-    # Устанавливаем уровень для библиотек
-    logging.getLogger('aiogram').setLevel(logging.WARNING)
-    logging.getLogger('asyncio').setLevel(logging.WARNING)
-    
-    return logger
+from logging_setup import setup_logging, stop_logging
 
 # Инициализируем логирование
 setup_logging()
@@ -103,9 +67,12 @@ class BotApp:
         self.notification_manager = None
         self.lesson_report_handlers = None
         self.reminder_scheduler = None
+        self.lesson_timer = None
         self.mailing_handler = None # Рассылка файлов
         self.tasks = []
         self.is_running = False
+        self.webhook_runner = None
+        self.stop_event = None
 
 
     async def startup(self):
@@ -119,7 +86,11 @@ class BotApp:
                 token=BOT_TOKEN,
                 default=DefaultBotProperties(parse_mode="HTML")
             )
-            self.dp = Dispatcher(storage=MemoryStorage())
+            # Схема БД создается один раз при старте, а не в обработчиках
+            db.ensure_schema()
+
+            # Состояния диалогов переживают перезапуск бота
+            self.dp = Dispatcher(storage=SQLiteStorage(db))
 
             # Инициализация менеджера уведомлений
             self.notification_manager = NotificationManager(db)
@@ -130,6 +101,12 @@ class BotApp:
             # Инициализация планировщика напоминаний  # ← ДОБАВЛЕНО
             self.reminder_scheduler = ReminderScheduler(self.bot)  # ← ДОБАВЛЕНО
 
+            # Единый таймер событий занятий вместо трех циклов опроса БД
+            self.lesson_timer = LessonTimer(db)
+            self.lesson_timer.on(REMINDER, self.reminder_scheduler.check_and_send_reminders)
+            self.lesson_timer.on(CONFIRMATION, partial(send_lesson_notifications, self.bot, self.notification_manager))
+            self.lesson_timer.on(LESSON_END, partial(self.lesson_report_handlers.notify_tutor_about_lesson_end, self.bot))
+
             # Проверка формата дат
             self.notification_manager.check_lesson_dates_format()
 
@@ -182,6 +159,7 @@ class BotApp:
             self.dp.include_router(main_menu) # на время разработки кнопок
 
             # Роутер ЮКасса
+            self.dp.update.outer_middleware(UserContextMiddleware()) # Роль и id пользователя в data['user_context']
             self.dp.update.middleware(SubscriptionMiddleware()) # Middleware для проверки подписки
             self.dp.include_router(payment_router)  # Роутер оплаты
 
@@ -202,6 +180,24 @@ class BotApp:
             logger.error(traceback.format_exc())
             return False
 
+    async def run_webhook(self):
+        """Принимает обновления через webhook, пока не будет вызван shutdown()"""
+        if not WEBHOOK_BASE_URL or not WEBHOOK_SECRET:
+            raise RuntimeError("Для BOT_MODE=webhook нужны WEBHOOK_BASE_URL и WEBHOOK_SECRET")
+
+        self.stop_event = asyncio.Event()
+        app = create_webhook_app(self.dp, self.bot, WEBHOOK_PATH, WEBHOOK_SECRET)
+        self.webhook_runner = await start_webhook_server(app, WEBHOOK_HOST, WEBHOOK_PORT)
+
+        webhook_url = WEBHOOK_BASE_URL.rstrip('/') + WEBHOOK_PATH
+        await self.bot.set_webhook(
+            url=webhook_url,
+            secret_token=WEBHOOK_SECRET,
+            allowed_updates=self.dp.resolve_used_update_types(),
+        )
+        logger.info(f"Webhook установлен: {webhook_url}")
+        await self.stop_event.wait()
+
     async def shutdown(self):
         """Корректное завершение работы приложения"""
         if not self.is_running:
@@ -224,6 +220,18 @@ class BotApp:
             except Exception as e:  # ← ДОБАВЛЕНО
                 logger.error(f"Ошибка при остановке планировщика: {e}")  # ← ДОБАВЛЕНО
 
+        # Остановка webhook-сервера (сам webhook в Telegram не снимаем:
+        # обновления подождут в очереди до следующего запуска)
+        if self.stop_event:
+            self.stop_event.set()
+        if self.webhook_runner:
+            try:
+                await self.webhook_runner.cleanup()
+                logger.info("Webhook-сервер остановлен")
+            except Exception as e:
+                logger.error(f"Ошибка при остановке webhook-сервера: {e}")
+            self.webhook_runner = None
+
         # Отмена всех фоновых задач
         for task in self.tasks:
             if not task.done():
@@ -242,12 +250,21 @@ class BotApp:
             except Exception as e:
                 logger.error(f"Ошибка при закрытии сессии бота: {e}")
 
-        # Закрытие соединения с базой данных (если требуется)
-        if hasattr(db, 'close'):
+        # Остановка процессов отрисовки PDF
+        pdf_renderer.shutdown(wait=False)
+
+        # Сохранение несохраненных состояний FSM
+        if self.dp:
             try:
-                db.close()
+                await self.dp.storage.close()
             except Exception as e:
-                logger.error(f"Ошибка при закрытии БД: {e}")
+                logger.error(f"Ошибка при сохранении состояний FSM: {e}")
+
+        # Закрытие пула соединений с базой данных
+        try:
+            db.close()
+        except Exception as e:
+            logger.error(f"Ошибка при закрытии БД: {e}")
 
         logger.info("Бот успешно остановлен")
 
@@ -270,14 +287,15 @@ class BotApp:
 
         try:
             # Запуск фоновых задач
-            self.tasks.append(asyncio.create_task(lesson_notification_scheduler(self.bot, self.notification_manager)))
-            self.tasks.append(asyncio.create_task(self.lesson_report_handlers.notify_tutor_about_lesson_end(self.bot)))
-            
             # Запуск планировщика напоминаний 
             if self.reminder_scheduler: 
-                self.tasks.append(asyncio.create_task(self.reminder_scheduler.start()))
+                await self.reminder_scheduler.start()
                 logger.info("Планировщик напоминаний запущен") 
 
+            # Таймер напоминаний, подтверждений и окончаний занятий
+            self.tasks.append(asyncio.create_task(self.lesson_timer.run()))
+            logger.info("Таймер событий занятий запущен")
+
             # ЗАПУСК ЗАДАЧИ УВЕДОМЛЕНИЙ О ПРОБНОМ ПЕРИОДЕ ← ДОБАВЬТЕ ЭТО
             self.tasks.append(asyncio.create_task(start_trial_notification_task(self.bot)))
             logger.info("Задача уведомлений о пробном периоде запущена")
@@ -286,6 +304,10 @@ class BotApp:
             self.tasks.append(asyncio.create_task(mailing_scheduler(self.bot)))
             logger.info("Планировщик рассылки бонусов запущен")
 
+            # Месячные отчеты за прошедший месяц готовятся заранее, а не первым запросом
+            self.tasks.append(asyncio.create_task(month_end_report_task(self.bot, MONTH_END_DELIVER_REPORTS)))
+            logger.info("Задача месячных отчетов запущена")
+
             # запуск планера регулярных занятий
             try:
                 await planner_manager.start_planner()
@@ -294,7 +316,12 @@ class BotApp:
                 logger.error(f"Ошибка при запуске планера: {e}")
 
             logger.info("Бот запущен и готов к работе")
-            await self.dp.start_polling(self.bot)
+            if BOT_MODE == 'webhook':
+                await self.run_webhook()
+            else:
+                # Пока установлен webhook, getUpdates не работает: снимаем его при переходе на polling
+                await self.bot.delete_webhook()
+                await self.dp.start_polling(self.bot)
         except asyncio.CancelledError:
             logger.info("Получен сигнал остановки")
         except Exception as e:
@@ -330,4 +357,7 @@ if __name__ == "__main__":
         logger.info("Приложение остановлено")
     except Exception as e:
         logger.error(f"Критическая ошибка: {e}")
-        logger.error(traceback.format_exc())
\ No newline at end of file
+        logger.error(traceback.format_exc())
+    finally:
+        # Дописываем очередь логов до выхода процесса
+        stop_logging()
@@ -0,0 +1,836 @@
+"""Версионированные миграции схемы базы данных.
+
+Текущая версия схемы хранится в PRAGMA user_version. Каждая миграция
+идемпотентна и применяется в своей транзакции вместе с повышением версии,
+поэтому при старте бота достаточно сравнить одно число.
+
+Запуск вне бота:
+    python migrations.py                 # применить миграции к tutor_bot.db
+    python migrations.py --dry-run       # показать неприменённые миграции
+    python migrations.py --db other.db   # другой файл базы
+"""
+import argparse
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+def _get_columns(cursor, table: str) -> list:
+    """Возвращает список столбцов таблицы"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [column[1] for column in cursor.fetchall()]
+
+
+def _add_column(cursor, table: str, column: str, definition: str):
+    """Добавляет столбец, если его еще нет"""
+    if column not in _get_columns(cursor, table):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def migration_001_base_schema(cursor):
+    """Базовый набор таблиц"""
+    # соглашение о конфиденциальности и соглашение пользователя
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS user_consents (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        telegram_id INTEGER NOT NULL,
+        ip_address TEXT NOT NULL,
+        document_type VARCHAR(50) NOT NULL,
+        document_version VARCHAR(20) NOT NULL,
+        accepted BOOLEAN NOT NULL DEFAULT FALSE,
+        accepted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (telegram_id) REFERENCES tutors (telegram_id)
+    )
+    ''')
+
+    # Таблица пользователей (репетиторов)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS tutors (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        telegram_id INTEGER UNIQUE,
+        full_name TEXT NOT NULL,
+        phone TEXT NOT NULL,
+        promo_code TEXT DEFAULT '0',
+        registration_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        status TEXT DEFAULT 'active',
+        user_role TEXT DEFAULT 'user'
+    )
+    ''')
+
+    # Таблица учеников
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS students (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        full_name TEXT NOT NULL,
+        phone TEXT,
+        parent_phone TEXT,
+        status TEXT DEFAULT 'active',
+        tutor_id INTEGER,
+        registration_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        student_telegram_id INTEGER,
+        parent_telegram_id INTEGER,
+        student_token TEXT UNIQUE,
+        parent_token TEXT UNIQUE,
+        delete_after TIMESTAMP,
+        student_username TEXT,
+        parent_username TEXT,
+        timezone TEXT DEFAULT 'Europe/Moscow',
+        notification_time TEXT DEFAULT '09:00',
+        notification_enabled BOOLEAN DEFAULT TRUE,
+        FOREIGN KEY (tutor_id) REFERENCES tutors (id)
+    )
+    ''')
+
+    # НОВАЯ таблица основных учеников (уникальные студенты)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS main_students (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        full_name TEXT NOT NULL,
+        phone TEXT,
+        parent_phone TEXT,
+        student_telegram_id INTEGER UNIQUE,
+        parent_telegram_id INTEGER UNIQUE,
+        student_username TEXT,
+        parent_username TEXT,
+        timezone TEXT DEFAULT 'Europe/Moscow',
+        notification_time TEXT DEFAULT '09:00',
+        notification_enabled BOOLEAN DEFAULT TRUE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+    # таблица родителей
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS main_parents (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        full_name TEXT NOT NULL,
+        phone TEXT,
+        parent_telegram_id INTEGER UNIQUE,
+        parent_username TEXT,
+        timezone TEXT DEFAULT 'Europe/Moscow',
+        notification_time TEXT DEFAULT '09:00',
+        notification_enabled BOOLEAN DEFAULT TRUE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+    # Таблица занятий
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS lessons (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tutor_id INTEGER,
+        student_id INTEGER,
+        lesson_date TIMESTAMP,
+        duration INTEGER,
+        price REAL,
+        status TEXT DEFAULT 'planned',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (tutor_id) REFERENCES tutors (id),
+        FOREIGN KEY (student_id) REFERENCES students (id)
+    )
+    ''')
+
+    # Таблица подтверждений занятий
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS lesson_confirmations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        lesson_id INTEGER NOT NULL,
+        student_id INTEGER NOT NULL,
+        confirmed BOOLEAN,
+        confirmed_at TIMESTAMP,
+        notified_at TIMESTAMP,
+        FOREIGN KEY (lesson_id) REFERENCES lessons (id),
+        FOREIGN KEY (student_id) REFERENCES students (id)
+    )
+    ''')
+
+    # Таблица промокодов
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS promo_codes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        code TEXT UNIQUE NOT NULL,
+        discount_percent INTEGER DEFAULT 0,
+        discount_amount REAL DEFAULT 0,
+        valid_until TIMESTAMP,
+        usage_limit INTEGER DEFAULT 1,
+        used_count INTEGER DEFAULT 0,
+        is_active BOOLEAN DEFAULT TRUE
+    )
+    ''')
+
+    # Таблица групп
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS groups (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        tutor_id INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (tutor_id) REFERENCES tutors (id)
+    )
+    ''')
+
+    # Таблица связи учеников и групп
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS student_groups (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id INTEGER,
+        group_id INTEGER,
+        added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (student_id) REFERENCES students (id),
+        FOREIGN KEY (group_id) REFERENCES groups (id),
+        UNIQUE(student_id, group_id)
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS lesson_reports (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        lesson_id INTEGER NOT NULL,
+        student_id INTEGER NOT NULL,
+        lesson_held BOOLEAN,
+        lesson_paid BOOLEAN,
+        homework_done BOOLEAN,
+        student_performance TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (lesson_id) REFERENCES lessons (id),
+        FOREIGN KEY (student_id) REFERENCES students (id),
+        UNIQUE(lesson_id, student_id)
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS user_subscriptions (
+        user_id INTEGER PRIMARY KEY,
+        valid_until TEXT NOT NULL,
+        tariff TEXT NOT NULL,
+        is_active BOOLEAN DEFAULT TRUE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES tutors (telegram_id)
+    )
+    ''')
+
+    # Обращения
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS feedback_messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        user_name TEXT NOT NULL,
+        message TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        status TEXT DEFAULT 'new',  -- new, in_progress, resolved
+        FOREIGN KEY (user_id) REFERENCES tutors (telegram_id)
+    )
+    ''')
+
+    # Таблица платежей
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS payments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        payment_id TEXT UNIQUE NOT NULL,
+        tariff_name TEXT NOT NULL,
+        amount REAL NOT NULL,
+        status TEXT DEFAULT 'pending',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        valid_until TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES tutors (telegram_id)
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS tutor_settings (
+        tutor_id INTEGER PRIMARY KEY,
+        reminder_hours_before INTEGER DEFAULT 1,
+        FOREIGN KEY (tutor_id) REFERENCES tutors (id)
+    )
+    ''')
+
+    # Таблица реферальных переходов
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS referrals (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        referrer_id INTEGER NOT NULL,
+        visitor_telegram_id INTEGER NOT NULL,
+        referral_code TEXT NOT NULL,
+        status TEXT DEFAULT 'awaiting',
+        visited_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (referrer_id) REFERENCES tutors (id),
+        UNIQUE(visitor_telegram_id, status)
+    )
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS student_migration_map (
+        old_id INTEGER PRIMARY KEY,
+        main_id INTEGER NOT NULL,
+        migration_status TEXT DEFAULT 'pending',
+        migrated_at TIMESTAMP,
+        FOREIGN KEY (main_id) REFERENCES main_students (id)
+    )
+    ''')
+
+    # планер регулярных занятий
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS planner_actions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tutor_id INTEGER NOT NULL,
+        lesson_type TEXT NOT NULL,
+        student_id INTEGER,
+        group_id INTEGER,
+        weekday TEXT NOT NULL,
+        time TEXT NOT NULL,
+        duration INTEGER NOT NULL,
+        price REAL NOT NULL,
+        is_active BOOLEAN DEFAULT TRUE,
+        last_created TIMESTAMP DEFAULT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (tutor_id) REFERENCES tutors (id),
+        FOREIGN KEY (student_id) REFERENCES students (id),
+        FOREIGN KEY (group_id) REFERENCES groups (id)
+    )
+    ''')
+
+    # Таблица для бонусных рассылок   
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS bonus_mailings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        message_text TEXT NOT NULL,
+        file_paths TEXT,  -- JSON список путей к файлам
+        tariffs TEXT NOT NULL,  -- JSON список тарифов
+        start_date TIMESTAMP NOT NULL,
+        end_date TIMESTAMP NOT NULL,
+        is_active BOOLEAN DEFAULT TRUE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+    # для логов отправки бонусных рассылок
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS mailing_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        mailing_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        status TEXT DEFAULT 'sent',
+        error_message TEXT,
+        FOREIGN KEY (mailing_id) REFERENCES bonus_mailings(id) ON DELETE CASCADE
+    )
+    ''')
+
+
+def migration_002_lessons_reminder_sent(cursor):
+    """Флаг отправленного напоминания о занятии"""
+    _add_column(cursor, 'lessons', 'reminder_sent', 'INTEGER DEFAULT 0')
+
+
+def migration_003_lessons_group_id(cursor):
+    """Привязка занятия к группе"""
+    _add_column(cursor, 'lessons', 'group_id', 'INTEGER')
+
+
+def migration_004_reports_parent_performance(cursor):
+    """Комментарий для родителей в отчете"""
+    _add_column(cursor, 'lesson_reports', 'parent_performance', 'TEXT')
+
+
+def migration_005_lessons_planner_action_id(cursor):
+    """Связь занятия с задачей планера и индекс для поиска созданных занятий"""
+    _add_column(cursor, 'lessons', 'planner_action_id', 'INTEGER')
+    cursor.execute(
+        'CREATE INDEX IF NOT EXISTS idx_lessons_planner ON lessons(planner_action_id, lesson_date)'
+    )
+
+
+def migration_006_payments_valid_until(cursor):
+    """Срок действия подписки в платежах (старые базы создавались без него)"""
+    _add_column(cursor, 'payments', 'valid_until', 'TIMESTAMP')
+
+
+
+def migration_007_hot_query_indexes(cursor):
+    """Индексы под горячие запросы планировщиков, расписания, отчетов и оплат"""
+    # Планировщики: status = 'planned' AND lesson_date в окне
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_lessons_status_date ON lessons(status, lesson_date)')
+    # Расписание и статистика репетитора
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_lessons_tutor_date ON lessons(tutor_id, lesson_date)')
+    # Кабинеты ученика/родителя, долги, деактивация ученика
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_lessons_student_date ON lessons(student_id, lesson_date)')
+    # Групповые занятия
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_lessons_group_date ON lessons(group_id, lesson_date)')
+    # lesson_reports(lesson_id, ...) уже покрыт UNIQUE(lesson_id, student_id)
+    # Последний успешный платеж: user_id = ? AND status = 'succeeded' ORDER BY created_at DESC
+    cursor.execute(
+        'CREATE INDEX IF NOT EXISTS idx_payments_user_status_created ON payments(user_id, status, created_at)'
+    )
+    # Поиск учеников по репетитору и по Telegram ID ученика/родителя
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_students_tutor ON students(tutor_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_students_student_tg ON students(student_telegram_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_students_parent_tg ON students(parent_telegram_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_student_groups_group ON student_groups(group_id)')
+    cursor.execute(
+        'CREATE INDEX IF NOT EXISTS idx_lesson_confirmations_lesson ON lesson_confirmations(lesson_id, student_id)'
+    )
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_planner_actions_tutor ON planner_actions(tutor_id)')
+
+
+def migration_008_lessons_lesson_end(cursor):
+    """Сохраняемое время окончания занятия, триггеры и индекс для поиска завершившихся занятий"""
+    _add_column(cursor, 'lessons', 'lesson_end', 'TIMESTAMP')
+    cursor.execute('''
+    UPDATE lessons
+    SET lesson_end = datetime(lesson_date, '+' || COALESCE(duration, 0) || ' minutes')
+    ''')
+    # Триггеры поддерживают lesson_end при любой вставке и переносе, включая планер
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_lessons_end_insert
+    AFTER INSERT ON lessons
+    BEGIN
+        UPDATE lessons
+        SET lesson_end = datetime(NEW.lesson_date, '+' || COALESCE(NEW.duration, 0) || ' minutes')
+        WHERE id = NEW.id;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_lessons_end_update
+    AFTER UPDATE OF lesson_date, duration ON lessons
+    BEGIN
+        UPDATE lessons
+        SET lesson_end = datetime(NEW.lesson_date, '+' || COALESCE(NEW.duration, 0) || ' minutes')
+        WHERE id = NEW.id;
+    END
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_lessons_status_end ON lessons(status, lesson_end)')
+
+
+def migration_009_bonus_mailings_file_ids(cursor):
+    """Telegram file_id загруженных вложений рассылки (JSON {путь: {тип: file_id}})"""
+    _add_column(cursor, 'bonus_mailings', 'file_ids', 'TEXT')
+
+
+def migration_010_mailing_logs_unique(cursor):
+    """Одна запись журнала на пару (рассылка, пользователь) для anti-join при выборе получателей"""
+    # Из дублей оставляем успешную отправку, иначе самую свежую запись
+    cursor.execute('''
+    DELETE FROM mailing_logs
+    WHERE id NOT IN (
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY mailing_id, user_id
+                ORDER BY status = 'sent' DESC, sent_at DESC, id DESC
+            ) AS rn
+            FROM mailing_logs
+        )
+        WHERE rn = 1
+    )
+    ''')
+    cursor.execute(
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_mailing_logs_mailing_user ON mailing_logs(mailing_id, user_id)'
+    )
+
+
+def migration_011_fsm_states(cursor):
+    """Состояния FSM (см. fsm_storage.SQLiteStorage)"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS fsm_states (
+        storage_key TEXT PRIMARY KEY,
+        state TEXT,
+        data BLOB,
+        updated_at REAL NOT NULL
+    )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_fsm_states_updated ON fsm_states(updated_at)')
+
+
+def migration_012_planner_covered_until(cursor):
+    """До какой даты включительно планер уже создал занятия задачи"""
+    _add_column(cursor, 'planner_actions', 'covered_until', 'DATE')
+    cursor.execute('''
+    UPDATE planner_actions
+    SET covered_until = (
+        SELECT MAX(DATE(lesson_date)) FROM lessons WHERE lessons.planner_action_id = planner_actions.id
+    )
+    WHERE covered_until IS NULL
+    ''')
+
+
+def migration_013_active_subscriptions_view(cursor):
+    """Представление активных подписок: последний успешный платеж каждого пользователя"""
+    cursor.execute('DROP VIEW IF EXISTS active_subscriptions')
+    # Как PaymentManager.get_payment_info: без valid_until подписка действует 30 дней с оплаты.
+    # valid_until хранится в локальном времени бота, поэтому сравниваем с 'localtime'
+    cursor.execute('''
+    CREATE VIEW active_subscriptions AS
+    SELECT t.id AS tutor_id,
+        p.user_id AS telegram_id,
+        p.tariff_name AS tariff,
+        p.valid_until,
+        p.updated_at
+    FROM (
+        SELECT user_id, tariff_name, updated_at,
+            COALESCE(valid_until, datetime(created_at, '+30 days')) AS valid_until,
+            ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY created_at DESC) AS rn
+        FROM payments
+        WHERE status = 'succeeded'
+    ) p
+    LEFT JOIN tutors t ON t.telegram_id = p.user_id
+    WHERE p.rn = 1 AND p.valid_until > datetime('now', 'localtime')
+    ''')
+
+
+def migration_014_group_sessions(cursor):
+    """Сессии групповых занятий: одна строка на проведение группы, строки lessons учеников ссылаются на нее"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS group_sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tutor_id INTEGER NOT NULL,
+        group_id INTEGER NOT NULL,
+        lesson_date TIMESTAMP NOT NULL,
+        duration INTEGER,
+        price REAL,
+        planner_action_id INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (tutor_id) REFERENCES tutors (id),
+        FOREIGN KEY (group_id) REFERENCES groups (id)
+    )
+    ''')
+    cursor.execute('''
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_group_sessions_group_date ON group_sessions(group_id, lesson_date)
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_group_sessions_planner ON group_sessions(planner_action_id)')
+    _add_column(cursor, 'lessons', 'session_id', 'INTEGER REFERENCES group_sessions(id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_lessons_session ON lessons(session_id)')
+
+    # Существующие групповые занятия: строки одной группы в одно время - одна сессия
+    cursor.execute('''
+    INSERT OR IGNORE INTO group_sessions (tutor_id, group_id, lesson_date, duration, price, planner_action_id, created_at)
+    SELECT MIN(tutor_id), group_id, lesson_date, MAX(duration), MAX(price), MAX(planner_action_id), MIN(created_at)
+    FROM lessons
+    WHERE group_id IS NOT NULL AND lesson_date IS NOT NULL
+    GROUP BY group_id, lesson_date
+    ''')
+    cursor.execute('''
+    UPDATE lessons
+    SET session_id = (
+        SELECT gs.id FROM group_sessions gs
+        WHERE gs.group_id = lessons.group_id AND gs.lesson_date = lessons.lesson_date
+    )
+    WHERE group_id IS NOT NULL AND session_id IS NULL
+    ''')
+
+    # Общие поля сессии копируются в строки учеников: их читают расписание, долги и отчеты
+    for column in ('lesson_date', 'duration', 'price'):
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_group_sessions_{column}
+        AFTER UPDATE OF {column} ON group_sessions
+        WHEN NEW.{column} IS NOT OLD.{column}
+        BEGIN
+            UPDATE lessons SET {column} = NEW.{column} WHERE session_id = NEW.id;
+        END
+        ''')
+    # Сессия без учеников не нужна
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_lessons_session_cleanup
+    AFTER DELETE ON lessons
+    WHEN OLD.session_id IS NOT NULL
+    BEGIN
+        DELETE FROM group_sessions
+        WHERE id = OLD.session_id
+        AND NOT EXISTS (SELECT 1 FROM lessons WHERE session_id = OLD.session_id);
+    END
+    ''')
+
+
+def migration_015_pdf_cache(cursor):
+    """Кэш месячных PDF: файл на диске и file_id Telegram по (репетитор, вид, месяц) и отпечатку данных"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS pdf_cache (
+        tutor_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        year INTEGER NOT NULL,
+        month INTEGER NOT NULL,
+        fingerprint TEXT NOT NULL,
+        file_name TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        telegram_file_id TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_used_at REAL NOT NULL,
+        PRIMARY KEY (tutor_id, kind, year, month)
+    )
+    ''')
+    # Вытеснение: самые давно использованные файлы первыми
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_pdf_cache_last_used ON pdf_cache(last_used_at)')
+
+
+# Вклад пары (занятие l, отчет r) в сводные таблицы. Отчет ищется по (lesson_id, student_id)
+ROLLUP_UNPAID = "l.status != 'cancelled' AND r.lesson_held = 1 AND COALESCE(r.lesson_paid, 0) = 0"
+ROLLUP_UNDONE_HOMEWORK = "l.status != 'cancelled' AND r.lesson_held = 1 AND COALESCE(r.homework_done, 0) = 0"
+
+STUDENT_ROLLUP_COLUMNS = {
+    'unpaid_count': f"CASE WHEN {ROLLUP_UNPAID} THEN 1 ELSE 0 END",
+    'unpaid_amount': f"CASE WHEN {ROLLUP_UNPAID} THEN COALESCE(l.price, 0) ELSE 0 END",
+    'undone_homework_count': f"CASE WHEN {ROLLUP_UNDONE_HOMEWORK} THEN 1 ELSE 0 END",
+    'held_count': "CASE WHEN l.status != 'cancelled' AND r.lesson_held = 1 THEN 1 ELSE 0 END",
+    'reported_count': "CASE WHEN l.status != 'cancelled' AND r.lesson_held IS NOT NULL THEN 1 ELSE 0 END",
+}
+TUTOR_ROLLUP_COLUMNS = {
+    'completed_count': "CASE WHEN l.status = 'completed' THEN 1 ELSE 0 END",
+    'earnings': "CASE WHEN l.status = 'completed' THEN COALESCE(l.price, 0) ELSE 0 END",
+    'paid_earnings': "CASE WHEN l.status = 'completed' AND r.lesson_paid = 1 THEN COALESCE(l.price, 0) ELSE 0 END",
+}
+# Строки, не подходящие под фильтр, ничего не добавляют: триггер не пишет нулевые изменения
+STUDENT_ROLLUP_FILTER = "l.student_id IS NOT NULL AND r.lesson_held IS NOT NULL"
+TUTOR_ROLLUP_FILTER = "l.tutor_id IS NOT NULL AND l.lesson_date IS NOT NULL AND l.status = 'completed'"
+
+
+def _rollup_report_source(row: str) -> str:
+    """Отчет из строки триггера (OLD/NEW) и его занятие из таблицы"""
+    return f"""
+        FROM lessons l, (SELECT {row}.lesson_held AS lesson_held, {row}.lesson_paid AS lesson_paid,
+                                {row}.homework_done AS homework_done) r
+        WHERE l.id = {row}.lesson_id AND l.student_id = {row}.student_id"""
+
+
+def _rollup_no_report_source(row: str) -> str:
+    """Занятие отчета из строки триггера, но без самого отчета"""
+    return f"""
+        FROM lessons l, (SELECT NULL AS lesson_held, NULL AS lesson_paid, NULL AS homework_done) r
+        WHERE l.id = {row}.lesson_id AND l.student_id = {row}.student_id"""
+
+
+def _rollup_lesson_source(row: str) -> str:
+    """Занятие из строки триггера (OLD/NEW) и его отчет из таблицы"""
+    return f"""
+        FROM (SELECT {row}.id AS id, {row}.tutor_id AS tutor_id, {row}.student_id AS student_id,
+                     {row}.lesson_date AS lesson_date, {row}.price AS price, {row}.status AS status) l
+        LEFT JOIN lesson_reports r ON r.lesson_id = l.id AND r.student_id = l.student_id
+        WHERE 1"""
+
+
+def _rollup_apply(sign: int, source: str) -> str:
+    """Операторы триггера, прибавляющие (sign=1) или вычитающие (sign=-1) вклад строк source"""
+    student_values = ', '.join(f"{sign} * ({expr})" for expr in STUDENT_ROLLUP_COLUMNS.values())
+    student_updates = ', '.join(f"{col} = {col} + excluded.{col}" for col in STUDENT_ROLLUP_COLUMNS)
+    tutor_values = ', '.join(f"{sign} * ({expr})" for expr in TUTOR_ROLLUP_COLUMNS.values())
+    tutor_updates = ', '.join(f"{col} = {col} + excluded.{col}" for col in TUTOR_ROLLUP_COLUMNS)
+    return f"""
+        INSERT INTO student_rollups (student_id, {', '.join(STUDENT_ROLLUP_COLUMNS)})
+        SELECT l.student_id, {student_values}
+        {source} AND {STUDENT_ROLLUP_FILTER}
+        ON CONFLICT(student_id) DO UPDATE SET {student_updates};
+        INSERT INTO tutor_monthly_rollups (tutor_id, month, {', '.join(TUTOR_ROLLUP_COLUMNS)})
+        SELECT l.tutor_id, strftime('%Y-%m', l.lesson_date), {tutor_values}
+        {source} AND {TUTOR_ROLLUP_FILTER}
+        ON CONFLICT(tutor_id, month) DO UPDATE SET {tutor_updates};"""
+
+
+def rebuild_rollups(cursor):
+    """Пересчитывает сводные таблицы с нуля (заполнение при миграции и сверка)"""
+    source = """
+    FROM lessons l
+    LEFT JOIN lesson_reports r ON r.lesson_id = l.id AND r.student_id = l.student_id
+    WHERE 1"""
+    cursor.execute('DELETE FROM student_rollups')
+    cursor.execute(f"""
+    INSERT INTO student_rollups (student_id, {', '.join(STUDENT_ROLLUP_COLUMNS)})
+    SELECT l.student_id, {', '.join(f'SUM({expr})' for expr in STUDENT_ROLLUP_COLUMNS.values())}
+    {source} AND {STUDENT_ROLLUP_FILTER}
+    GROUP BY l.student_id
+    """)
+    cursor.execute('DELETE FROM tutor_monthly_rollups')
+    cursor.execute(f"""
+    INSERT INTO tutor_monthly_rollups (tutor_id, month, {', '.join(TUTOR_ROLLUP_COLUMNS)})
+    SELECT l.tutor_id, strftime('%Y-%m', l.lesson_date),
+        {', '.join(f'SUM({expr})' for expr in TUTOR_ROLLUP_COLUMNS.values())}
+    {source} AND {TUTOR_ROLLUP_FILTER}
+    GROUP BY l.tutor_id, strftime('%Y-%m', l.lesson_date)
+    """)
+
+
+def migration_016_rollups(cursor):
+    """Сводные таблицы долгов, посещаемости и заработка, поддерживаемые триггерами"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS student_rollups (
+        student_id INTEGER PRIMARY KEY,
+        unpaid_count INTEGER NOT NULL DEFAULT 0,
+        unpaid_amount REAL NOT NULL DEFAULT 0,
+        undone_homework_count INTEGER NOT NULL DEFAULT 0,
+        held_count INTEGER NOT NULL DEFAULT 0,
+        reported_count INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS tutor_monthly_rollups (
+        tutor_id INTEGER NOT NULL,
+        month TEXT NOT NULL,
+        completed_count INTEGER NOT NULL DEFAULT 0,
+        earnings REAL NOT NULL DEFAULT 0,
+        paid_earnings REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (tutor_id, month)
+    )
+    ''')
+    # Списки долгов ученика читаются по частичным индексам: их размер не зависит от истории
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_lesson_reports_unpaid ON lesson_reports(student_id)
+    WHERE lesson_held = 1 AND COALESCE(lesson_paid, 0) = 0
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_lesson_reports_homework ON lesson_reports(student_id)
+    WHERE lesson_held = 1 AND COALESCE(homework_done, 0) = 0
+    ''')
+    rebuild_rollups(cursor)
+
+    # Триггеры выполняются в транзакции изменения: save_lesson_report, update_report_*,
+    # смена статуса занятия и прямые UPDATE из обработчиков обновляют сводки атомарно.
+    # Изменение пары (занятие, отчет) - вычесть ее старый вклад и прибавить новый.
+    report_changed = ' OR '.join(
+        f"OLD.{col} IS NOT NEW.{col}"
+        for col in ('lesson_id', 'student_id', 'lesson_held', 'lesson_paid', 'homework_done')
+    )
+    lesson_changed = ' OR '.join(
+        f"OLD.{col} IS NOT NEW.{col}"
+        for col in ('tutor_id', 'student_id', 'lesson_date', 'price', 'status')
+    )
+    triggers = {
+        'trg_rollups_reports_insert': (
+            'AFTER INSERT ON lesson_reports',
+            _rollup_apply(-1, _rollup_no_report_source('NEW')) + _rollup_apply(1, _rollup_report_source('NEW'))
+        ),
+        'trg_rollups_reports_update': (
+            'AFTER UPDATE OF lesson_id, student_id, lesson_held, lesson_paid, homework_done ON lesson_reports '
+            f'WHEN {report_changed}',
+            _rollup_apply(-1, _rollup_report_source('OLD')) + _rollup_apply(1, _rollup_no_report_source('OLD'))
+            + _rollup_apply(-1, _rollup_no_report_source('NEW')) + _rollup_apply(1, _rollup_report_source('NEW'))
+        ),
+        'trg_rollups_reports_delete': (
+            'AFTER DELETE ON lesson_reports',
+            _rollup_apply(-1, _rollup_report_source('OLD')) + _rollup_apply(1, _rollup_no_report_source('OLD'))
+        ),
+        'trg_rollups_lessons_insert': (
+            'AFTER INSERT ON lessons',
+            _rollup_apply(1, _rollup_lesson_source('NEW'))
+        ),
+        'trg_rollups_lessons_update': (
+            f'AFTER UPDATE OF tutor_id, student_id, lesson_date, price, status ON lessons WHEN {lesson_changed}',
+            _rollup_apply(-1, _rollup_lesson_source('OLD')) + _rollup_apply(1, _rollup_lesson_source('NEW'))
+        ),
+        'trg_rollups_lessons_delete': (
+            'AFTER DELETE ON lessons',
+            _rollup_apply(-1, _rollup_lesson_source('OLD'))
+        ),
+    }
+    for name, (event, body) in triggers.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body} END")
+
+
+def migration_017_drop_group_sessions(cursor):
+    """Удаление group_sessions: групповое занятие - строки lessons учеников с общими (group_id, lesson_date).
+
+    Сессии не уменьшали ни таблицу lessons, ни число записей при правке, а только
+    добавляли таблицу и триггеры. Правка группового занятия затрагивает строки
+    одного проведения по индексу idx_lessons_group_date.
+    """
+    for trigger in ('trg_group_sessions_lesson_date', 'trg_group_sessions_duration',
+                    'trg_group_sessions_price', 'trg_lessons_session_cleanup'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    cursor.execute('DROP INDEX IF EXISTS idx_lessons_session')
+    if 'session_id' in _get_columns(cursor, 'lessons'):
+        cursor.execute('ALTER TABLE lessons DROP COLUMN session_id')
+    cursor.execute('DROP TABLE IF EXISTS group_sessions')
+
+
+# (версия, описание, функция) — строго по возрастанию версии
+MIGRATIONS = [
+    (1, "Базовая схема", migration_001_base_schema),
+    (2, "lessons.reminder_sent", migration_002_lessons_reminder_sent),
+    (3, "lessons.group_id", migration_003_lessons_group_id),
+    (4, "lesson_reports.parent_performance", migration_004_reports_parent_performance),
+    (5, "lessons.planner_action_id + idx_lessons_planner", migration_005_lessons_planner_action_id),
+    (6, "payments.valid_until", migration_006_payments_valid_until),
+    (7, "Индексы горячих запросов", migration_007_hot_query_indexes),
+    (8, "lessons.lesson_end + триггеры + idx_lessons_status_end", migration_008_lessons_lesson_end),
+    (9, "bonus_mailings.file_ids", migration_009_bonus_mailings_file_ids),
+    (10, "UNIQUE mailing_logs(mailing_id, user_id)", migration_010_mailing_logs_unique),
+    (11, "fsm_states", migration_011_fsm_states),
+    (12, "planner_actions.covered_until", migration_012_planner_covered_until),
+    (13, "VIEW active_subscriptions", migration_013_active_subscriptions_view),
+    (14, "group_sessions + lessons.session_id", migration_014_group_sessions),
+    (15, "pdf_cache", migration_015_pdf_cache),
+    (16, "student_rollups + tutor_monthly_rollups + триггеры", migration_016_rollups),
+    (17, "Удаление group_sessions и lessons.session_id", migration_017_drop_group_sessions),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Возвращает текущую версию схемы"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def get_pending_migrations(conn: sqlite3.Connection) -> list:
+    """Возвращает миграции, которые еще не применены"""
+    current = get_schema_version(conn)
+    return [migration for migration in MIGRATIONS if migration[0] > current]
+
+
+def migrate(conn: sqlite3.Connection, dry_run: bool = False) -> list:
+    """Применяет неприменённые миграции, возвращает список (версия, описание)"""
+    if get_schema_version(conn) >= LATEST_VERSION:
+        return []
+    if dry_run:
+        return [(version, description) for version, description, _ in get_pending_migrations(conn)]
+
+    applied = []
+    for version, description, step in MIGRATIONS:
+        # BEGIN IMMEDIATE берет блокировку записи: параллельный процесс
+        # дождется ее и увидит уже повышенную версию
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if version <= get_schema_version(conn):
+                conn.rollback()
+                continue
+            cursor = conn.cursor()
+            step(cursor)
+            cursor.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.error(f"Ошибка миграции {version} ({description})")
+            raise
+
+        logger.info(f"Применена миграция {version}: {description}")
+        applied.append((version, description))
+
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Миграции схемы базы данных')
+    parser.add_argument('--db', default='tutor_bot.db', help='Путь к файлу базы данных')
+    parser.add_argument('--dry-run', '-n', action='store_true', help='Только показать неприменённые миграции')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        print(f"Текущая версия схемы: {get_schema_version(conn)}, последняя: {LATEST_VERSION}")
+        applied = migrate(conn, dry_run=args.dry_run)
+        if not applied:
+            print("Схема актуальна")
+        for version, description in applied:
+            prefix = "Будет применена" if args.dry_run else "Применена"
+            print(f"{prefix} миграция {version}: {description}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
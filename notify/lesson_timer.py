@@ -0,0 +1,201 @@
+"""Таймер событий занятий: напоминания, подтверждения и окончание занятий"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Типы событий
+REMINDER = 'reminder'          # напоминание репетитору перед занятием
+CONFIRMATION = 'confirmation'  # запрос подтверждения у ученика за сутки
+LESSON_END = 'lesson_end'      # предложение заполнить отчет после занятия
+
+REMINDER_BEFORE = timedelta(minutes=60)
+CONFIRMATION_BEFORE = timedelta(hours=24)
+MISSED_EVENT_GRACE = timedelta(hours=1)  # пропущенные (например, при рестарте) события еще отправляются
+HORIZON = timedelta(days=2)              # на сколько вперед держим события в памяти
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def lesson_events(lesson: dict, now: datetime) -> list:
+    """Возвращает [(время, тип)] событий занятия, которые еще нужно отправить"""
+    try:
+        start = datetime.fromisoformat(str(lesson['lesson_date']))
+    except ValueError:
+        logger.error(f"Неверный формат даты занятия #{lesson.get('id')}: {lesson.get('lesson_date')}")
+        return []
+
+    if lesson.get('lesson_end'):
+        end = datetime.fromisoformat(str(lesson['lesson_end']))
+    else:
+        end = start + timedelta(minutes=lesson.get('duration') or 0)
+
+    events = [
+        (start - CONFIRMATION_BEFORE, CONFIRMATION),
+        (end, LESSON_END),
+    ]
+    if not lesson.get('reminder_sent'):
+        events.append((start - REMINDER_BEFORE, REMINDER))
+
+    result = []
+    for fire_at, kind in events:
+        if kind != LESSON_END and start <= now:
+            continue  # занятие уже началось
+        # Подтверждение будущего занятия, созданного меньше чем за сутки до начала,
+        # отправляется сразу; повторная отправка после перезагрузки таймера не происходит:
+        # get_upcoming_lessons_for_notification пропускает занятия с записью в lesson_confirmations
+        if kind != CONFIRMATION and fire_at < now - MISSED_EVENT_GRACE:
+            continue
+        result.append((max(fire_at, now), kind))
+    return result
+
+
+class LessonTimer:
+    """Очередь событий занятий с ожиданием до ближайшего срока вместо периодического опроса БД.
+
+    Занятия загружаются один раз на HORIZON вперед и затем поддерживаются
+    актуальными через Database.notify_lessons_changed. Обработчики получают
+    список id занятий, чье событие наступило: handler(lesson_ids).
+    """
+
+    def __init__(self, db, horizon: timedelta = HORIZON):
+        self.db = db
+        self.horizon = horizon
+        self._handlers = {}
+        self._heap = []              # (время, порядковый номер, тип, id занятия, версия)
+        self._versions = {}          # id занятия -> актуальная версия его событий
+        self._counter = itertools.count()
+        self._next_reload = None
+        self._reload_requested = False
+        self._wakeup = None
+        self._loop = None
+        self._tasks = set()
+
+    def on(self, kind: str, handler):
+        """Регистрирует обработчик событий указанного типа"""
+        self._handlers[kind] = handler
+
+    async def run(self):
+        """Основной цикл: спит до ближайшего события и вызывает обработчики"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self.db.add_lesson_listener(self.notify_changed)
+        logger.info("🚀 Таймер событий занятий запущен")
+
+        try:
+            await self.reload()
+            while True:
+                if self._reload_requested or datetime.now() >= self._next_reload:
+                    await self.reload()
+
+                self._wakeup.clear()
+                delay = self._seconds_until_next()
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                await self._fire_due()
+        except asyncio.CancelledError:
+            logger.info("Таймер событий занятий остановлен")
+            raise
+        finally:
+            self.db.remove_lesson_listener(self.notify_changed)
+            for task in list(self._tasks):
+                task.cancel()
+
+    async def reload(self):
+        """Перечитывает занятия на горизонт вперед одним запросом по индексу"""
+        self._reload_requested = False
+        now = datetime.now()
+        # Идущие занятия нужны ради окончания, будущие - с запасом на подтверждение за сутки
+        start = (now - MISSED_EVENT_GRACE).strftime(DATE_FORMAT)
+        end = (now + self.horizon + CONFIRMATION_BEFORE).strftime(DATE_FORMAT)
+
+        lessons = await self.db.a.get_lessons_for_timer(start, end)
+
+        self._heap = []
+        self._versions = {}
+        for lesson in lessons:
+            self._schedule_lesson(lesson, now)
+        heapq.heapify(self._heap)
+        self._next_reload = now + self.horizon / 2
+
+        logger.info(f"Таймер занятий: загружено {len(lessons)} занятий, событий: {len(self._heap)}")
+
+    def notify_changed(self, lesson_ids=None):
+        """Подписчик Database: вызывается из любого потока после изменения занятий"""
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._on_changed, lesson_ids)
+
+    def _on_changed(self, lesson_ids):
+        if not lesson_ids:
+            # Изменения не перечислены (например, вся группа) - перечитываем горизонт
+            self._reload_requested = True
+            self._wakeup.set()
+            return
+
+        task = asyncio.create_task(self._refresh(lesson_ids))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, lesson_ids):
+        """Пересчитывает события измененных занятий"""
+        try:
+            lessons = await self.db.a.get_lessons_for_timer_by_ids(list(lesson_ids))
+            now = datetime.now()
+            # Старые события этих занятий становятся недействительными
+            for lesson_id in lesson_ids:
+                self._versions[lesson_id] = self._versions.get(lesson_id, 0) + 1
+            horizon_end = now + self.horizon
+            for lesson in lessons:
+                self._schedule_lesson(lesson, now, horizon_end, push=True)
+            self._wakeup.set()
+        except Exception as e:
+            logger.error(f"Ошибка при обновлении событий занятий {lesson_ids}: {e}")
+
+    def _schedule_lesson(self, lesson, now, horizon_end=None, push=False):
+        lesson_id = lesson['id']
+        version = self._versions.setdefault(lesson_id, 0)
+        for fire_at, kind in lesson_events(lesson, now):
+            if horizon_end and fire_at > horizon_end:
+                continue  # попадет в очередь при следующей перезагрузке
+            entry = (fire_at, next(self._counter), kind, lesson_id, version)
+            if push:
+                heapq.heappush(self._heap, entry)
+            else:
+                self._heap.append(entry)
+
+    def _seconds_until_next(self) -> float:
+        now = datetime.now()
+        next_time = self._next_reload
+        if self._heap and self._heap[0][0] < next_time:
+            next_time = self._heap[0][0]
+        return max((next_time - now).total_seconds(), 0)
+
+    async def _fire_due(self):
+        """Извлекает наступившие события и вызывает обработчики пачкой по типу"""
+        now = datetime.now()
+        due = {}
+        while self._heap and self._heap[0][0] <= now:
+            _, _, kind, lesson_id, version = heapq.heappop(self._heap)
+            if self._versions.get(lesson_id) != version:
+                continue  # занятие перенесли после постановки события
+            due.setdefault(kind, []).append(lesson_id)
+
+        for kind, lesson_ids in due.items():
+            handler = self._handlers.get(kind)
+            if not handler:
+                continue
+            logger.info(f"⏰ Событие {kind} для занятий {lesson_ids}")
+            try:
+                await handler(lesson_ids)
+            except Exception as e:
+                logger.error(f"Ошибка в обработчике события {kind}: {e}")
@@ -16,8 +16,11 @@ class NotificationManager:
         # Проверяем формат дат занятий при инициализации
         #self.check_lesson_dates_format()
     
-    def get_upcoming_lessons_for_notification(self):
-        """Получает занятия, которые нужно уведомить (на сегодня и за 24 часа)"""
+    def get_upcoming_lessons_for_notification(self, lesson_ids=None):
+        """Получает занятия, которые нужно уведомить (на сегодня и за 24 часа)
+
+        lesson_ids ограничивает выборку занятиями, для которых сработал таймер.
+        """
         logger.info("🔍 Поиск занятий для уведомления (сегодня + завтра)")
         
         try:
@@ -33,7 +36,7 @@ class NotificationManager:
                 FROM lessons l
                 JOIN students s ON l.student_id = s.id
                 JOIN tutors t ON l.tutor_id = t.id
-                WHERE date(l.lesson_date) IN (date('now'), date('now', '+1 day'))
+                WHERE l.lesson_date >= date('now') AND l.lesson_date < date('now', '+2 days')
                 """
                 
                 cursor.execute(debug_query)
@@ -50,7 +53,7 @@ class NotificationManager:
                 SELECT s.id, s.full_name, s.student_telegram_id
                 FROM students s
                 JOIN lessons l ON s.id = l.student_id
-                WHERE date(l.lesson_date) IN (date('now'), date('now', '+1 day'))
+                WHERE l.lesson_date >= date('now') AND l.lesson_date < date('now', '+2 days')
                 AND (s.student_telegram_id IS NULL OR s.student_telegram_id = '')
                 """
                 
@@ -66,7 +69,7 @@ class NotificationManager:
                 FROM lesson_confirmations lc
                 JOIN lessons l ON lc.lesson_id = l.id
                 JOIN students s ON l.student_id = s.id
-                WHERE date(l.lesson_date) IN (date('now'), date('now', '+1 day'))
+                WHERE l.lesson_date >= date('now') AND l.lesson_date < date('now', '+2 days')
                 AND date(lc.notified_at) = date('now')
                 """
                 
@@ -83,18 +86,21 @@ class NotificationManager:
                 FROM lessons l
                 JOIN students s ON l.student_id = s.id
                 JOIN tutors t ON l.tutor_id = t.id
-                WHERE date(l.lesson_date) IN (date('now'), date('now', '+1 day'))
+                WHERE l.lesson_date >= date('now') AND l.lesson_date < date('now', '+2 days')
                 AND l.status = 'planned'
                 AND s.student_telegram_id IS NOT NULL 
                 AND s.student_telegram_id != ''
                 AND NOT EXISTS (
                     SELECT 1 FROM lesson_confirmations lc 
-                    WHERE lc.lesson_id = l.id 
-                    AND date(lc.notified_at) = date('now')
+                    WHERE lc.lesson_id = l.id
                 )
                 """
+                params = []
+                if lesson_ids:
+                    query += f" AND l.id IN ({','.join('?' * len(lesson_ids))})"
+                    params = list(lesson_ids)
                 
-                cursor.execute(query)
+                cursor.execute(query, params)
                 lessons = [dict(row) for row in cursor.fetchall()]
                 
                 logger.info(f"🎯 Найдено занятий для уведомления: {len(lessons)}")
@@ -220,7 +226,9 @@ class NotificationManager:
             
             # Создаем запись подтверждения и получаем confirmation_id
             notification_time = datetime.strptime(lesson_date, '%Y-%m-%d %H:%M:%S')
-            confirmation_id = self.create_notification_record(lesson_id, student_telegram_id, notification_time)
+            confirmation_id = await self.db.a.run(
+                self.create_notification_record, lesson_id, student_telegram_id, notification_time
+            )
             
             if not confirmation_id:
                 logger.error(f"❌ Не удалось создать запись подтверждения для занятия #{lesson_id}")
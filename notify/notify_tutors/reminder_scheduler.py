@@ -1,5 +1,4 @@
 # notify/notify_tutors/reminder_scheduler.py
-import asyncio
 import logging
 from datetime import datetime
 from database import db
@@ -11,10 +10,13 @@ class ReminderScheduler:
     def __init__(self, bot):
         self.bot = bot
         self.is_running = False
-        self.task = None
 
     async def start(self):
-        """Запуск планировщика напоминаний"""
+        """Запуск планировщика напоминаний
+
+        Собственного цикла опроса нет: момент отправки определяет LessonTimer,
+        который вызывает check_and_send_reminders за час до занятия.
+        """
         if self.is_running:
             logger.warning("Планировщик уже запущен")
             return
@@ -23,43 +25,22 @@ class ReminderScheduler:
         logger.info("🚀 Планировщик напоминаний запущен")
         
         # Сбрасываем напоминания для прошедших занятий при запуске
-        reset_count = db.reset_reminders_for_past_lessons()
+        reset_count = await db.a.reset_reminders_for_past_lessons()
         logger.info(f"Сброшено {reset_count} напоминаний для прошедших занятий")
-        
-        self.task = asyncio.create_task(self._scheduler_loop())
-        return self.task
 
-    async def _scheduler_loop(self):
-        """Основной цикл планировщика с отправкой напоминаний"""
-        try:
-            while self.is_running:
-                try:
-                    # Проверяем и отправляем напоминания
-                    await self.check_and_send_reminders()
-                    await asyncio.sleep(300)  # Проверка каждые 5 минут
-                    
-                except Exception as e:
-                    logger.error(f"Ошибка в цикле планировщика: {e}")
-                    await asyncio.sleep(60)
-                    
-        except asyncio.CancelledError:
-            logger.info("Планировщик напоминаний остановлен по запросу")
-        except Exception as e:
-            logger.error(f"Критическая ошибка в планировщике: {e}")
-        finally:
-            self.is_running = False
-            logger.info("Цикл планировщика завершен")
+    async def check_and_send_reminders(self, lesson_ids=None):
+        """Отправляет напоминания о занятиях, начинающихся в ближайшие 60 минут
 
-    async def check_and_send_reminders(self):
-        """Проверяет и отправляет напоминания о занятиях в ближайшие 60 минут"""
+        lesson_ids ограничивает отправку занятиями, для которых сработал таймер.
+        """
         try:
             current_time = datetime.now().strftime("%H:%M:%S")
             logger.debug(f"Проверка напоминаний в {current_time}")
             
-            lessons = db.get_lessons_for_reminder()
+            lessons = await db.a.get_lessons_for_reminder(lesson_ids)
             
-            # Словарь для отслеживания уже отправленных групповых занятий
-            sent_group_lessons = {}
+            # Групповые занятия (группа, время), о которых уже напомнили в этом проходе
+            sent_groups = set()
             
             if lessons:
                 logger.info(f"Найдено {len(lessons)} занятий для напоминания")
@@ -68,22 +49,23 @@ class ReminderScheduler:
                     try:
                         # Проверяем, является ли занятие групповым
                         group_id = lesson.get('group_id')
+                        group_key = (group_id, lesson.get('lesson_date'))
                         
                         if group_id:  # Это групповое занятие
-                            if group_id not in sent_group_lessons:
+                            if group_key not in sent_groups:
                                 # Отправляем напоминание о групповом занятии
                                 await self.send_group_lesson_reminder(lesson)
-                                sent_group_lessons[group_id] = True
+                                sent_groups.add(group_key)
                                 
-                                # Помечаем ВСЕ занятия этой группы как отправленные
-                                self.mark_group_lessons_as_sent(group_id)
+                                # Помечаем занятия учеников этого проведения как отправленные
+                                await db.a.run(self.mark_group_lessons_as_sent, *group_key)
                                 logger.info(f"✅ Групповое напоминание отправлено для группы #{group_id}")
                             else:
-                                logger.debug(f"Пропускаем дублирующее групповое занятие #{group_id}")
+                                logger.debug(f"Пропускаем дублирующее занятие группы #{group_id}")
                         else:
                             # Это индивидуальное занятие
                             await self.send_lesson_reminder(lesson)
-                            if db.mark_reminder_sent(lesson['lesson_id']):
+                            if await db.a.mark_reminder_sent(lesson['lesson_id']):
                                 logger.info(f"✅ Индивидуальное напоминание отправлено для занятия #{lesson['lesson_id']}")
                             else:
                                 logger.error(f"❌ Не удалось пометить напоминание как отправленное для занятия #{lesson['lesson_id']}")
@@ -130,11 +112,11 @@ class ReminderScheduler:
             
             # Получаем количество студентов в группе
             group_id = lesson['group_id']
-            students = db.get_students_in_group(group_id)
+            students = await db.a.get_students_in_group(group_id)
             students_count = len(students) if students else 0
             
             # Получаем название группы
-            group = db.get_group_by_id(group_id)
+            group = await db.a.get_group_by_id(group_id)
             group_name = group['name'] if group else 'Без названия'
             
             message = (
@@ -155,18 +137,18 @@ class ReminderScheduler:
         except Exception as e:
             logger.error(f"💥 Ошибка при отправке группового напоминания: {e}")
 
-    def mark_group_lessons_as_sent(self, group_id):
-        """Помечает все занятия группы как отправленные"""
+    def mark_group_lessons_as_sent(self, group_id, lesson_date):
+        """Помечает занятия учеников одного проведения группового занятия как отправленные"""
         try:
             with db.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                 UPDATE lessons 
                 SET reminder_sent = 1 
-                WHERE group_id = ? 
+                WHERE group_id = ? AND lesson_date = ?
                 AND status = 'planned'
                 AND reminder_sent = 0
-                ''', (group_id,))
+                ''', (group_id, lesson_date))
                 conn.commit()
                 marked_count = cursor.rowcount
                 logger.info(f"Помечено {marked_count} занятий группы #{group_id} как отправленные")
@@ -184,22 +166,13 @@ class ReminderScheduler:
         logger.info("Остановка планировщика напоминаний...")
         self.is_running = False
         
-        if self.task and not self.task.done():
-            self.task.cancel()
-            try:
-                await self.task
-            except asyncio.CancelledError:
-                pass
-            except Exception as e:
-                logger.error(f"Ошибка при ожидании остановки задачи: {e}")
-        
         logger.info("Планировщик напоминаний успешно остановлен")
 
     async def send_custom_reminder(self, tutor_id: int, message: str):
         """Отправляет кастомное напоминание репетитору"""
         try:
             # Получаем telegram_id репетитора
-            tutor_info = db.get_tutor_by_id(tutor_id)
+            tutor_info = await db.a.get_tutor_by_id(tutor_id)
             if tutor_info and tutor_info.get('telegram_id'):
                 await self.bot.send_message(
                     chat_id=tutor_info['telegram_id'],
@@ -5,6 +5,7 @@ from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.exceptions import TelegramBadRequest
 from handlers.start.welcome import show_main_menu
 from payment.config import TARIF
+from database import db
 from .models import PaymentManager
 from .yookassa_integration import YooKassaManager
 import logging
@@ -327,9 +328,6 @@ async def back_to_settings_handler(callback: types.CallbackQuery, state: FSMCont
 async def back_to_main_menu_handler(callback: types.CallbackQuery):
     """Обработчик возврата в главное меню"""
     try:
-        from database import Database
-        
-        db = Database()
         with db.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM tutors WHERE telegram_id = ?", (callback.from_user.id,))
@@ -37,7 +37,10 @@ class SubscriptionMiddleware(BaseMiddleware):
         
         # 🔥 ВАЖНО: ЕСЛИ ПОЛЬЗОВАТЕЛЬ АДМИН - ПРОПУСКАЕМ ВСЕ ПРОВЕРКИ
         user_id = real_event.from_user.id
-        if db.is_admin(user_id):
+        context = data.get('user_context')  # от UserContextMiddleware
+        if context is None:
+            context = await db.a.get_user_context(user_id)
+        if context['user_role'] == 'admin':
             return await handler(event, data)
         
         # 🔍 Проверяем, является ли это премиум-функцией
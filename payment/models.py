@@ -1,18 +1,67 @@
 from datetime import datetime, timedelta
 import time
 from typing import Optional
-from database import Database
+from database import db
 import logging
 import sqlite3
 
 logger = logging.getLogger(__name__)
 
+SUBSCRIPTION_MISS_TTL = 300  # секунд помним, что активной подписки нет
+
+
+class SubscriptionCache:
+    """Кэш подписок процесса: telegram_id -> valid_until.
+
+    Активная подписка хранится до своего valid_until, отсутствие подписки -
+    SUBSCRIPTION_MISS_TTL секунд. PaymentManager сбрасывает запись пользователя
+    при любом изменении его платежей.
+    """
+
+    def __init__(self, miss_ttl: int = SUBSCRIPTION_MISS_TTL):
+        self.miss_ttl = miss_ttl
+        self._entries = {}  # telegram_id -> (valid_until или None, время истечения записи)
+
+    def get(self, user_id: int):
+        """Возвращает (есть ли запись, valid_until или None)"""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return False, None
+        valid_until, expires_at = entry
+        if datetime.now() >= expires_at:
+            self._entries.pop(user_id, None)
+            return False, None
+        return True, valid_until
+
+    def set(self, user_id: int, valid_until: Optional[datetime]):
+        """Запоминает срок подписки (None или прошедшая дата - подписки нет)"""
+        now = datetime.now()
+        if valid_until and valid_until > now:
+            self._entries[user_id] = (valid_until, valid_until)
+        else:
+            self._entries[user_id] = (None, now + timedelta(seconds=self.miss_ttl))
+
+    def invalidate(self, user_id: int):
+        """Сбрасывает запись пользователя"""
+        self._entries.pop(user_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+subscription_cache = SubscriptionCache()
+
+
 class PaymentManager:
     @staticmethod
     async def get_payment_info(user_id: int) -> dict:
         """Получает актуальную информацию о подписке пользователя из таблицы payments"""
+        return await db.a.run(PaymentManager._get_payment_info_sync, user_id)
+
+    @staticmethod
+    def _get_payment_info_sync(user_id: int) -> dict:
+        """Синхронная часть get_payment_info (выполняется в пуле потоков БД)"""
         try:
-            db = Database()
             with db.get_connection() as conn:
                 cursor = conn.cursor()
                 
@@ -59,7 +108,6 @@ class PaymentManager:
                                 amount: float, status: str, days: int) -> bool:
         """Создает или ОБНОВЛЯЕТ запись о платеже - НОВАЯ ЛОГИКА"""
         try:
-            db = Database()
             with db.get_connection() as conn:
                 cursor = conn.cursor()
                 
@@ -122,6 +170,7 @@ class PaymentManager:
                     logger.info(f"Created new payment record: {payment_id}")
                 
                 conn.commit()
+                subscription_cache.invalidate(user_id)
                 return True
                 
         except Exception as e:
@@ -133,7 +182,6 @@ class PaymentManager:
     async def update_payment_status(payment_id: str, status: str) -> bool:
         """Обновляет статус платежа"""
         try:
-            db = Database()
             with db.get_connection() as conn:
                 cursor = conn.cursor()
                 
@@ -143,9 +191,15 @@ class PaymentManager:
                        WHERE payment_id = ?""",
                     (status, payment_id)
                 )
+                updated = cursor.rowcount > 0
                 
                 conn.commit()
-                return cursor.rowcount > 0
+                
+                cursor.execute("SELECT user_id FROM payments WHERE payment_id = ?", (payment_id,))
+                row = cursor.fetchone()
+                if row:
+                    subscription_cache.invalidate(row[0])
+                return updated
                 
         except Exception as e:
             logger.error(f"Error updating payment status: {e}")
@@ -153,14 +207,30 @@ class PaymentManager:
 
     @staticmethod
     async def check_subscription(user_id: int) -> bool:
-        """Проверка активной подписки"""
+        """Проверка активной подписки (через subscription_cache, без запроса к БД при попадании)"""
+        cached, valid_until = subscription_cache.get(user_id)
+        if cached:
+            return valid_until is not None
+
         info = await PaymentManager.get_payment_info(user_id)
+        if info:
+            try:
+                valid_until = info.get('valid_until') if info.get('is_active') else None
+                subscription_cache.set(
+                    user_id, datetime.strptime(valid_until, '%Y-%m-%d %H:%M:%S') if valid_until else None
+                )
+            except ValueError:
+                logger.error(f"Неверный формат valid_until для пользователя {user_id}: {info.get('valid_until')}")
         return info and info['is_active']
 
     @staticmethod
     async def get_subscription_end_date(user_id: int) -> Optional[datetime]:
         """Возвращает дату окончания текущей подписки"""
         try:
+            cached, valid_until = subscription_cache.get(user_id)
+            if cached:
+                return valid_until
+
             payment_info = await PaymentManager.get_payment_info(user_id)
             if payment_info and payment_info['is_active']:
                 return datetime.strptime(payment_info['valid_until'], '%Y-%m-%d %H:%M:%S')
@@ -173,7 +243,6 @@ class PaymentManager:
     async def debug_check_payments(user_id: int):
         """Отладочная функция для проверки всех платежей пользователя"""
         try:
-            db = Database()
             with db.get_connection() as conn:
                 cursor = conn.cursor()
                 
@@ -193,7 +262,6 @@ class PaymentManager:
     async def create_free_trial(user_id: int) -> bool:
         """Создает бесплатную пробную подписку на 7 дней"""
         try:
-            db = Database()
             with db.get_connection() as conn:
                 cursor = conn.cursor()
                 
@@ -236,6 +304,7 @@ class PaymentManager:
                 )
                 
                 conn.commit()
+                subscription_cache.invalidate(user_id)
                 logger.info(f"Создан бесплатный пробный период для пользователя {user_id}")
                 return True
                 
@@ -3,14 +3,14 @@ import logging
 from datetime import datetime, timedelta
 from typing import List, Set
 from aiogram import Bot
-from database import Database
+from database import db
 
 logger = logging.getLogger(__name__)
 
 class TrialNotificationManager:
     def __init__(self, bot: Bot):
         self.bot = bot
-        self.db = Database()
+        self.db = db
         self.sent_notifications: Set[int] = set()  # Храним ID пользователей, которым уже отправили уведомление
 
     async def get_users_with_expiring_trial(self, hours_before: int = 24) -> List[dict]:
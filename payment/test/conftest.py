@@ -77,4 +77,13 @@ def event_loop():
     policy = asyncio.get_event_loop_policy()
     loop = policy.new_event_loop()
     yield loop
-    loop.close()
\ No newline at end of file
+    loop.close()
+
+
+@pytest.fixture(autouse=True)
+def clear_subscription_cache():
+    """Сбрасывает кэш подписок, чтобы тесты не видели результаты друг друга"""
+    from payment.models import subscription_cache
+    subscription_cache.clear()
+    yield
+    subscription_cache.clear()
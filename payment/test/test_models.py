@@ -1,6 +1,6 @@
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
-from payment.models import PaymentManager, db
+from payment.models import PaymentManager, SubscriptionCache, subscription_cache, db
 from datetime import datetime, timedelta
 
 @pytest.mark.asyncio
@@ -162,4 +162,50 @@ async def test_check_subscription_expired():
         is_active = await PaymentManager.check_subscription(123)
         
         # Метод возвращает False, когда подписка есть но неактивна
-        assert is_active == False
\ No newline at end of file
+        assert is_active == False
+
+
+@pytest.mark.asyncio
+async def test_check_subscription_uses_cache():
+    """Тест: повторная проверка подписки не обращается к БД"""
+    valid_until = (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d %H:%M:%S')
+    mock_info = {'valid_until': valid_until, 'tariff': 'Premium', 'is_active': True}
+
+    with patch.object(PaymentManager, 'get_payment_info', new=AsyncMock(return_value=mock_info)) as mock_get:
+        assert await PaymentManager.check_subscription(123) == True
+        assert await PaymentManager.check_subscription(123) == True
+        assert mock_get.await_count == 1
+
+        subscription_cache.invalidate(123)
+        assert await PaymentManager.check_subscription(123) == True
+        assert mock_get.await_count == 2
+
+
+def test_subscription_cache_expiry():
+    """Тест: запись кэша истекает вместе с подпиской, отсутствие подписки - через miss_ttl"""
+    cache = SubscriptionCache(miss_ttl=0)
+
+    cache.set(1, datetime.now() - timedelta(seconds=1))
+    assert cache.get(1) == (False, None)
+
+    valid_until = datetime.now() + timedelta(days=1)
+    cache.set(2, valid_until)
+    assert cache.get(2) == (True, valid_until)
+
+    cache._entries[2] = (valid_until, datetime.now() - timedelta(seconds=1))
+    assert cache.get(2) == (False, None)
+
+
+@pytest.mark.asyncio
+async def test_create_free_trial_invalidates_cache(tmp_path):
+    """Тест: создание пробного периода сбрасывает кэш пользователя"""
+    from database import Database
+
+    test_db = Database(str(tmp_path / "payments.db"))
+    subscription_cache.set(777, None)
+    try:
+        with patch('payment.models.db', test_db):
+            assert await PaymentManager.create_free_trial(777) == True
+        assert subscription_cache.get(777) == (False, None)
+    finally:
+        test_db.close()
@@ -0,0 +1,41 @@
+# report_pdf/fonts.py
+import logging
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+logger = logging.getLogger(__name__)
+
+# (обычный, жирный) - от предпочтительного к запасному
+FONT_CANDIDATES = [
+    (('DejaVuSans', 'DejaVuSans.ttf'), ('DejaVuSans-Bold', 'DejaVuSans-Bold.ttf')),
+    (('Arial', 'arial.ttf'), ('Arial-Bold', 'arialbd.ttf')),
+]
+FALLBACK_FONTS = ('Helvetica', 'Helvetica-Bold')
+
+_registered_fonts = None
+
+
+def register_fonts() -> tuple:
+    """Регистрирует шрифты с поддержкой кириллицы, возвращает (обычный, жирный).
+
+    TTF разбирается один раз на процесс: повторные вызовы возвращают уже
+    зарегистрированные имена.
+    """
+    global _registered_fonts
+    if _registered_fonts is not None:
+        return _registered_fonts
+
+    for normal, bold in FONT_CANDIDATES:
+        try:
+            pdfmetrics.registerFont(TTFont(*normal))
+            pdfmetrics.registerFont(TTFont(*bold))
+            _registered_fonts = (normal[0], bold[0])
+            break
+        except Exception:
+            continue
+    else:
+        # Стандартные шрифты (могут быть проблемы с кириллицей)
+        logger.warning("Шрифты с кириллицей не найдены, используется Helvetica")
+        _registered_fonts = FALLBACK_FONTS
+    return _registered_fonts
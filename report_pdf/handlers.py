@@ -1,24 +1,64 @@
 from aiogram import F
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.types import Message, CallbackQuery, BufferedInputFile
 from datetime import datetime
+import asyncio
 import io
 from aiogram import Router
 
 from handlers.start.welcome import show_main_menu
 
-from .pdf_generator import PDFReportGenerator
-from .schedule_generator import SchedulePDFGenerator
+from .pdf_cache import pdf_cache, KIND_REPORT, KIND_SCHEDULE
+from .render_service import pdf_renderer
 from .report_service import ReportService
 from .schedule_service import ScheduleService
+from database import db
 from .keyboards import (
     get_statistics_keyboard, 
     get_reports_months_keyboard, 
     get_schedule_months_keyboard,
     get_back_to_statistics_keyboard
 )
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = Router()
 
+
+async def send_monthly_pdf(message: Message, tutor_id: int, kind: str, year: int, month: int,
+                           render, filename: str, caption: str):
+    """Отправляет месячный PDF, по возможности из кэша.
+
+    render - корутинная функция без аргументов, которая собирает данные и
+    рисует PDF; она вызывается только если данные месяца изменились с
+    прошлой отрисовки. Если файл уже отправлялся, он переотправляется по
+    file_id без загрузки.
+    """
+    fingerprint = await db.a.run(pdf_cache.fingerprint, tutor_id, kind, year, month)
+    cached = await db.a.run(pdf_cache.get, tutor_id, kind, year, month, fingerprint)
+
+    if cached and cached['file_id']:
+        try:
+            await message.answer_document(document=cached['file_id'], caption=caption)
+            return
+        except TelegramBadRequest as e:
+            logger.warning(f"file_id из кэша PDF не принят Telegram: {e}")
+            await db.a.run(pdf_cache.set_file_id, tutor_id, kind, year, month, fingerprint, None)
+
+    pdf_bytes = await asyncio.to_thread(pdf_cache.read, cached) if cached else None
+    if pdf_bytes is None:
+        pdf_bytes = await render()
+        await db.a.run(pdf_cache.put, tutor_id, kind, year, month, fingerprint, pdf_bytes)
+
+    sent = await message.answer_document(
+        document=BufferedInputFile(pdf_bytes, filename=filename),
+        caption=caption
+    )
+    if sent.document:
+        await db.a.run(pdf_cache.set_file_id, tutor_id, kind, year, month, fingerprint, sent.document.file_id)
+
+
 @router.callback_query(F.data == "statistics_menu")
 async def statistics_menu(callback: CallbackQuery):
     """Меню статистики"""
@@ -31,9 +71,6 @@ async def statistics_menu(callback: CallbackQuery):
 @router.callback_query(F.data == "reports_menu")
 async def reports_menu(callback: CallbackQuery):
     """Меню отчетов - выбор месяца"""
-    from database import Database
-    
-    db = Database()
     tutor = db.get_tutor_by_telegram_id(callback.from_user.id)
     
     if not tutor:
@@ -60,9 +97,6 @@ async def reports_menu(callback: CallbackQuery):
 @router.callback_query(F.data == "schedule_menu")
 async def schedule_menu(callback: CallbackQuery):
     """Меню расписания - выбор месяца"""
-    from database import Database
-    
-    db = Database()
     tutor = db.get_tutor_by_telegram_id(callback.from_user.id)
     
     if not tutor:
@@ -89,14 +123,11 @@ async def schedule_menu(callback: CallbackQuery):
 @router.callback_query(F.data.startswith("report_month_"))
 async def generate_monthly_report(callback: CallbackQuery):
     """Генерация отчета за выбранный месяц"""
-    from database import Database
-    
     # Разбираем callback_data: report_month_2024_12
     parts = callback.data.split("_")
     year = int(parts[2])
     month = int(parts[3])
     
-    db = Database()
     tutor = db.get_tutor_by_telegram_id(callback.from_user.id)
     
     if not tutor:
@@ -107,46 +138,39 @@ async def generate_monthly_report(callback: CallbackQuery):
     
     try:
         report_service = ReportService()
-        pdf_generator = PDFReportGenerator()
-        
-        # Получаем данные отчета
-        report_data = report_service.get_monthly_report_data(tutor[0], month, year)
-        
-        # Генерируем PDF
-        pdf_buffer = pdf_generator.create_monthly_report(
-            report_data['tutor'],
-            report_data['lessons'],
-            report_data['month'],
-            report_data['year']
-        )
-        
-        # Отправляем файл
+
+        async def render():
+            # Получаем данные отчета (в пуле потоков БД)
+            report_data = await db.a.run(report_service.get_monthly_report_data, tutor[0], month, year)
+            # Генерируем PDF в процессе пула отрисовки
+            return await pdf_renderer.render_monthly_report(
+                report_data['tutor'],
+                report_data['lessons'],
+                report_data['month'],
+                report_data['year'],
+                report_data['stats']
+            )
+
+        # Отправляем файл (из кэша, если данные месяца не менялись)
         month_name = report_service._get_month_name(month)
-        filename = f"отчет_{month_name}_{year}.pdf"
-        
-        await callback.message.answer_document(
-            document=BufferedInputFile(
-                pdf_buffer.getvalue(),
-                filename=filename
-            ),
+        await send_monthly_pdf(
+            callback.message, tutor[0], KIND_REPORT, year, month, render,
+            filename=f"отчет_{month_name}_{year}.pdf",
             caption=f"📊 Отчет за {month_name} {year} года"
         )
-        
+
     except Exception as e:
-        print(f"Error generating report: {e}")
+        logger.error(f"Error generating report: {e}")
         await callback.message.answer("❌ Ошибка при создании отчета")
 
 @router.callback_query(F.data.startswith("schedule_month_"))
 async def generate_monthly_schedule(callback: CallbackQuery):
     """Генерация расписания за выбранный месяц"""
-    from database import Database
-    
     # Разбираем callback_data: schedule_month_2024_12
     parts = callback.data.split("_")
     year = int(parts[2])
     month = int(parts[3])
     
-    db = Database()
     tutor = db.get_tutor_by_telegram_id(callback.from_user.id)
     
     if not tutor:
@@ -157,31 +181,26 @@ async def generate_monthly_schedule(callback: CallbackQuery):
     
     try:
         schedule_service = ScheduleService()
-        schedule_generator = SchedulePDFGenerator()
-        
-        # Получаем данные расписания
-        schedule_data = schedule_service.get_monthly_schedule_data(tutor[0], month, year)
-        
-        # Генерируем PDF
-        pdf_buffer = schedule_generator.create_monthly_schedule(
-            schedule_data['tutor'],
-            schedule_data
-        )
-        
-        # Отправляем файл
+
+        async def render():
+            # Получаем данные расписания (в пуле потоков БД)
+            schedule_data = await db.a.run(schedule_service.get_monthly_schedule_data, tutor[0], month, year)
+            # Генерируем PDF в процессе пула отрисовки
+            return await pdf_renderer.render_monthly_schedule(
+                schedule_data['tutor'],
+                schedule_data
+            )
+
+        # Отправляем файл (из кэша, если данные месяца не менялись)
         month_name = schedule_service._get_month_name(month)
-        filename = f"расписание_{month_name}_{year}.pdf"
-        
-        await callback.message.answer_document(
-            document=BufferedInputFile(
-                pdf_buffer.getvalue(),
-                filename=filename
-            ),
+        await send_monthly_pdf(
+            callback.message, tutor[0], KIND_SCHEDULE, year, month, render,
+            filename=f"расписание_{month_name}_{year}.pdf",
             caption=f"🗓️ Расписание на {month_name} {year} года"
         )
-        
+
     except Exception as e:
-        print(f"Error generating schedule: {e}")
+        logger.error(f"Error generating schedule: {e}")
         await callback.message.answer("❌ Ошибка при создании расписания")
 
 @router.callback_query(F.data == "main_menu")
@@ -0,0 +1,206 @@
+# report_pdf/month_end.py
+"""Пакетная отрисовка месячных отчетов всех репетиторов после закрытия месяца"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from itertools import groupby
+
+from aiogram import Bot
+from aiogram.types import BufferedInputFile
+
+from database import db
+from send_queue import send_queue
+
+from .pdf_cache import pdf_cache, KIND_REPORT
+from .render_service import pdf_renderer, render_monthly_report
+from .report_service import ReportService
+
+logger = logging.getLogger(__name__)
+
+MONTH_END_RUN_DAY = 1    # число месяца, в которое отрисовываются отчеты за прошедший месяц
+MONTH_END_RUN_HOUR = 3   # час запуска (локальное время бота), когда бот почти не загружен
+SLOWEST_TO_LOG = 5       # сколько самых долгих репетиторов писать в лог
+
+TUTOR_COLUMNS = ('tutor_telegram_id', 'tutor_name', 'tutor_phone')
+
+
+def _render_report_timed(tutor_data: dict, lessons: list, month: int, year: int, stats: dict) -> tuple:
+    """Рисует отчет в процессе пула и возвращает (PDF, секунды отрисовки)"""
+    started = time.perf_counter()
+    pdf_bytes = render_monthly_report(tutor_data, lessons, month, year, stats)
+    return pdf_bytes, time.perf_counter() - started
+
+
+def previous_month(now: datetime) -> tuple:
+    """(год, месяц) месяца, предшествующего now"""
+    return (now.year - 1, 12) if now.month == 1 else (now.year, now.month - 1)
+
+
+def next_run_time(now: datetime) -> datetime:
+    """Ближайший момент запуска: MONTH_END_RUN_DAY в MONTH_END_RUN_HOUR:00"""
+    run_at = now.replace(day=MONTH_END_RUN_DAY, hour=MONTH_END_RUN_HOUR, minute=0, second=0, microsecond=0)
+    if run_at <= now:
+        year, month = (now.year + 1, 1) if now.month == 12 else (now.year, now.month + 1)
+        run_at = run_at.replace(year=year, month=month)
+    return run_at
+
+
+class MonthEndReportJob:
+    """Отрисовка отчетов за месяц для всех репетиторов с активной подпиской.
+
+    Занятия всех репетиторов читаются одним запросом, отсортированным по
+    репетитору, и раскладываются по группам. Отчеты рисуются параллельно в
+    пуле процессов pdf_renderer и кладутся в кэш PDF, поэтому запрос отчета
+    первого числа отдается из кэша. При deliver=True свежие отчеты сразу
+    отправляются репетиторам через общую очередь отправки.
+    """
+
+    def __init__(self, bot: Bot = None, deliver: bool = False, database=None, cache=None, renderer=None):
+        self.bot = bot
+        self.deliver = deliver and bot is not None
+        self.db = database or db
+        self.cache = cache or pdf_cache
+        self.renderer = renderer or pdf_renderer
+
+    def collect_month_data(self, year: int, month: int) -> list:
+        """Данные отчетов за месяц: [{'tutor': {...}, 'telegram_id': ..., 'lessons': [...]}]"""
+        start_date, end_date = ReportService.get_period(month, year)
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            # Те же строки, что ReportService._get_lessons_by_period, но сразу для всех репетиторов
+            cursor.execute('''
+            SELECT
+                l.*,
+                s.full_name as student_name,
+                g.name as group_name,
+                g.id as group_id,
+                t.telegram_id as tutor_telegram_id,
+                t.full_name as tutor_name,
+                t.phone as tutor_phone
+            FROM lessons l
+            JOIN active_subscriptions a ON a.tutor_id = l.tutor_id
+            JOIN tutors t ON t.id = l.tutor_id
+            LEFT JOIN students s ON l.student_id = s.id
+            LEFT JOIN groups g ON l.group_id = g.id
+            WHERE l.lesson_date >= ? AND l.lesson_date < ?
+            ORDER BY l.tutor_id, l.lesson_date
+            ''', (start_date, end_date))
+            columns = [col[0] for col in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        tutors = []
+        for tutor_id, tutor_rows in groupby(rows, key=lambda row: row['tutor_id']):
+            tutor_rows = list(tutor_rows)
+            first = tutor_rows[0]
+            tutors.append({
+                'tutor': {'id': tutor_id, 'name': first['tutor_name'], 'phone': first['tutor_phone']},
+                'telegram_id': first['tutor_telegram_id'],
+                'lessons': [
+                    {key: value for key, value in row.items() if key not in TUTOR_COLUMNS}
+                    for row in tutor_rows
+                ],
+            })
+        return tutors
+
+    def _pending(self, tutors: list, year: int, month: int) -> list:
+        """Отбирает репетиторов без актуального отчета в кэше, добавляя им отпечаток данных и итоги месяца"""
+        period = ReportService.get_period(month, year)
+        pending = []
+        for item in tutors:
+            tutor_id = item['tutor']['id']
+            fingerprint = self.cache.fingerprint(tutor_id, KIND_REPORT, year, month)
+            if self.cache.get(tutor_id, KIND_REPORT, year, month, fingerprint) is None:
+                stats = self.db.get_tutor_statistics(tutor_id, {'month': period})['periods']['month']
+                pending.append(dict(item, fingerprint=fingerprint, stats=stats))
+        return pending
+
+    async def _deliver(self, item: dict, year: int, month: int, pdf_bytes: bytes):
+        """Отправляет свежий отчет репетитору и запоминает file_id"""
+        month_name = ReportService()._get_month_name(month)
+        telegram_id = item['telegram_id']
+        sent = await send_queue.call(telegram_id, lambda: self.bot.send_document(
+            telegram_id,
+            document=BufferedInputFile(pdf_bytes, filename=f"отчет_{month_name}_{year}.pdf"),
+            caption=f"📊 Отчет за {month_name} {year} года"
+        ))
+        if sent and sent.document:
+            await self.db.a.run(self.cache.set_file_id, item['tutor']['id'], KIND_REPORT, year, month,
+                                item['fingerprint'], sent.document.file_id)
+
+    async def _process(self, item: dict, year: int, month: int, stats: dict):
+        tutor_id = item['tutor']['id']
+        try:
+            pdf_bytes, elapsed = await self.renderer.run(
+                _render_report_timed, item['tutor'], item['lessons'], month, year, item['stats']
+            )
+            stats['per_tutor'][tutor_id] = elapsed
+            await self.db.a.run(self.cache.put, tutor_id, KIND_REPORT, year, month, item['fingerprint'], pdf_bytes)
+            stats['rendered'] += 1
+        except Exception as e:
+            logger.error(f"Ошибка пакетной отрисовки отчета репетитора {tutor_id}: {e}")
+            stats['failed'] += 1
+            return
+
+        if self.deliver:
+            try:
+                await self._deliver(item, year, month, pdf_bytes)
+                stats['delivered'] += 1
+            except Exception as e:
+                logger.error(f"Ошибка отправки месячного отчета репетитору {tutor_id}: {e}")
+
+    async def run(self, year: int, month: int) -> dict:
+        """Отрисовывает отчеты за месяц и возвращает статистику прогона"""
+        started = time.perf_counter()
+        tutors = await self.db.a.run(self.collect_month_data, year, month)
+        pending = await self.db.a.run(self._pending, tutors, year, month)
+        stats = {
+            'year': year,
+            'month': month,
+            'tutors': len(tutors),
+            'cached': len(tutors) - len(pending),
+            'rendered': 0,
+            'failed': 0,
+            'delivered': 0,
+            'per_tutor': {},   # tutor_id -> секунды отрисовки в процессе пула
+        }
+        logger.info(
+            f"Отчеты за {month:02d}.{year}: репетиторов {stats['tutors']}, "
+            f"уже в кэше {stats['cached']}, к отрисовке {len(pending)}"
+        )
+
+        # Задачи ставятся в очередь пула сразу, пул ограничивает число одновременных отрисовок
+        await asyncio.gather(*(self._process(item, year, month, stats) for item in pending))
+
+        stats['elapsed'] = time.perf_counter() - started
+        stats['throughput'] = stats['rendered'] / stats['elapsed'] if stats['elapsed'] else 0.0
+        self._log_stats(stats)
+        return stats
+
+    def _log_stats(self, stats: dict):
+        logger.info(
+            f"Отчеты за {stats['month']:02d}.{stats['year']} готовы: отрисовано {stats['rendered']}, "
+            f"ошибок {stats['failed']}, отправлено {stats['delivered']} за {stats['elapsed']:.1f} с "
+            f"({stats['throughput']:.2f} отчета/с)"
+        )
+        slowest = sorted(stats['per_tutor'].items(), key=lambda item: item[1], reverse=True)[:SLOWEST_TO_LOG]
+        if slowest:
+            logger.info("Самые долгие отчеты: " + ", ".join(
+                f"репетитор {tutor_id} - {seconds:.2f} с" for tutor_id, seconds in slowest
+            ))
+
+
+async def month_end_report_task(bot: Bot, deliver: bool = False):
+    """Фоновая задача: в начале каждого месяца готовит отчеты за прошедший месяц"""
+    job = MonthEndReportJob(bot, deliver=deliver)
+
+    logger.info("Задача месячных отчетов запущена")
+
+    while True:
+        run_at = next_run_time(datetime.now())
+        await asyncio.sleep((run_at - datetime.now()).total_seconds())
+        try:
+            year, month = previous_month(datetime.now())
+            await job.run(year, month)
+        except Exception as e:
+            logger.error(f"Ошибка в задаче месячных отчетов: {e}")
@@ -0,0 +1,211 @@
+# report_pdf/pdf_cache.py
+"""Дисковый кэш месячных PDF с отпечатком данных и file_id Telegram"""
+import hashlib
+import logging
+import os
+import time
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+PDF_CACHE_DIR = os.path.join('cache', 'pdf')
+PDF_CACHE_MAX_BYTES = 200 * 1024 * 1024   # 200 MB
+PDF_CACHE_VERSION = 2   # увеличить при изменении вида отчета или расписания
+
+KIND_REPORT = 'report'
+KIND_SCHEDULE = 'schedule'
+
+
+def month_bounds(year: int, month: int) -> tuple:
+    """Границы месяца [начало, начало следующего) в формате lesson_date"""
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return f"{year:04d}-{month:02d}-01", f"{next_year:04d}-{next_month:02d}-01"
+
+
+class PDFCache:
+    """Кэш готовых PDF по (репетитор, вид, месяц).
+
+    Запись действительна, пока не изменился отпечаток данных месяца: строки
+    занятий (дата, длительность, цена, статус, имена учеников и групп),
+    данные репетитора и отчеты о занятиях. Файл хранится на диске под именем,
+    производным от ключа и отпечатка; после первой отправки запоминается
+    file_id Telegram, и повторный запрос отправляется без загрузки файла.
+    При превышении max_bytes удаляются давно не использованные файлы.
+    """
+
+    def __init__(self, cache_dir: str = PDF_CACHE_DIR, max_bytes: int = PDF_CACHE_MAX_BYTES, database=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.db = database or db
+
+    def fingerprint(self, tutor_id: int, kind: str, year: int, month: int) -> str:
+        """Отпечаток данных, из которых рисуется PDF за месяц"""
+        start, end = month_bounds(year, month)
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT full_name, phone FROM tutors WHERE id = ?', (tutor_id,))
+            tutor = cursor.fetchone()
+
+            # Одна строка на весь месяц по индексу (tutor_id, lesson_date)
+            cursor.execute('''
+            SELECT COUNT(*), group_concat(row_data, ';')
+            FROM (
+                SELECT l.id || '|' || l.lesson_date || '|' || IFNULL(l.duration, '') || '|' ||
+                       IFNULL(l.price, '') || '|' || IFNULL(l.status, '') || '|' ||
+                       IFNULL(s.full_name, '') || '|' || IFNULL(g.name, '') AS row_data
+                FROM lessons l
+                LEFT JOIN students s ON l.student_id = s.id
+                LEFT JOIN groups g ON l.group_id = g.id
+                WHERE l.tutor_id = ? AND l.lesson_date >= ? AND l.lesson_date < ?
+                ORDER BY l.id
+            )
+            ''', (tutor_id, start, end))
+            lessons = cursor.fetchone()
+
+            cursor.execute('''
+            SELECT COUNT(*), MAX(r.id)
+            FROM lessons l
+            JOIN lesson_reports r ON r.lesson_id = l.id
+            WHERE l.tutor_id = ? AND l.lesson_date >= ? AND l.lesson_date < ?
+            ''', (tutor_id, start, end))
+            reports = cursor.fetchone()
+
+        source = repr((PDF_CACHE_VERSION, kind, tuple(tutor) if tutor else None, tuple(lessons), tuple(reports)))
+        return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+    def _file_name(self, tutor_id: int, kind: str, year: int, month: int, fingerprint: str) -> str:
+        key = f"{tutor_id}:{kind}:{year}:{month}:{fingerprint}"
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32] + '.pdf'
+
+    def _path(self, file_name: str) -> str:
+        return os.path.join(self.cache_dir, file_name)
+
+    def _remove_file(self, file_name: str):
+        try:
+            os.remove(self._path(file_name))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Ошибка удаления файла кэша PDF {file_name}: {e}")
+
+    def get(self, tutor_id: int, kind: str, year: int, month: int, fingerprint: str) -> dict | None:
+        """Возвращает запись кэша {'path', 'file_id', 'size'}, если она соответствует отпечатку"""
+        try:
+            with self.db.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                SELECT fingerprint, file_name, size, telegram_file_id
+                FROM pdf_cache
+                WHERE tutor_id = ? AND kind = ? AND year = ? AND month = ?
+                ''', (tutor_id, kind, year, month))
+                row = cursor.fetchone()
+                if not row or row[0] != fingerprint:
+                    return None
+
+                path = self._path(row[1])
+                if not row[3] and not os.path.exists(path):
+                    # Файл удален с диска, а file_id еще нет - запись бесполезна
+                    cursor.execute('''
+                    DELETE FROM pdf_cache WHERE tutor_id = ? AND kind = ? AND year = ? AND month = ?
+                    ''', (tutor_id, kind, year, month))
+                    conn.commit()
+                    return None
+
+                cursor.execute('''
+                UPDATE pdf_cache SET last_used_at = ?
+                WHERE tutor_id = ? AND kind = ? AND year = ? AND month = ?
+                ''', (time.time(), tutor_id, kind, year, month))
+                conn.commit()
+                return {'path': path, 'file_id': row[3], 'size': row[2]}
+        except Exception as e:
+            logger.error(f"Ошибка чтения кэша PDF: {e}")
+            return None
+
+    def read(self, entry: dict) -> bytes | None:
+        """Читает PDF записи кэша с диска"""
+        try:
+            with open(entry['path'], 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, tutor_id: int, kind: str, year: int, month: int, fingerprint: str, pdf_bytes: bytes) -> bool:
+        """Сохраняет PDF и заменяет прежнюю запись этого месяца"""
+        file_name = self._file_name(tutor_id, kind, year, month, fingerprint)
+        path = self._path(file_name)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Запись через временный файл: читатель не увидит недописанный PDF
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(pdf_bytes)
+            os.replace(tmp_path, path)
+
+            with self.db.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                SELECT file_name FROM pdf_cache WHERE tutor_id = ? AND kind = ? AND year = ? AND month = ?
+                ''', (tutor_id, kind, year, month))
+                previous = cursor.fetchone()
+                cursor.execute('''
+                INSERT INTO pdf_cache (tutor_id, kind, year, month, fingerprint, file_name, size, last_used_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(tutor_id, kind, year, month) DO UPDATE SET
+                    fingerprint = excluded.fingerprint,
+                    file_name = excluded.file_name,
+                    size = excluded.size,
+                    telegram_file_id = NULL,
+                    created_at = CURRENT_TIMESTAMP,
+                    last_used_at = excluded.last_used_at
+                ''', (tutor_id, kind, year, month, fingerprint, file_name, len(pdf_bytes), time.time()))
+                conn.commit()
+
+            if previous and previous[0] != file_name:
+                self._remove_file(previous[0])
+            self.evict()
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка записи в кэш PDF: {e}")
+            return False
+
+    def set_file_id(self, tutor_id: int, kind: str, year: int, month: int, fingerprint: str, file_id: str | None):
+        """Запоминает file_id отправленного файла (None - забыть недействительный file_id)"""
+        try:
+            with self.db.get_connection() as conn:
+                conn.execute('''
+                UPDATE pdf_cache SET telegram_file_id = ?
+                WHERE tutor_id = ? AND kind = ? AND year = ? AND month = ? AND fingerprint = ?
+                ''', (file_id, tutor_id, kind, year, month, fingerprint))
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Ошибка сохранения file_id в кэше PDF: {e}")
+
+    def evict(self) -> int:
+        """Удаляет давно не использованные файлы, пока кэш больше max_bytes. Возвращает число удаленных"""
+        removed = []
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            total = cursor.execute('SELECT COALESCE(SUM(size), 0) FROM pdf_cache').fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            cursor.execute('''
+            SELECT tutor_id, kind, year, month, file_name, size FROM pdf_cache ORDER BY last_used_at
+            ''')
+            for tutor_id, kind, year, month, file_name, size in cursor.fetchall():
+                if total <= self.max_bytes:
+                    break
+                removed.append((tutor_id, kind, year, month, file_name))
+                total -= size
+            cursor.executemany('''
+            DELETE FROM pdf_cache WHERE tutor_id = ? AND kind = ? AND year = ? AND month = ?
+            ''', [entry[:4] for entry in removed])
+            conn.commit()
+
+        for entry in removed:
+            self._remove_file(entry[4])
+        logger.info(f"Кэш PDF: вытеснено файлов - {len(removed)}")
+        return len(removed)
+
+
+pdf_cache = PDFCache()
@@ -2,39 +2,25 @@
 import io
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib.colors import Color, black, white
 from reportlab.lib.utils import ImageReader
 from datetime import datetime
 import os
 
+from .fonts import register_fonts
+
 class PDFReportGenerator:
     def __init__(self):
         self.page_width, self.page_height = A4
         self.margin = 50
         self.line_height = 15
         
-        # Регистрируем русские шрифты
-        try:
-            # Попробуем зарегистрировать стандартные шрифты с поддержкой кириллицы
-            pdfmetrics.registerFont(TTFont('DejaVuSans', 'DejaVuSans.ttf'))
-            pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', 'DejaVuSans-Bold.ttf'))
-            self.font_normal = 'DejaVuSans'
-            self.font_bold = 'DejaVuSans-Bold'
-        except:
-            try:
-                # Альтернативный шрифт
-                pdfmetrics.registerFont(TTFont('ArialUnicode', 'arial.ttf'))
-                self.font_normal = 'ArialUnicode'
-                self.font_bold = 'ArialUnicode'
-            except:
-                # Если шрифты не найдены, используем стандартные (могут быть проблемы с кириллицей)
-                self.font_normal = 'Helvetica'
-                self.font_bold = 'Helvetica-Bold'
+        # Русские шрифты регистрируются один раз на процесс
+        self.font_normal, self.font_bold = register_fonts()
     
-    def create_monthly_report(self, tutor_data: dict, lessons: list, month: int, year: int) -> io.BytesIO:
-        """Создает PDF отчет за месяц"""
+    def create_monthly_report(self, tutor_data: dict, lessons: list, month: int, year: int,
+                              stats: dict = None) -> io.BytesIO:
+        """Создает PDF отчет за месяц (stats - итоги из Database.get_tutor_statistics)"""
         buffer = io.BytesIO()
         c = canvas.Canvas(buffer, pagesize=A4)
         
@@ -57,7 +43,8 @@ class PDFReportGenerator:
         y_position -= 60
         
         # Статистика
-        stats = self._calculate_statistics(lessons)
+        if stats is None:
+            stats = self._calculate_statistics(lessons)
         y_position = self._draw_statistics(c, stats, y_position)
         
         # Таблица занятий
@@ -91,20 +78,23 @@ class PDFReportGenerator:
         c.drawString(self.margin + 80, y - 20, tutor_data.get('phone', 'Не указано'))
     
     def _calculate_statistics(self, lessons: list) -> dict:
-        """Рассчитывает статистику по занятиям"""
-        total_lessons = len(lessons)
-        total_earnings = sum(lesson.get('price', 0) for lesson in lessons)
-        completed_lessons = len([l for l in lessons if l.get('status') == 'completed'])
-        individual_lessons = len([l for l in lessons if not l.get('group_id')])
-        group_lessons = len([l for l in lessons if l.get('group_id')])
-        
-        return {
-            'total_lessons': total_lessons,
-            'total_earnings': total_earnings,
-            'completed_lessons': completed_lessons,
-            'individual_lessons': individual_lessons,
-            'group_lessons': group_lessons
+        """Рассчитывает статистику по занятиям, если она не пришла из БД (один проход)"""
+        stats = {
+            'total_lessons': len(lessons),
+            'total_earnings': 0,
+            'completed_lessons': 0,
+            'individual_lessons': 0,
+            'group_lessons': 0
         }
+        for lesson in lessons:
+            stats['total_earnings'] += lesson.get('price') or 0
+            if lesson.get('status') == 'completed':
+                stats['completed_lessons'] += 1
+            if lesson.get('group_id'):
+                stats['group_lessons'] += 1
+            else:
+                stats['individual_lessons'] += 1
+        return stats
     
     def _draw_statistics(self, c, stats: dict, y: float) -> float:
         """Рисует блок статистики"""
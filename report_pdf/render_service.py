@@ -0,0 +1,111 @@
+# report_pdf/render_service.py
+"""Отрисовка PDF в отдельных процессах, чтобы reportlab не занимал цикл событий бота"""
+import asyncio
+import logging
+import multiprocessing
+from logging.handlers import QueueHandler, QueueListener
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .fonts import register_fonts
+
+logger = logging.getLogger(__name__)
+
+PDF_WORKERS = 2   # процессов отрисовки; месячный отчет рисуется сотни миллисекунд
+START_METHOD = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+def _init_worker(log_queue):
+    """Инициализация процесса пула: логирование через основной процесс, шрифты - один раз.
+
+    При fork процесс наследует QueueHandler корневого логгера, но поток
+    QueueListener в нем не работает, и записи пропадали бы в очереди. Поэтому
+    записи отправляются в очередь multiprocessing, которую читает основной процесс.
+    """
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    register_fonts()
+
+
+class _ForwardHandler(logging.Handler):
+    """Передает записи процессов пула в логирование основного процесса"""
+
+    def emit(self, record):
+        logging.getLogger(record.name).handle(record)
+
+
+def render_monthly_report(tutor_data: dict, lessons: list, month: int, year: int, stats: dict = None) -> bytes:
+    """Рисует месячный отчет и возвращает содержимое PDF (выполняется в процессе пула)"""
+    from .pdf_generator import PDFReportGenerator
+    return PDFReportGenerator().create_monthly_report(tutor_data, lessons, month, year, stats).getvalue()
+
+
+def render_monthly_schedule(tutor_data: dict, schedule_data: dict) -> bytes:
+    """Рисует месячное расписание и возвращает содержимое PDF (выполняется в процессе пула)"""
+    from .schedule_generator import SchedulePDFGenerator
+    return SchedulePDFGenerator().create_monthly_schedule(tutor_data, schedule_data).getvalue()
+
+
+class PDFRenderService:
+    """Пул процессов для отрисовки PDF.
+
+    Обработчик передает готовые строки занятий (обычные dict) и ждет байты
+    файла. На Linux процессы создаются через fork: при spawn каждый worker
+    заново импортировал бы main.py со всеми роутерами и базой данных.
+    В процессах пула нет обращений к БД, поэтому унаследованные соединения
+    не используются, а логирование перенастраивается в _init_worker.
+    forkserver здесь не подходит по той же причине, что и spawn: каждый
+    worker импортировал бы main.py заново (с setup_logging и всем ботом).
+    """
+
+    def __init__(self, max_workers: int = PDF_WORKERS):
+        self.max_workers = max_workers
+        self._executor = None
+        self._log_listener = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            context = multiprocessing.get_context(START_METHOD)
+            log_queue = context.Queue()
+            self._log_listener = QueueListener(log_queue, _ForwardHandler())
+            self._log_listener.start()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(log_queue,),
+            )
+            logger.info(f"Запущен пул отрисовки PDF: {self.max_workers} процесса")
+        return self._executor
+
+    async def run(self, func, *args) -> bytes:
+        """Выполняет функцию отрисовки в пуле и возвращает ее результат"""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        except BrokenProcessPool:
+            # Процесс пула упал (например, по памяти) - следующий запрос создаст пул заново
+            logger.error("Пул отрисовки PDF сломан, будет пересоздан")
+            self.shutdown(wait=False)
+            raise
+
+    async def render_monthly_report(self, tutor_data: dict, lessons: list, month: int, year: int,
+                                    stats: dict = None) -> bytes:
+        return await self.run(render_monthly_report, tutor_data, lessons, month, year, stats)
+
+    async def render_monthly_schedule(self, tutor_data: dict, schedule_data: dict) -> bytes:
+        return await self.run(render_monthly_schedule, tutor_data, schedule_data)
+
+    def shutdown(self, wait: bool = True):
+        """Останавливает процессы пула"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+        if self._log_listener is not None:
+            self._log_listener.stop()
+            self._log_listener = None
+
+
+pdf_renderer = PDFRenderService()
@@ -1,10 +1,10 @@
 # Переименовать файл из rereport_service.py в report_service.py
-from datetime import datetime, timedelta
-from database import Database
+from datetime import datetime
+from database import db
 
 class ReportService:
     def __init__(self):
-        self.db = Database()
+        self.db = db
     
     def get_monthly_report_data(self, tutor_id: int, month: int = None, year: int = None) -> dict:
         """Получает данные для месячного отчета"""
@@ -23,22 +23,32 @@ class ReportService:
         }
         
         # Определяем период отчета
-        start_date = datetime(year, month, 1)
-        if month == 12:
-            end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
-        else:
-            end_date = datetime(year, month + 1, 1) - timedelta(days=1)
+        start_date, end_date = self.get_period(month, year)
         
         # Получаем занятия за период
         lessons = self._get_lessons_by_period(tutor_id, start_date, end_date)
         
+        # Итоги месяца считаются в БД одним запросом, а не проходами по списку занятий
+        stats = self.db.get_tutor_statistics(tutor_id, {'month': (start_date, end_date)})
+        
         return {
             'tutor': tutor_data,
             'lessons': lessons,
+            'stats': stats['periods']['month'],
             'month': month,
             'year': year
         }
     
+    @staticmethod
+    def get_period(month: int, year: int) -> tuple:
+        """Границы периода месячного отчета [начало, конец) - их же использует пакетная отрисовка"""
+        start_date = datetime(year, month, 1)
+        if month == 12:
+            end_date = datetime(year + 1, 1, 1)
+        else:
+            end_date = datetime(year, month + 1, 1)
+        return start_date, end_date
+    
     def _get_lessons_by_period(self, tutor_id: int, start_date: datetime, end_date: datetime) -> list:
         """Получает занятия за указанный период"""
         with self.db.get_connection() as conn:
@@ -53,7 +63,7 @@ class ReportService:
             LEFT JOIN students s ON l.student_id = s.id
             LEFT JOIN groups g ON l.group_id = g.id
             WHERE l.tutor_id = ? 
-            AND l.lesson_date BETWEEN ? AND ?
+            AND l.lesson_date >= ? AND l.lesson_date < ?
             ORDER BY l.lesson_date
             ''', (tutor_id, start_date, end_date))
             
@@ -1,12 +1,15 @@
 import io
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib import colors
 from datetime import datetime
 from calendar import monthrange
 import os
+import logging
+
+from .fonts import register_fonts
+
+logger = logging.getLogger(__name__)
 
 class SchedulePDFGenerator:
     def __init__(self):
@@ -15,31 +18,14 @@ class SchedulePDFGenerator:
         self.line_height = 12
         self.cell_padding = 3
         
-        # Улучшенная регистрация шрифтов с поддержкой кириллицы
-        self._register_fonts()
-    
-    def _register_fonts(self):
-        """Регистрирует шрифты с поддержкой кириллицы"""
-        try:
-            pdfmetrics.registerFont(TTFont('DejaVuSans', 'DejaVuSans.ttf'))
-            pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', 'DejaVuSans-Bold.ttf'))
-            self.font_normal = 'DejaVuSans'
-            self.font_bold = 'DejaVuSans-Bold'
-        except:
-            try:
-                pdfmetrics.registerFont(TTFont('Arial', 'arial.ttf'))
-                pdfmetrics.registerFont(TTFont('Arial-Bold', 'arialbd.ttf'))
-                self.font_normal = 'Arial'
-                self.font_bold = 'Arial-Bold'
-            except:
-                self.font_normal = 'Helvetica'
-                self.font_bold = 'Helvetica-Bold'
+        # Шрифты с поддержкой кириллицы регистрируются один раз на процесс
+        self.font_normal, self.font_bold = register_fonts()
     
     def create_monthly_schedule(self, tutor_data: dict, schedule_data: dict) -> io.BytesIO:
         """Создает PDF расписание за месяц с отладкой"""
-        print("=== DEBUG: Начало генерации PDF ===")
-        print(f"DEBUG: tutor_data: {tutor_data}")
-        print(f"DEBUG: schedule_data keys: {schedule_data.keys()}")
+        logger.debug("Начало генерации PDF")
+        logger.debug(f"tutor_data: {tutor_data}")
+        logger.debug(f"schedule_data keys: {schedule_data.keys()}")
         """Создает PDF расписание за месяц в красивом календарном формате"""
         buffer = io.BytesIO()
         c = canvas.Canvas(buffer, pagesize=A4)
@@ -53,7 +39,7 @@ class SchedulePDFGenerator:
         year = schedule_data['year']
         month = schedule_data['month']
         daily_schedule = schedule_data.get('daily_schedule', {})
-        print(f"DEBUG: Дней с расписанием: {len(daily_schedule)}")
+        logger.debug(f"Дней с расписанием: {len(daily_schedule)}")
 
         
         y_position = self.page_height - self.margin
@@ -181,7 +167,7 @@ class SchedulePDFGenerator:
     def _draw_day_with_lessons(self, c, x: float, y: float, width: float, height: float, 
                           day: int, day_data: dict):
         """Рисует ячейку календаря с занятиями - ИСПРАВЛЕННОЕ УСЛОВИЕ"""
-        print(f"DEBUG: Рисуем день {day} с занятиями")
+        logger.debug(f"Рисуем день {day} с занятиями")
         
         c.setFillColor(colors.HexColor("#e8f5e8"))
         c.setStrokeColor(colors.HexColor("#c8e6c9"))
@@ -193,17 +179,17 @@ class SchedulePDFGenerator:
         c.drawString(x + 4, y - height + 6, str(day))
         
         lessons = day_data.get('lessons', [])
-        print(f"DEBUG: Найдено занятий: {len(lessons)}")
+        logger.debug(f"Найдено занятий: {len(lessons)}")
         
         lesson_y = y - height + 20  # Начальная позиция
         max_lessons = 6
         
         # ИСПРАВЛЕННОЕ УСЛОВИЕ: lesson_y должен быть ВЫШЕ нижней границы ячейки
         bottom_limit = y - height + 15  # Минимальная высота для текста от низа ячейки
-        print(f"DEBUG: y={y}, height={height}, lesson_y начальное={lesson_y}, bottom_limit={bottom_limit}")
+        logger.debug(f"y={y}, height={height}, lesson_y начальное={lesson_y}, bottom_limit={bottom_limit}")
         
         for i, lesson in enumerate(lessons[:max_lessons]):
-            print(f"DEBUG: Обработка занятия {i}, lesson_y={lesson_y}, bottom_limit={bottom_limit}")
+            logger.debug(f"Обработка занятия {i}, lesson_y={lesson_y}, bottom_limit={bottom_limit}")
             
             # ПРАВИЛЬНОЕ УСЛОВИЕ: есть ли место для отрисовки?
             if lesson_y >= bottom_limit:  # lesson_y должен быть >= нижнего предела
@@ -217,7 +203,7 @@ class SchedulePDFGenerator:
                         lesson_time = "??:??"
                     
                     student_name = self._get_lesson_description(lesson)
-                    print(f"DEBUG: Время: {lesson_time}, Студент: {student_name}")
+                    logger.debug(f"Время: {lesson_time}, Студент: {student_name}")
                     
                     # Цвет точки статуса
                     status_color = {
@@ -232,7 +218,7 @@ class SchedulePDFGenerator:
                     
                     # Формируем текст занятия
                     lesson_text = f"{lesson_time} {student_name}"
-                    print(f"DEBUG: Текст занятия: '{lesson_text}'")
+                    logger.debug(f"Текст занятия: '{lesson_text}'")
                     
                     # Рисуем текст
                     c.setFont(self.font_normal, 6)
@@ -240,13 +226,13 @@ class SchedulePDFGenerator:
                     c.drawString(x + 8, lesson_y - 2, lesson_text)
                     
                     lesson_y -= 7
-                    print(f"DEBUG: Новый lesson_y: {lesson_y}")
+                    logger.debug(f"Новый lesson_y: {lesson_y}")
                     
                 except Exception as e:
-                    print(f"DEBUG: Ошибка при отрисовке занятия {i}: {e}")
+                    logger.error(f"Ошибка при отрисовке занятия {i}: {e}")
                     continue
             else:
-                print(f"DEBUG: Нет места для занятия {i}, lesson_y={lesson_y} < bottom_limit={bottom_limit}")
+                logger.warning(f"Нет места для занятия {i}, lesson_y={lesson_y} < bottom_limit={bottom_limit}")
                 break
         
         # Счетчик дополнительных занятий
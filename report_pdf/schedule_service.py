@@ -1,9 +1,9 @@
 from datetime import datetime, timedelta
-from database import Database
+from database import db
 
 class ScheduleService:
     def __init__(self):
-        self.db = Database()
+        self.db = db
     
     def get_monthly_schedule_data(self, tutor_id: int, month: int = None, year: int = None) -> dict:
         """Получает данные для месячного расписания"""
@@ -0,0 +1,132 @@
+"""Общая очередь отправки сообщений с учетом лимитов Telegram"""
+
+import asyncio
+import logging
+import time
+
+from aiogram.exceptions import TelegramRetryAfter
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_RATE = 25             # сообщений в секунду на бота (лимит Telegram ~30/с, оставляем запас)
+PER_CHAT_INTERVAL = 1.0      # не чаще одного сообщения в секунду в один чат
+SEND_WORKERS = 8             # одновременно обслуживаемых чатов
+MAX_RETRIES = 3              # повторов после RetryAfter
+PROGRESS_EVERY = 25          # как часто сообщать о прогрессе
+
+
+class TokenBucket:
+    """Ведро токенов: не более rate операций в секунду с запасом capacity"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Ждет, пока появится токен, и забирает его"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Останавливает выдачу токенов (Telegram вернул RetryAfter)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+
+
+class SendQueue:
+    """Отправка через общий лимит бота, лимит на чат и пул воркеров.
+
+    call() выполняет один запрос к Bot API с учетом лимитов и RetryAfter,
+    send_many() раздает получателей воркерам и сообщает о прогрессе.
+    """
+
+    def __init__(self, rate: float = GLOBAL_RATE, per_chat_interval: float = PER_CHAT_INTERVAL,
+                 workers: int = SEND_WORKERS):
+        self.bucket = TokenBucket(rate)
+        self.per_chat_interval = per_chat_interval
+        self.workers = workers
+        self._chat_next = {}  # chat_id -> время (monotonic), раньше которого в чат не пишем
+
+    async def _wait_chat(self, chat_id):
+        now = time.monotonic()
+        if len(self._chat_next) > 10000:
+            self._chat_next = {chat: ts for chat, ts in self._chat_next.items() if ts > now}
+
+        next_allowed = self._chat_next.get(chat_id, 0)
+        self._chat_next[chat_id] = max(now, next_allowed) + self.per_chat_interval
+        if next_allowed > now:
+            await asyncio.sleep(next_allowed - now)
+
+    async def call(self, chat_id, request):
+        """Выполняет request() - корутину запроса к Bot API - с учетом лимитов"""
+        for attempt in range(MAX_RETRIES + 1):
+            await self._wait_chat(chat_id)
+            await self.bucket.acquire()
+            try:
+                return await request()
+            except TelegramRetryAfter as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                logger.warning(f"RetryAfter {e.retry_after} с для чата {chat_id}, повтор {attempt + 1}")
+                self.bucket.pause(e.retry_after)
+
+    async def send_many(self, chat_ids, job, on_progress=None, progress_every: int = PROGRESS_EVERY):
+        """Выполняет job(chat_id) для всех получателей пулом воркеров.
+
+        on_progress(done, total, sent, failed) вызывается каждые progress_every
+        получателей. Возвращает (число успешных, {chat_id: ошибка}).
+        """
+        chat_ids = list(chat_ids)
+        total = len(chat_ids)
+        queue = asyncio.Queue()
+        for chat_id in chat_ids:
+            queue.put_nowait(chat_id)
+
+        stats = {'done': 0, 'sent': 0}
+        failed = {}
+
+        async def report():
+            if on_progress:
+                try:
+                    await on_progress(stats['done'], total, stats['sent'], len(failed))
+                except Exception as e:
+                    logger.warning(f"Ошибка при обновлении прогресса рассылки: {e}")
+
+        async def worker():
+            while True:
+                try:
+                    chat_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    await job(chat_id)
+                    stats['sent'] += 1
+                except Exception as e:
+                    # В том числе заблокировавшие бота: повтор не поможет
+                    failed[chat_id] = e
+                stats['done'] += 1
+                if stats['done'] % progress_every == 0 and stats['done'] < total:
+                    await report()
+
+        await asyncio.gather(*(worker() for _ in range(min(self.workers, total))))
+        await report()
+        return stats['sent'], failed
+
+
+# Общая очередь для всех рассылок бота
+send_queue = SendQueue()
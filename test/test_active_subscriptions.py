@@ -0,0 +1,37 @@
+import pytest
+
+from database import Database
+
+
+@pytest.fixture
+def test_db(tmp_path):
+    database = Database(str(tmp_path / "subscriptions.db"))
+    yield database
+    database.close()
+
+
+def add_payment(database, user_id, payment_id, created_at, valid_until, status='succeeded', tariff='Premium'):
+    with database.get_connection() as conn:
+        conn.execute('''
+        INSERT INTO payments (user_id, payment_id, tariff_name, amount, status, created_at, updated_at, valid_until)
+        VALUES (?, ?, ?, 500, ?, datetime('now', 'localtime', ?), datetime('now', 'localtime', ?),
+                CASE WHEN ? IS NULL THEN NULL ELSE datetime('now', 'localtime', ?) END)
+        ''', (user_id, payment_id, tariff, status, created_at, created_at, valid_until, valid_until))
+        conn.commit()
+
+
+def test_active_subscriptions_view(test_db):
+    """Тест: в представлении последняя успешная и еще действующая подписка каждого пользователя"""
+    tutor_id = test_db.add_tutor(1, "Репетитор", "+70000000000")
+    add_payment(test_db, 1, 'old', '-40 days', '-10 days', tariff='Basic')
+    add_payment(test_db, 1, 'new', '-1 days', '+29 days')
+    add_payment(test_db, 2, 'expired', '-40 days', '-10 days')
+    add_payment(test_db, 3, 'pending', '-1 days', '+29 days', status='pending')
+    add_payment(test_db, 4, 'no_valid_until', '-5 days', None)
+
+    rows = {row['telegram_id']: row for row in test_db.get_active_subscriptions()}
+
+    assert set(rows) == {1, 4}
+    assert rows[1]['tutor_id'] == tutor_id
+    assert rows[1]['tariff'] == 'Premium'
+    assert rows[4]['tutor_id'] is None
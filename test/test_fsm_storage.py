@@ -0,0 +1,75 @@
+import time
+from datetime import datetime
+
+import pytest
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+
+from database import Database
+from fsm_storage import SQLiteStorage
+
+
+class Form(StatesGroup):
+    waiting_for_date = State()
+
+
+KEY = StorageKey(bot_id=1, chat_id=10, user_id=10)
+
+
+@pytest.fixture
+def test_db(tmp_path):
+    database = Database(str(tmp_path / "fsm.db"))
+    yield database
+    database.close()
+
+
+def stored_rows(database):
+    with database.get_connection() as conn:
+        return conn.execute('SELECT storage_key, state FROM fsm_states').fetchall()
+
+
+@pytest.mark.asyncio
+async def test_state_survives_restart(test_db):
+    """Тест: состояние и данные читаются новым экземпляром хранилища после close()"""
+    storage = SQLiteStorage(test_db, flush_interval=60)
+    start = datetime(2025, 1, 1, 10, 0)
+    await storage.set_state(KEY, Form.waiting_for_date)
+    await storage.update_data(KEY, {'start_date': start, 'student_id': 5})
+
+    # До сброса изменения только в памяти
+    assert stored_rows(test_db) == []
+    await storage.close()
+
+    restored = SQLiteStorage(test_db)
+    assert await restored.get_state(KEY) == Form.waiting_for_date.state
+    assert await restored.get_data(KEY) == {'start_date': start, 'student_id': 5}
+    await restored.close()
+
+
+@pytest.mark.asyncio
+async def test_cleared_state_removed_from_db(test_db):
+    """Тест: state.clear() удаляет запись из таблицы"""
+    storage = SQLiteStorage(test_db)
+    await storage.set_state(KEY, Form.waiting_for_date)
+    await storage.flush()
+    assert len(stored_rows(test_db)) == 1
+
+    await storage.set_state(KEY, None)
+    await storage.set_data(KEY, {})
+    await storage.close()
+    assert stored_rows(test_db) == []
+
+
+@pytest.mark.asyncio
+async def test_abandoned_state_expires(test_db):
+    """Тест: состояние старше TTL не восстанавливается"""
+    storage = SQLiteStorage(test_db, state_ttl=60)
+    await storage.set_state(KEY, Form.waiting_for_date)
+    await storage.close()
+    with test_db.get_connection() as conn:
+        conn.execute('UPDATE fsm_states SET updated_at = ?', (time.time() - 120,))
+        conn.commit()
+
+    restored = SQLiteStorage(test_db, state_ttl=60)
+    assert await restored.get_state(KEY) is None
+    await restored.close()
@@ -0,0 +1,70 @@
+import pytest
+
+from database import Database
+
+
+@pytest.fixture
+def test_db(tmp_path):
+    database = Database(str(tmp_path / "group_lessons.db"))
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def group(test_db):
+    tutor_id = test_db.add_tutor(1, "Репетитор", "+70000000000")
+    group_id = test_db.add_group("Группа", tutor_id)
+    students = [test_db.add_student(f"Ученик {i}", f"+7111111111{i}", "", "active", tutor_id) for i in range(3)]
+    with test_db.get_connection() as conn:
+        conn.executemany('INSERT INTO student_groups (student_id, group_id) VALUES (?, ?)',
+                         [(student_id, group_id) for student_id in students])
+        conn.commit()
+    return tutor_id, group_id, students
+
+
+def lesson_rows(database, lesson_ids):
+    with database.get_connection() as conn:
+        return [tuple(conn.execute(
+            'SELECT lesson_date, duration, price FROM lessons WHERE id = ?', (lesson_id,)
+        ).fetchone()) for lesson_id in lesson_ids]
+
+
+def test_group_lesson_creates_row_per_student(test_db, group):
+    """Тест: групповое занятие - по занятию на ученика с общими группой и временем"""
+    tutor_id, group_id, students = group
+
+    lesson_ids = test_db.add_group_lesson(tutor_id, group_id, '2030-01-01 10:00:00', 60, 500)
+
+    assert len(lesson_ids) == len(students)
+    assert {test_db.get_lesson_by_id(lesson_id)['student_id'] for lesson_id in lesson_ids} == set(students)
+    assert set(lesson_rows(test_db, lesson_ids)) == {('2030-01-01 10:00:00', 60, 500.0)}
+
+
+def test_group_update_touches_only_its_occurrence(test_db, group):
+    """Тест: изменение группового занятия меняет занятия его учеников и не трогает другие даты группы"""
+    tutor_id, group_id, _ = group
+    first = test_db.add_group_lesson(tutor_id, group_id, '2030-01-01 10:00:00', 60, 500)
+    second = test_db.add_group_lesson(tutor_id, group_id, '2030-01-08 10:00:00', 60, 500)
+
+    assert test_db.update_group_lesson_datetime(first[0], '2030-01-02 18:00:00')
+    assert test_db.update_group_lesson_price(first[1], 800)
+    assert test_db.update_group_lesson_duration(first[2], 90)
+
+    assert set(lesson_rows(test_db, first)) == {('2030-01-02 18:00:00', 90, 800.0)}
+    assert set(lesson_rows(test_db, second)) == {('2030-01-08 10:00:00', 60, 500.0)}
+
+
+def test_new_member_joins_future_lessons(test_db, group):
+    """Тест: новый ученик группы получает будущие занятия, занятие удаляется целиком"""
+    tutor_id, group_id, students = group
+    lesson_ids = test_db.add_group_lesson(tutor_id, group_id, '2030-01-01 10:00:00', 60, 500)
+    other_ids = test_db.add_group_lesson(tutor_id, group_id, '2030-01-08 10:00:00', 60, 500)
+    newcomer = test_db.add_student("Новый", "+72222222222", "", "active", tutor_id)
+
+    assert test_db.add_student_to_group(newcomer, group_id)
+    assert test_db.add_student_to_group(newcomer, group_id)
+    with test_db.get_connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM lessons WHERE student_id = ?', (newcomer,)).fetchone()[0] == 2
+
+    assert test_db.delete_group_lesson(lesson_ids[0]) == len(students) + 1
+    assert all(test_db.get_lesson_by_id(lesson_id) for lesson_id in other_ids)
@@ -0,0 +1,96 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import Database
+from notify.lesson_timer import LessonTimer, lesson_events, REMINDER, CONFIRMATION, LESSON_END
+from notify.models import NotificationManager
+
+
+def test_lesson_events_future_lesson():
+    """Тест: для будущего занятия планируются все три события"""
+    now = datetime(2025, 1, 1, 12, 0)
+    lesson = {'id': 1, 'lesson_date': '2025-01-03 10:00:00', 'duration': 60, 'reminder_sent': 0}
+
+    events = dict((kind, fire_at) for fire_at, kind in lesson_events(lesson, now))
+
+    assert events == {
+        CONFIRMATION: datetime(2025, 1, 2, 10, 0),
+        REMINDER: datetime(2025, 1, 3, 9, 0),
+        LESSON_END: datetime(2025, 1, 3, 11, 0),
+    }
+
+
+def test_lesson_events_started_lesson():
+    """Тест: для идущего занятия остается только окончание"""
+    now = datetime(2025, 1, 1, 12, 0)
+    lesson = {'id': 1, 'lesson_date': '2025-01-01 11:30:00', 'duration': 90, 'reminder_sent': 1}
+
+    assert lesson_events(lesson, now) == [(datetime(2025, 1, 1, 13, 0), LESSON_END)]
+
+
+def test_lesson_events_created_shortly_before_start():
+    """Тест: занятие, созданное за 5 часов до начала, получает подтверждение сразу"""
+    now = datetime(2025, 1, 1, 12, 0)
+    lesson = {'id': 1, 'lesson_date': '2025-01-01 17:00:00', 'duration': 60, 'reminder_sent': 0}
+
+    events = dict((kind, fire_at) for fire_at, kind in lesson_events(lesson, now))
+
+    assert events == {
+        CONFIRMATION: now,
+        REMINDER: datetime(2025, 1, 1, 16, 0),
+        LESSON_END: datetime(2025, 1, 1, 18, 0),
+    }
+
+
+def test_confirmation_not_resent_after_reload_next_day(tmp_path):
+    """Тест: перезагрузка таймера после полуночи снова ставит подтверждение, но повторно оно не отправляется"""
+    db = Database(str(tmp_path / "confirmations.db"))
+    try:
+        tutor_id = db.add_tutor(1, "Репетитор", "+70000000000")
+        student_id = db.add_student("Ученик", "+71111111111", "", "active", tutor_id)
+        start = (datetime.now() + timedelta(hours=3)).replace(microsecond=0)
+        lesson_id = db.add_lesson(tutor_id, student_id, start, 60, 1000)
+        with db.get_connection() as conn:
+            conn.execute('UPDATE students SET student_telegram_id = 500 WHERE id = ?', (student_id,))
+            conn.commit()
+        manager = NotificationManager(db)
+
+        assert [lesson['id'] for lesson in manager.get_upcoming_lessons_for_notification([lesson_id])] == [lesson_id]
+
+        # Подтверждение отправлено вчера (по UTC) - перезагрузка после полуночи
+        with db.get_connection() as conn:
+            conn.execute("""
+            INSERT INTO lesson_confirmations (lesson_id, student_id, notified_at)
+            VALUES (?, ?, datetime('now', '-1 day'))
+            """, (lesson_id, student_id))
+            conn.commit()
+        lesson = {'id': lesson_id, 'lesson_date': start.strftime('%Y-%m-%d %H:%M:%S'), 'duration': 60}
+        assert CONFIRMATION in [kind for _, kind in lesson_events(lesson, datetime.now())]
+        assert manager.get_upcoming_lessons_for_notification([lesson_id]) == []
+    finally:
+        db.close()
+
+@pytest.mark.asyncio
+async def test_timer_fires_for_added_lesson(tmp_path):
+    """Тест: добавленное занятие попадает в таймер без перезапуска"""
+    db = Database(str(tmp_path / "timer.db"))
+    timer = LessonTimer(db)
+    fired = asyncio.Queue()
+
+    async def on_end(lesson_ids):
+        await fired.put(lesson_ids)
+
+    timer.on(LESSON_END, on_end)
+    task = asyncio.create_task(timer.run())
+    try:
+        await asyncio.sleep(0.2)
+        start = datetime.now() - timedelta(minutes=60) + timedelta(seconds=1)
+        lesson_id = await db.a.add_lesson(1, 1, start.strftime('%Y-%m-%d %H:%M:%S'), 60, 1000)
+
+        assert await asyncio.wait_for(fired.get(), timeout=5) == [lesson_id]
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        db.close()
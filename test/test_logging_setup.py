@@ -0,0 +1,48 @@
+import gzip
+import logging
+from logging.handlers import QueueHandler
+
+import pytest
+
+import logging_setup
+from logging_setup import setup_logging, stop_logging
+
+
+@pytest.fixture
+def log_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(logging_setup, 'LOG_MAX_BYTES', 2000)
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    yield tmp_path / "logs" / "bot.log"
+    stop_logging()
+    root.handlers[:] = saved_handlers
+    root.setLevel(saved_level)
+
+
+def test_records_written_by_listener(log_file):
+    """Тест: в корневом логгере только QueueHandler, запись в файл делает фоновый поток"""
+    setup_logging(str(log_file))
+    assert [type(handler) for handler in logging.getLogger().handlers] == [QueueHandler]
+
+    logging.getLogger('test').info("занятие создано")
+    logging.getLogger('test').debug("отладка не пишется")
+    stop_logging()
+
+    content = log_file.read_text(encoding='utf-8')
+    assert "test - INFO - занятие создано" in content
+    assert "отладка" not in content
+
+
+def test_rotated_files_are_gzipped(log_file):
+    """Тест: при ротации старый файл сжимается в bot.log.1.gz"""
+    setup_logging(str(log_file))
+    for i in range(100):
+        logging.getLogger('test').info(f"строка {i:03d}")
+    stop_logging()
+
+    rotated = log_file.parent / "bot.log.1.gz"
+    assert rotated.exists()
+    assert not (log_file.parent / "bot.log.1").exists()
+    with gzip.open(rotated, 'rt', encoding='utf-8') as file:
+        assert "строка" in file.read()
+    assert "строка 099" in log_file.read_text(encoding='utf-8')
@@ -0,0 +1,36 @@
+import gzip
+
+from commands.logs import logs
+from commands.logs.logs import get_log_files, read_last_lines, search_logs
+
+
+def write_log(path, lines):
+    path.write_text(''.join(f"{line}\n" for line in lines), encoding='utf-8')
+
+
+def test_read_last_lines_reads_blocks_from_end(tmp_path, monkeypatch):
+    """Тест: хвост файла собирается из нескольких блоков, включая строку без перевода строки"""
+    monkeypatch.setattr(logs, 'READ_BLOCK_SIZE', 16)
+    log_file = tmp_path / "bot.log"
+    log_file.write_text(''.join(f"строка {i}\n" for i in range(100)) + "последняя", encoding='utf-8')
+
+    assert read_last_lines(log_file, 3) == "строка 98\nстрока 99\nпоследняя"
+    assert read_last_lines(log_file, 500).count('\n') == 100
+
+
+def test_search_covers_rotated_and_gzipped_files(tmp_path):
+    """Тест: поиск идет от старых ротаций к текущему файлу и хранит только последние совпадения"""
+    log_file = tmp_path / "bot.log"
+    with gzip.open(tmp_path / "bot.log.2.gz", 'wt', encoding='utf-8') as file:
+        file.write("ERROR старый архив\nINFO шум\n")
+    write_log(tmp_path / "bot.log.1", ["ERROR первая ротация", "INFO шум"])
+    write_log(log_file, [f"error текущий {i}" for i in range(5)])
+
+    assert [path.name for path in get_log_files(log_file)] == ["bot.log.2.gz", "bot.log.1", "bot.log"]
+
+    lines, total = search_logs("Error", log_file, limit=3)
+    assert total == 7
+    assert lines == ["error текущий 2\n", "error текущий 3\n", "error текущий 4\n"]
+
+    lines, total = search_logs("архив", log_file)
+    assert (lines, total) == (["ERROR старый архив\n"], 1)
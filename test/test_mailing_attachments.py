@@ -0,0 +1,41 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from database import Database
+from mailing.attachments import MailingAttachments
+from mailing.models import BonusMailing
+
+
+class FakeBot:
+    def __init__(self):
+        self.documents = []
+
+    async def send_document(self, chat_id, document, caption=None):
+        self.documents.append((chat_id, document))
+        return SimpleNamespace(document=SimpleNamespace(file_id='FILE_ID'))
+
+
+@pytest.mark.asyncio
+async def test_attachment_uploaded_once(tmp_path):
+    """Тест: файл загружается один раз, остальным получателям уходит file_id"""
+    db = Database(str(tmp_path / "mailing.db"))
+    bonus_mailing = BonusMailing(db)
+    file_path = tmp_path / "bonus.pdf"
+    file_path.write_bytes(b'%PDF-1.4')
+    mailing_id = bonus_mailing.create_mailing('Бонус', [str(file_path)], [], datetime.now(), datetime.now())
+    mailing = bonus_mailing.get_mailing_by_id(mailing_id)
+    bot = FakeBot()
+
+    attachments = MailingAttachments(bonus_mailing)
+    for chat_id in (101, 102, 103):
+        assert await attachments.send(bot, chat_id, mailing, str(file_path))
+
+    assert [document for _, document in bot.documents[1:]] == ['FILE_ID', 'FILE_ID']
+    stored = BonusMailing.parse_file_ids(bonus_mailing.get_mailing_by_id(mailing_id))
+    assert stored == {str(file_path): {'document': 'FILE_ID'}}
+
+    bonus_mailing.update_mailing(mailing_id, file_paths=[])
+    assert bonus_mailing.get_mailing_by_id(mailing_id)['file_ids'] is None
+    db.close()
@@ -0,0 +1,40 @@
+import sqlite3
+
+from database import Database
+from mailing.models import BonusMailing
+from migrations import MIGRATIONS, migrate
+
+
+def test_log_mailing_results_keeps_one_row_per_user(tmp_path):
+    """Тест: пачка записей журнала - одна строка на пользователя, 'sent' не затирается"""
+    db = Database(str(tmp_path / "logs.db"))
+    bonus_mailing = BonusMailing(db)
+
+    bonus_mailing.log_mailing_results(1, [(10, 'error', 'timeout'), (11, 'sent', None)])
+    bonus_mailing.log_mailing_results(1, [(10, 'sent', None), (11, 'error', 'blocked')])
+
+    with db.get_connection() as conn:
+        rows = conn.execute("SELECT user_id, status FROM mailing_logs ORDER BY user_id").fetchall()
+    assert [tuple(row) for row in rows] == [(10, 'sent'), (11, 'sent')]
+    assert bonus_mailing.is_mailing_sent_to_user(1, 10)
+    db.close()
+
+
+def test_unique_migration_removes_duplicates(tmp_path):
+    """Тест: миграция оставляет успешную запись из дублей"""
+    conn = sqlite3.connect(tmp_path / "dups.db")
+    for version, _, step in MIGRATIONS:
+        if version < 10:
+            step(conn.cursor())
+    conn.execute("PRAGMA user_version = 9")
+    conn.executemany(
+        "INSERT INTO mailing_logs (mailing_id, user_id, status) VALUES (?, ?, ?)",
+        [(1, 10, 'sent'), (1, 10, 'error'), (1, 11, 'error'), (1, 11, 'error')]
+    )
+    conn.commit()
+
+    migrate(conn)
+
+    rows = conn.execute("SELECT user_id, status FROM mailing_logs ORDER BY user_id").fetchall()
+    assert rows == [(10, 'sent'), (11, 'error')]
+    conn.close()
@@ -0,0 +1,125 @@
+import sqlite3
+
+from migrations import LATEST_VERSION, MIGRATIONS, get_schema_version, get_pending_migrations, migrate
+
+
+def get_columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def test_migrate_fresh_database(tmp_path):
+    """Тест миграции пустой базы до последней версии"""
+    conn = sqlite3.connect(tmp_path / "fresh.db")
+
+    applied = migrate(conn)
+
+    assert len(applied) == LATEST_VERSION
+    assert get_schema_version(conn) == LATEST_VERSION
+    assert 'planner_action_id' in get_columns(conn, 'lessons')
+    assert migrate(conn) == []
+    conn.close()
+
+
+def test_migrate_legacy_database(tmp_path):
+    """Тест миграции старой базы без версии и без новых столбцов"""
+    conn = sqlite3.connect(tmp_path / "legacy.db")
+    conn.execute('''
+    CREATE TABLE lessons (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tutor_id INTEGER,
+        student_id INTEGER,
+        lesson_date TIMESTAMP,
+        duration INTEGER,
+        price REAL,
+        status TEXT DEFAULT 'planned',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        reminder_sent INTEGER DEFAULT 0
+    )
+    ''')
+    conn.execute("INSERT INTO lessons (tutor_id, student_id, lesson_date) VALUES (1, 1, '2025-01-01 10:00:00')")
+    conn.commit()
+
+    migrate(conn)
+
+    assert get_schema_version(conn) == LATEST_VERSION
+    assert {'group_id', 'planner_action_id'} <= set(get_columns(conn, 'lessons'))
+    assert conn.execute("SELECT COUNT(*) FROM lessons").fetchone()[0] == 1
+    conn.close()
+
+
+def test_migrate_dry_run(tmp_path):
+    """Тест dry-run: миграции только перечисляются"""
+    conn = sqlite3.connect(tmp_path / "dry.db")
+
+    planned = migrate(conn, dry_run=True)
+
+    assert [version for version, _ in planned] == [m[0] for m in get_pending_migrations(conn)]
+    assert get_schema_version(conn) == 0
+    conn.close()
+
+
+def test_lesson_end_maintained_by_triggers(tmp_path):
+    """Тест: lesson_end пересчитывается при вставке и переносе занятия"""
+    conn = sqlite3.connect(tmp_path / "lesson_end.db")
+    migrate(conn)
+
+    conn.execute("INSERT INTO lessons (tutor_id, student_id, lesson_date, duration) VALUES (1, 1, '2025-01-01 10:00:00', 90)")
+    assert conn.execute("SELECT lesson_end FROM lessons").fetchone()[0] == '2025-01-01 11:30:00'
+
+    conn.execute("UPDATE lessons SET lesson_date = '2025-01-02 18:00:00'")
+    conn.execute("UPDATE lessons SET duration = 45")
+    assert conn.execute("SELECT lesson_end FROM lessons").fetchone()[0] == '2025-01-02 18:45:00'
+    conn.close()
+
+
+def test_group_sessions_dropped_by_migration(tmp_path):
+    """Тест: миграция 17 удаляет group_sessions и lessons.session_id, занятия учеников остаются"""
+    conn = sqlite3.connect(tmp_path / "sessions.db")
+    conn.execute("PRAGMA user_version = 0")
+    for step in [m for m in MIGRATIONS if m[0] < 17]:
+        step[2](conn.cursor())
+    conn.executemany(
+        "INSERT INTO lessons (tutor_id, student_id, group_id, lesson_date, duration, price) VALUES (1, ?, ?, ?, 60, 500)",
+        [(1, 7, '2025-01-01 10:00:00'), (2, 7, '2025-01-01 10:00:00'), (3, None, '2025-01-01 10:00:00')]
+    )
+    conn.execute("PRAGMA user_version = 16")
+    conn.commit()
+
+    migrate(conn)
+
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name LIKE '%group_sessions%'").fetchall() == []
+    assert 'session_id' not in get_columns(conn, 'lessons')
+    assert conn.execute("SELECT student_id, group_id FROM lessons ORDER BY id").fetchall() == [(1, 7), (2, 7), (3, None)]
+
+    # Перенос строк занятия больше не трогает триггеры сессий
+    conn.execute("UPDATE lessons SET lesson_date = '2025-01-02 12:00:00' WHERE group_id = 7")
+    assert conn.execute("SELECT DISTINCT lesson_end FROM lessons WHERE group_id = 7").fetchall() == [('2025-01-02 13:00:00',)]
+    conn.close()
+
+
+def test_rollups_backfilled_by_migration(tmp_path):
+    """Тест: миграция 16 заполняет сводки по существующим занятиям и отчетам"""
+    conn = sqlite3.connect(tmp_path / "rollups.db")
+    conn.execute("PRAGMA user_version = 0")
+    for step in [m for m in MIGRATIONS if m[0] < 16]:
+        step[2](conn.cursor())
+    conn.execute(
+        "INSERT INTO lessons (id, tutor_id, student_id, lesson_date, duration, price, status) "
+        "VALUES (1, 1, 7, '2025-03-03 10:00:00', 60, 1000, 'completed')"
+    )
+    conn.execute("INSERT INTO lesson_reports (lesson_id, student_id, lesson_held, lesson_paid) VALUES (1, 7, 1, 0)")
+    conn.execute("PRAGMA user_version = 15")
+    conn.commit()
+
+    migrate(conn)
+
+    assert conn.execute(
+        "SELECT unpaid_count, unpaid_amount, undone_homework_count FROM student_rollups WHERE student_id = 7"
+    ).fetchone() == (1, 1000.0, 1)
+    assert conn.execute("SELECT month, earnings FROM tutor_monthly_rollups").fetchall() == [('2025-03', 1000.0)]
+
+    # Дальше сводки ведут триггеры
+    conn.execute("UPDATE lesson_reports SET lesson_paid = 1 WHERE lesson_id = 1")
+    assert conn.execute("SELECT unpaid_count FROM student_rollups WHERE student_id = 7").fetchone() == (0,)
+    assert conn.execute("SELECT paid_earnings FROM tutor_monthly_rollups").fetchone() == (1000.0,)
+    conn.close()
@@ -0,0 +1,105 @@
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+import pytest_asyncio
+
+from database import Database
+from report_pdf.month_end import MonthEndReportJob, next_run_time, previous_month
+from report_pdf.pdf_cache import KIND_REPORT, PDFCache
+from report_pdf.render_service import PDFRenderService
+
+
+@pytest.fixture
+def test_db(tmp_path):
+    database = Database(str(tmp_path / "month_end.db"))
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def cache(test_db, tmp_path):
+    return PDFCache(cache_dir=str(tmp_path / "pdf"), database=test_db)
+
+
+@pytest_asyncio.fixture
+async def renderer():
+    service = PDFRenderService(max_workers=2)
+    yield service
+    service.shutdown()
+
+
+def add_tutor(database, telegram_id, subscribed=True):
+    tutor_id = database.add_tutor(telegram_id, f"Репетитор {telegram_id}", "+70000000000")
+    student_id = database.add_student("Ученик", "+71111111111", "", "active", tutor_id)
+    for day in (3, 10, 17):
+        database.add_lesson(tutor_id, student_id, datetime(2025, 3, day, 10, 0), 60, 1000)
+    if subscribed:
+        with database.get_connection() as conn:
+            conn.execute('''
+            INSERT INTO payments (user_id, payment_id, tariff_name, amount, status, created_at, valid_until)
+            VALUES (?, ?, 'Premium', 500, 'succeeded', datetime('now', 'localtime'),
+                    datetime('now', 'localtime', '+30 days'))
+            ''', (telegram_id, f"p{telegram_id}"))
+            conn.commit()
+    return tutor_id
+
+
+def test_collect_month_data_groups_by_tutor(test_db):
+    """Тест: один запрос отдает занятия месяца по репетиторам с активной подпиской"""
+    first = add_tutor(test_db, 1)
+    second = add_tutor(test_db, 2)
+    add_tutor(test_db, 3, subscribed=False)
+
+    tutors = MonthEndReportJob(database=test_db).collect_month_data(2025, 3)
+
+    assert [item['tutor']['id'] for item in tutors] == [first, second]
+    assert tutors[0]['telegram_id'] == 1
+    assert len(tutors[0]['lessons']) == 3
+    assert 'tutor_name' not in tutors[0]['lessons'][0]
+    assert tutors[0]['lessons'][0]['student_name'] == "Ученик"
+
+
+@pytest.mark.asyncio
+async def test_run_warms_cache_once(test_db, cache, renderer):
+    """Тест: прогон кладет отчеты в кэш, повторный прогон ничего не рисует"""
+    tutor_ids = [add_tutor(test_db, telegram_id) for telegram_id in (1, 2, 3)]
+    job = MonthEndReportJob(database=test_db, cache=cache, renderer=renderer)
+
+    stats = await job.run(2025, 3)
+
+    assert stats['rendered'] == 3 and stats['failed'] == 0
+    assert set(stats['per_tutor']) == set(tutor_ids)
+    for tutor_id in tutor_ids:
+        fingerprint = cache.fingerprint(tutor_id, KIND_REPORT, 2025, 3)
+        entry = cache.get(tutor_id, KIND_REPORT, 2025, 3, fingerprint)
+        assert cache.read(entry).startswith(b'%PDF')
+
+    stats = await job.run(2025, 3)
+    assert stats['cached'] == 3 and stats['rendered'] == 0
+
+
+@pytest.mark.asyncio
+async def test_delivery_remembers_file_id(test_db, cache, renderer):
+    """Тест: при отправке отчета репетитору запоминается file_id"""
+    tutor_id = add_tutor(test_db, 1)
+    bot = SimpleNamespace(send_document=AsyncMock(
+        return_value=SimpleNamespace(document=SimpleNamespace(file_id='FILE1'))
+    ))
+
+    stats = await MonthEndReportJob(bot, deliver=True, database=test_db, cache=cache, renderer=renderer).run(2025, 3)
+
+    assert stats['delivered'] == 1
+    assert bot.send_document.await_args.args[0] == 1
+    fingerprint = cache.fingerprint(tutor_id, KIND_REPORT, 2025, 3)
+    assert cache.get(tutor_id, KIND_REPORT, 2025, 3, fingerprint)['file_id'] == 'FILE1'
+
+
+def test_schedule():
+    """Тест: запуск первого числа в 03:00 за предыдущий месяц"""
+    assert next_run_time(datetime(2025, 3, 15, 12, 0)) == datetime(2025, 4, 1, 3, 0)
+    assert next_run_time(datetime(2025, 12, 1, 4, 0)) == datetime(2026, 1, 1, 3, 0)
+    assert next_run_time(datetime(2025, 4, 1, 2, 0)) == datetime(2025, 4, 1, 3, 0)
+    assert previous_month(datetime(2025, 1, 1, 3, 0)) == (2024, 12)
+    assert previous_month(datetime(2025, 4, 1, 3, 0)) == (2025, 3)
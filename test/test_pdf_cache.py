@@ -0,0 +1,93 @@
+import os
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from database import Database
+from report_pdf import handlers
+from report_pdf.pdf_cache import KIND_REPORT, PDFCache
+
+
+@pytest.fixture
+def test_db(tmp_path):
+    database = Database(str(tmp_path / "pdf_cache.db"))
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def cache(test_db, tmp_path):
+    return PDFCache(cache_dir=str(tmp_path / "pdf"), database=test_db)
+
+
+def add_month(database):
+    tutor_id = database.add_tutor(1, "Репетитор", "+70000000000")
+    student_id = database.add_student("Ученик", "+71111111111", "", "active", tutor_id)
+    lesson_id = database.add_lesson(tutor_id, student_id, datetime(2025, 3, 3, 10, 0), 60, 1000)
+    return tutor_id, lesson_id
+
+
+def test_fingerprint_follows_month_data(test_db, cache):
+    """Тест: отпечаток меняется при изменении занятий месяца и не зависит от других месяцев"""
+    tutor_id, lesson_id = add_month(test_db)
+    first = cache.fingerprint(tutor_id, KIND_REPORT, 2025, 3)
+    assert cache.fingerprint(tutor_id, KIND_REPORT, 2025, 3) == first
+
+    test_db.add_lesson(tutor_id, None, datetime(2025, 4, 1, 10, 0), 60, 1000)
+    assert cache.fingerprint(tutor_id, KIND_REPORT, 2025, 3) == first
+
+    with test_db.get_connection() as conn:
+        conn.execute("UPDATE lessons SET status = 'completed' WHERE id = ?", (lesson_id,))
+        conn.commit()
+    assert cache.fingerprint(tutor_id, KIND_REPORT, 2025, 3) != first
+
+
+def test_put_get_and_file_id(test_db, cache):
+    """Тест: запись находится только по текущему отпечатку, file_id сбрасывается новой версией"""
+    cache.put(1, KIND_REPORT, 2025, 3, 'v1', b'%PDF-1')
+    cache.set_file_id(1, KIND_REPORT, 2025, 3, 'v1', 'FILE1')
+
+    entry = cache.get(1, KIND_REPORT, 2025, 3, 'v1')
+    assert entry['file_id'] == 'FILE1'
+    assert cache.read(entry) == b'%PDF-1'
+    assert cache.get(1, KIND_REPORT, 2025, 3, 'v2') is None
+
+    cache.put(1, KIND_REPORT, 2025, 3, 'v2', b'%PDF-2')
+    entry = cache.get(1, KIND_REPORT, 2025, 3, 'v2')
+    assert entry['file_id'] is None
+    assert cache.read(entry) == b'%PDF-2'
+    # Файл прежней версии удален
+    assert len(os.listdir(cache.cache_dir)) == 1
+
+
+def test_eviction_removes_least_recently_used(test_db, tmp_path):
+    """Тест: при превышении размера удаляются давно не запрошенные файлы"""
+    cache = PDFCache(cache_dir=str(tmp_path / "pdf"), max_bytes=25, database=test_db)
+    cache.put(1, KIND_REPORT, 2025, 1, 'a', b'x' * 10)
+    cache.put(1, KIND_REPORT, 2025, 2, 'b', b'x' * 10)
+    cache.get(1, KIND_REPORT, 2025, 1, 'a')   # январь использован позже февраля
+    cache.put(1, KIND_REPORT, 2025, 3, 'c', b'x' * 10)
+
+    assert cache.get(1, KIND_REPORT, 2025, 1, 'a') is not None
+    assert cache.get(1, KIND_REPORT, 2025, 2, 'b') is None
+    assert cache.get(1, KIND_REPORT, 2025, 3, 'c') is not None
+
+
+@pytest.mark.asyncio
+async def test_repeat_request_resends_by_file_id(test_db, cache):
+    """Тест: повторный запрос не рисует PDF и не загружает файл заново"""
+    tutor_id, _ = add_month(test_db)
+    render = AsyncMock(return_value=b'%PDF-report')
+    message = SimpleNamespace(answer_document=AsyncMock(
+        return_value=SimpleNamespace(document=SimpleNamespace(file_id='FILE1'))
+    ))
+
+    with patch.object(handlers, 'db', test_db), patch.object(handlers, 'pdf_cache', cache):
+        for _ in range(2):
+            await handlers.send_monthly_pdf(message, tutor_id, KIND_REPORT, 2025, 3, render, 'report.pdf', 'Отчет')
+
+    render.assert_awaited_once()
+    assert message.answer_document.await_count == 2
+    assert message.answer_document.await_args.kwargs['document'] == 'FILE1'
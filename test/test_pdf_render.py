@@ -0,0 +1,62 @@
+import logging
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+
+from report_pdf import fonts
+from report_pdf.render_service import PDFRenderService
+
+TUTOR = {'id': 1, 'name': 'Репетитор', 'phone': '+70000000000'}
+LESSONS = [
+    {'lesson_date': '2025-03-03 10:00:00', 'duration': 60, 'price': 1000, 'status': 'completed',
+     'student_name': 'Иванов Иван', 'group_id': None},
+    {'lesson_date': '2025-03-05 18:00:00', 'duration': 90, 'price': 500, 'status': 'planned',
+     'group_name': 'Группа', 'group_id': 3},
+]
+
+
+@pytest_asyncio.fixture
+async def renderer():
+    service = PDFRenderService(max_workers=1)
+    yield service
+    service.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_report_and_schedule_rendered_in_pool(renderer):
+    """Тест: отчет и расписание рисуются в процессе пула и возвращаются байтами PDF"""
+    report = await renderer.render_monthly_report(TUTOR, LESSONS, 3, 2025)
+    schedule = await renderer.render_monthly_schedule(TUTOR, {
+        'year': 2025, 'month': 3,
+        'daily_schedule': {'2025-03-03': {'lessons': LESSONS[:1]}, '2025-03-05': {'lessons': LESSONS[1:]}},
+    })
+
+    assert report.startswith(b'%PDF')
+    assert schedule.startswith(b'%PDF')
+
+
+def _log_in_worker(message: str) -> bool:
+    logging.getLogger('report_pdf.pdf_generator').error(message)
+    return True
+
+
+@pytest.mark.asyncio
+async def test_worker_logs_reach_main_process(renderer, caplog):
+    """Тест: ошибки, записанные в процессе пула, попадают в логирование основного процесса"""
+    with caplog.at_level(logging.INFO):
+        assert await renderer.run(_log_in_worker, 'ошибка в процессе пула')
+        renderer.shutdown()   # дожидается процессов и дочитывает очередь логов
+
+    assert ('report_pdf.pdf_generator', logging.ERROR, 'ошибка в процессе пула') in caplog.record_tuples
+
+
+def test_fonts_registered_once(monkeypatch):
+    """Тест: повторные генераторы не разбирают TTF заново"""
+    monkeypatch.setattr(fonts, '_registered_fonts', None)
+    with patch.object(fonts, 'TTFont', side_effect=OSError('нет файла')) as ttfont:
+        first = fonts.register_fonts()
+        second = fonts.register_fonts()
+
+    assert first == second == fonts.FALLBACK_FONTS
+    assert ttfont.call_count == len(fonts.FONT_CANDIDATES)
@@ -0,0 +1,163 @@
+import time
+from unittest.mock import patch
+
+import pytest
+
+from database import Database
+from handlers.schedule.planner.timer.planner_engine import PlannerEngine
+
+
+@pytest.fixture
+def test_db(tmp_path):
+    database = Database(str(tmp_path / "planner.db"))
+    # Активная подписка у репетитора с telegram_id = 1
+    with database.get_connection() as conn:
+        conn.execute('''
+        INSERT INTO payments (user_id, payment_id, tariff_name, amount, status, created_at, valid_until)
+        VALUES (1, 'p1', 'Premium', 500, 'succeeded', datetime('now', 'localtime'), datetime('now', 'localtime', '+30 days'))
+        ''')
+        conn.commit()
+    yield database
+    database.close()
+
+
+def add_action(conn, tutor_id, weekday, student_id=None, group_id=None):
+    cursor = conn.execute('''
+    INSERT INTO planner_actions (tutor_id, lesson_type, student_id, group_id, weekday, time, duration, price)
+    VALUES (?, ?, ?, ?, ?, '18:00', 60, 1000)
+    ''', (tutor_id, 'group' if group_id else 'individual', student_id, group_id, weekday))
+    return cursor.lastrowid
+
+
+def count_lessons(database, action_id):
+    with database.get_connection() as conn:
+        return conn.execute('SELECT COUNT(*) FROM lessons WHERE planner_action_id = ?', (action_id,)).fetchone()[0]
+
+
+async def run_planner(database, force=False):
+    with patch('handlers.schedule.planner.timer.planner_engine.db', database):
+        await PlannerEngine()._check_and_create_lessons(force=force)
+
+
+@pytest.mark.asyncio
+async def test_generates_missing_lessons_once(test_db):
+    """Тест: индивидуальные и групповые занятия создаются на 3 недели и не дублируются"""
+    tutor_id = test_db.add_tutor(1, "Репетитор", "+70000000000")
+    student_id = test_db.add_student("Ученик", "+71111111111", "", "active", tutor_id)
+    group_id = test_db.add_group("Группа", tutor_id)
+    with test_db.get_connection() as conn:
+        conn.execute('INSERT INTO student_groups (student_id, group_id) VALUES (?, ?), (?, ?)',
+                     (student_id, group_id, student_id + 100, group_id))
+        individual = add_action(conn, tutor_id, 'monday', student_id=student_id)
+        group = add_action(conn, tutor_id, 'friday', group_id=group_id)
+        conn.commit()
+
+    await run_planner(test_db)
+    assert count_lessons(test_db, individual) == 3
+    assert count_lessons(test_db, group) == 6
+
+    await run_planner(test_db, force=True)
+    assert count_lessons(test_db, individual) == 3
+    assert count_lessons(test_db, group) == 6
+    with test_db.get_connection() as conn:
+        # Групповые занятия: три даты, на каждую по занятию обоих учеников
+        assert conn.execute('SELECT COUNT(DISTINCT lesson_date) FROM lessons WHERE planner_action_id = ?',
+                            (group,)).fetchone()[0] == 3
+
+
+@pytest.mark.asyncio
+async def test_generation_scales_to_thousands_of_tasks(test_db):
+    """Тест: принудительный прогон по 2000 задач укладывается в секунду"""
+    tutor_id = test_db.add_tutor(1, "Репетитор", "+70000000000")
+    with test_db.get_connection() as conn:
+        conn.executemany('''
+        INSERT INTO planner_actions (tutor_id, lesson_type, student_id, weekday, time, duration, price)
+        VALUES (?, 'individual', ?, 'wednesday', '10:00', 60, 1000)
+        ''', [(tutor_id, student_id) for student_id in range(1, 2001)])
+        conn.commit()
+
+    started = time.perf_counter()
+    await run_planner(test_db, force=True)
+    elapsed = time.perf_counter() - started
+
+    with test_db.get_connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM lessons').fetchone()[0] == 6000
+    assert elapsed < 1.0
+
+
+@pytest.mark.asyncio
+async def test_rolling_horizon_keeps_deleted_lessons_deleted(test_db):
+    """Тест: повторный прогон не восстанавливает удаленное занятие и не трогает покрытые дни"""
+    tutor_id = test_db.add_tutor(1, "Репетитор", "+70000000000")
+    with test_db.get_connection() as conn:
+        action_id = add_action(conn, tutor_id, 'tuesday', student_id=1)
+        conn.commit()
+
+    await run_planner(test_db)
+    with test_db.get_connection() as conn:
+        conn.execute('DELETE FROM lessons WHERE id = (SELECT MAX(id) FROM lessons)')
+        conn.commit()
+
+    await run_planner(test_db)
+    assert count_lessons(test_db, action_id) == 2
+
+    # Новый день горизонта: covered_until отстает на неделю - достраивается только она
+    with test_db.get_connection() as conn:
+        conn.execute("UPDATE planner_actions SET covered_until = date(covered_until, '-7 days')")
+        conn.commit()
+    await run_planner(test_db)
+    assert count_lessons(test_db, action_id) == 3
+
+
+@pytest.mark.asyncio
+async def test_update_action_moves_future_lessons(test_db):
+    """Тест: смена времени задачи переносит ее будущие занятия"""
+    tutor_id = test_db.add_tutor(1, "Репетитор", "+70000000000")
+    with test_db.get_connection() as conn:
+        action_id = add_action(conn, tutor_id, 'thursday', student_id=1)
+        conn.commit()
+    await run_planner(test_db)
+
+    with patch('handlers.schedule.planner.timer.planner_engine.db', test_db):
+        assert PlannerEngine().update_action(action_id, 'time', '9:30') is True
+
+    with test_db.get_connection() as conn:
+        times = {row[0] for row in conn.execute(
+            "SELECT strftime('%H:%M', lesson_date) FROM lessons WHERE planner_action_id = ?", (action_id,)
+        )}
+        assert times == {'09:30'}
+        assert conn.execute('SELECT time FROM planner_actions WHERE id = ?', (action_id,)).fetchone()[0] == '9:30'
+
+
+@pytest.mark.asyncio
+async def test_tasks_of_unsubscribed_tutor_are_deactivated(test_db):
+    """Тест: задачи репетитора без активной подписки отключаются без создания занятий"""
+    tutor_id = test_db.add_tutor(2, "Без подписки", "+70000000001")
+    with test_db.get_connection() as conn:
+        action_id = add_action(conn, tutor_id, 'monday', student_id=1)
+        conn.commit()
+
+    await run_planner(test_db)
+
+    assert count_lessons(test_db, action_id) == 0
+    with test_db.get_connection() as conn:
+        assert not conn.execute('SELECT is_active FROM planner_actions WHERE id = ?', (action_id,)).fetchone()[0]
+
+
+@pytest.mark.asyncio
+async def test_empty_group_gets_lessons_after_students_join(test_db):
+    """Тест: задача пустой группы не считается покрытой, занятия появляются после добавления ученика"""
+    tutor_id = test_db.add_tutor(1, "Репетитор", "+70000000000")
+    student_id = test_db.add_student("Ученик", "+71111111111", "", "active", tutor_id)
+    group_id = test_db.add_group("Группа", tutor_id)
+    with test_db.get_connection() as conn:
+        action_id = add_action(conn, tutor_id, 'wednesday', group_id=group_id)
+        conn.commit()
+
+    await run_planner(test_db)
+    assert count_lessons(test_db, action_id) == 0
+
+    with patch('handlers.schedule.planner.timer.planner_engine.db', test_db):
+        test_db.add_student_to_group(student_id, group_id)
+        await PlannerEngine().refresh(action_id=action_id)
+    assert count_lessons(test_db, action_id) == 3
@@ -0,0 +1,94 @@
+import ast
+import re
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from migrations import migrate
+
+DATABASE_SOURCE = Path(__file__).resolve().parent.parent / 'database.py'
+
+QUERY_RE = re.compile(r'^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b', re.IGNORECASE)
+LESSONS_ALIAS_RE = re.compile(r'\blessons\s+(?:AS\s+)?([A-Za-z_]\w*)', re.IGNORECASE)
+SQL_KEYWORDS = {
+    'where', 'set', 'join', 'left', 'inner', 'on', 'group', 'order', 'limit',
+    'values', 'using', 'and', 'or', 'as', 'union', 'having',
+}
+
+
+def collect_queries(path: Path) -> list:
+    """Собирает статические SQL-запросы из cursor.execute(...) в модуле"""
+    tree = ast.parse(path.read_text(encoding='utf-8'))
+    queries = {}
+
+    for func in ast.walk(tree):
+        if not isinstance(func, ast.FunctionDef):
+            continue
+
+        # query = '''...'''; cursor.execute(query, ...)
+        assigned = {}
+        for node in ast.walk(func):
+            if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant) \
+                    and isinstance(node.value.value, str):
+                for target in node.targets:
+                    if isinstance(target, ast.Name):
+                        assigned[target.id] = node.value.value
+
+        for node in ast.walk(func):
+            if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                    and node.func.attr in ('execute', 'executemany') and node.args):
+                continue
+            arg = node.args[0]
+            if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+                sql = arg.value
+            elif isinstance(arg, ast.Name) and arg.id in assigned:
+                sql = assigned[arg.id]
+            else:
+                continue
+            if QUERY_RE.match(sql):
+                queries[f"{func.name}:{node.lineno}"] = sql.strip()
+
+    return sorted(queries.items())
+
+
+def lessons_aliases(sql: str) -> set:
+    """Имена, под которыми таблица lessons встречается в запросе"""
+    aliases = {'lessons'}
+    for alias in LESSONS_ALIAS_RE.findall(sql):
+        if alias.lower() not in SQL_KEYWORDS:
+            aliases.add(alias)
+    return aliases
+
+
+@pytest.fixture(scope='module')
+def schema_conn():
+    """Пустая база с актуальной схемой и индексами"""
+    conn = sqlite3.connect(':memory:')
+    migrate(conn)
+    yield conn
+    conn.close()
+
+
+QUERIES = collect_queries(DATABASE_SOURCE)
+
+
+def test_queries_collected():
+    """Тест, что сборщик нашел запросы Database"""
+    assert len(QUERIES) > 100
+
+
+@pytest.mark.parametrize('location, sql', QUERIES, ids=[location for location, _ in QUERIES])
+def test_query_does_not_scan_lessons(schema_conn, location, sql):
+    """Тест: ни один запрос Database не сканирует lessons целиком"""
+    try:
+        plan = schema_conn.execute(f"EXPLAIN QUERY PLAN {sql}", [None] * sql.count('?')).fetchall()
+    except sqlite3.OperationalError as e:
+        pytest.skip(f"Запрос не соответствует схеме: {e}")
+
+    aliases = lessons_aliases(sql)
+    scans = [
+        row[3] for row in plan
+        if row[3].startswith('SCAN ') and row[3].split()[1] in aliases
+    ]
+    assert not scans, f"{location}: полный просмотр lessons: {scans}"
@@ -0,0 +1,141 @@
+from datetime import date, datetime
+
+import pytest
+
+from database import Database
+
+
+@pytest.fixture
+def test_db(tmp_path):
+    database = Database(str(tmp_path / "rollups.db"))
+    yield database
+    database.close()
+
+
+def execute(database, sql, params=()):
+    with database.get_connection() as conn:
+        conn.execute(sql, params)
+        conn.commit()
+
+
+def snapshot(database):
+    with database.get_connection() as conn:
+        students = conn.execute('''
+        SELECT student_id, unpaid_count, unpaid_amount, undone_homework_count, held_count, reported_count
+        FROM student_rollups
+        WHERE unpaid_count != 0 OR unpaid_amount != 0 OR undone_homework_count != 0
+           OR held_count != 0 OR reported_count != 0
+        ORDER BY student_id
+        ''').fetchall()
+        tutors = conn.execute('''
+        SELECT tutor_id, month, completed_count, earnings, paid_earnings
+        FROM tutor_monthly_rollups
+        WHERE completed_count != 0 OR earnings != 0 OR paid_earnings != 0
+        ORDER BY tutor_id, month
+        ''').fetchall()
+    return [tuple(row) for row in students], [tuple(row) for row in tutors]
+
+
+def report_id(database, lesson_id, student_id):
+    with database.get_connection() as conn:
+        return conn.execute('SELECT id FROM lesson_reports WHERE lesson_id = ? AND student_id = ?',
+                            (lesson_id, student_id)).fetchone()[0]
+
+
+@pytest.fixture
+def tutor(test_db):
+    """Репетитор с двумя учениками, у первого есть родитель"""
+    tutor_id = test_db.add_tutor(1, "Репетитор", "+70000000000")
+    first = test_db.add_student("Первый", "+71111111111", "", "active", tutor_id)
+    second = test_db.add_student("Второй", "+72222222222", "", "active", tutor_id)
+    execute(test_db, 'UPDATE students SET parent_telegram_id = 500 WHERE id = ?', (first,))
+    return tutor_id, first, second
+
+
+def test_triggers_match_full_rebuild(test_db, tutor):
+    """Тест: сводки, которые ведут триггеры, совпадают с полным пересчетом после любых изменений"""
+    tutor_id, first, second = tutor
+    march = test_db.add_lesson(tutor_id, first, datetime(2025, 3, 3, 10, 0), 60, 1000)
+    april = test_db.add_lesson(tutor_id, first, datetime(2025, 4, 7, 10, 0), 60, 1200)
+    other = test_db.add_lesson(tutor_id, second, datetime(2025, 3, 4, 10, 0), 60, 1500)
+    cancelled = test_db.add_lesson(tutor_id, second, datetime(2025, 3, 5, 10, 0), 60, 700)
+
+    for lesson_id in (march, april, other, cancelled):
+        execute(test_db, "UPDATE lessons SET status = 'completed' WHERE id = ?", (lesson_id,))
+    test_db.save_lesson_report(march, first, lesson_held=True, lesson_paid=False, homework_done=False)
+    test_db.save_lesson_report(april, first, lesson_held=True, lesson_paid=True, homework_done=False)
+    test_db.save_lesson_report(other, second, lesson_held=False)
+    test_db.save_lesson_report(cancelled, second, lesson_held=True, lesson_paid=False)
+
+    test_db.update_report_payment(report_id(test_db, april, first), 0)
+    test_db.update_report_homework(report_id(test_db, march, first), 1)
+    test_db.update_report_attendance(report_id(test_db, other, second), 1)
+    test_db.save_lesson_report(other, second, lesson_paid=True)
+    test_db.update_lesson_price(march, 1100)
+    test_db.update_lesson_datetime(april, datetime(2025, 5, 5, 10, 0))
+    execute(test_db, "UPDATE lessons SET status = 'cancelled' WHERE id = ?", (cancelled,))
+    extra = test_db.add_lesson(tutor_id, second, datetime(2025, 3, 20, 10, 0), 60, 900, status='completed')
+    test_db.save_lesson_report(extra, second, lesson_held=True, lesson_paid=False)
+    test_db.delete_lesson(extra)
+
+    incremental = snapshot(test_db)
+    assert test_db.rebuild_rollups()
+    assert snapshot(test_db) == incremental
+
+    rollup = test_db.get_student_rollup(first)
+    assert rollup['unpaid_count'] == 2 and rollup['unpaid_amount'] == 2300
+    assert rollup['undone_homework_count'] == 1
+    assert test_db.get_student_rollup(second)['unpaid_count'] == 0
+
+    earnings = test_db.get_tutor_monthly_earnings(tutor_id, ['2025-03', '2025-05', '2025-06'])
+    assert earnings['2025-03'] == {'completed_count': 2, 'earnings': 2600, 'paid_earnings': 1500}
+    assert earnings['2025-05']['earnings'] == 1200
+    assert earnings['2025-06']['completed_count'] == 0
+
+
+def test_debt_readers(test_db, tutor):
+    """Тест: экраны долгов читают сводки и частичные индексы"""
+    tutor_id, first, second = tutor
+    paid = test_db.add_lesson(tutor_id, first, datetime(2025, 3, 3, 10, 0), 60, 1000, status='completed')
+    unpaid = test_db.add_lesson(tutor_id, first, datetime(2025, 3, 10, 10, 0), 60, 1000, status='completed')
+    missed = test_db.add_lesson(tutor_id, second, datetime(2025, 3, 11, 10, 0), 60, 1000, status='completed')
+    test_db.save_lesson_report(paid, first, lesson_held=True, lesson_paid=True, homework_done=True)
+    test_db.save_lesson_report(unpaid, first, lesson_held=True, lesson_paid=False, homework_done=False,
+                               student_performance="Хорошо")
+    test_db.save_lesson_report(missed, second, lesson_held=False)
+
+    debtors = test_db.get_tutor_debt_rollups(tutor_id)
+    assert [row['student_id'] for row in debtors] == [first]
+    assert debtors[0]['student_name'] == "Первый"
+    assert debtors[0]['attendance_rate'] == 1.0
+    assert test_db.get_student_rollup(second)['attendance_rate'] == 0.0
+
+    assert [row['lesson_id'] for row in test_db.get_student_payment_debts(first, tutor_id)] == [unpaid]
+    homework = test_db.get_student_homework_debts(first, tutor_id)
+    assert homework == [{'lesson_id': unpaid, 'lesson_date': homework[0]['lesson_date'],
+                         'student_performance': "Хорошо"}]
+
+    assert [row['lesson_id'] for row in test_db.get_parent_unpaid_lessons(500)] == [unpaid]
+    assert [row['lesson_id'] for row in test_db.get_parent_homeworks(500)] == [unpaid]
+    assert test_db.get_parent_debt_rollups(500)[0]['unpaid_amount'] == 1000
+
+    # Отметка оплаты прямым UPDATE из обработчика тоже снимает долг
+    execute(test_db, 'UPDATE lesson_reports SET lesson_paid = 1 WHERE lesson_id = ?', (unpaid,))
+    assert test_db.get_student_rollup(first)['unpaid_count'] == 0
+    assert test_db.get_student_payment_debts(first, tutor_id) == []
+
+
+def test_monthly_rollup_matches_statistics(test_db, tutor):
+    """Тест: заработок главного меню из tutor_monthly_rollups совпадает с подсчетом по занятиям"""
+    tutor_id, first, second = tutor
+    for day, student_id, paid in ((3, first, True), (10, first, False), (11, second, True)):
+        lesson_id = test_db.add_lesson(tutor_id, student_id, datetime(2025, 3, day, 10, 0), 60, 1000 + day,
+                                       status='completed')
+        test_db.save_lesson_report(lesson_id, student_id, lesson_held=True, lesson_paid=paid)
+    test_db.add_lesson(tutor_id, first, datetime(2025, 3, 31, 10, 0), 60, 1000)
+
+    stats = test_db.get_tutor_statistics(tutor_id, {'march': (date(2025, 3, 1), date(2025, 4, 1))})
+    monthly = test_db.get_tutor_monthly_earnings(tutor_id, ['2025-03'])
+
+    assert monthly['2025-03']['paid_earnings'] == stats['periods']['march']['paid_earnings'] == 2014
+    assert monthly['2025-03']['completed_count'] == stats['periods']['march']['completed_lessons'] == 3
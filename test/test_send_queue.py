@@ -0,0 +1,57 @@
+import time
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from send_queue import SendQueue
+
+
+@pytest.mark.asyncio
+async def test_call_retries_after_retry_after():
+    """Тест: после RetryAfter запрос повторяется"""
+    queue = SendQueue(rate=100, per_chat_interval=0)
+    attempts = []
+
+    async def request():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise TelegramRetryAfter(SendMessage(chat_id=1, text='x'), 'Flood control', retry_after=0)
+        return 'ok'
+
+    assert await queue.call(1, request) == 'ok'
+    assert len(attempts) == 2
+
+
+@pytest.mark.asyncio
+async def test_per_chat_interval():
+    """Тест: в один чат сообщения уходят не чаще per_chat_interval"""
+    queue = SendQueue(rate=100, per_chat_interval=0.2)
+
+    async def request():
+        return None
+
+    started = time.monotonic()
+    await queue.call(1, request)
+    await queue.call(1, request)
+    assert time.monotonic() - started >= 0.2
+
+
+@pytest.mark.asyncio
+async def test_send_many_reports_progress_and_failures():
+    """Тест: send_many считает успешные и неудачные отправки"""
+    queue = SendQueue(rate=1000, per_chat_interval=0, workers=4)
+    progress = []
+
+    async def job(chat_id):
+        if chat_id % 5 == 0:
+            raise RuntimeError('blocked')
+
+    async def on_progress(done, total, sent, failed):
+        progress.append((done, total, sent, failed))
+
+    sent, failed = await queue.send_many(range(1, 21), job, on_progress=on_progress, progress_every=10)
+
+    assert sent == 16
+    assert sorted(failed) == [5, 10, 15, 20]
+    assert progress[-1] == (20, 20, 16, 4)
@@ -0,0 +1,85 @@
+from datetime import date, datetime
+
+import pytest
+
+from database import Database
+from report_pdf.pdf_generator import PDFReportGenerator
+from report_pdf.report_service import ReportService
+
+
+@pytest.fixture
+def test_db(tmp_path):
+    database = Database(str(tmp_path / "statistics.db"))
+    yield database
+    database.close()
+
+
+def set_status(database, lesson_id, status):
+    with database.get_connection() as conn:
+        conn.execute('UPDATE lessons SET status = ? WHERE id = ?', (status, lesson_id))
+        conn.commit()
+
+
+@pytest.fixture
+def month(test_db):
+    """Март 2025: два индивидуальных занятия, групповое на двоих и занятие в последний день месяца"""
+    tutor_id = test_db.add_tutor(1, "Репетитор", "+70000000000")
+    first = test_db.add_student("Первый", "+71111111111", "", "active", tutor_id)
+    second = test_db.add_student("Второй", "+72222222222", "", "active", tutor_id)
+    test_db.add_student("Ушедший", "+73333333333", "", "inactive", tutor_id)
+    group_id = test_db.add_group("Группа", tutor_id)
+    with test_db.get_connection() as conn:
+        conn.execute('INSERT INTO student_groups (student_id, group_id) VALUES (?, ?), (?, ?)',
+                     (first, group_id, second, group_id))
+        conn.commit()
+
+    paid = test_db.add_lesson(tutor_id, first, datetime(2025, 3, 3, 10, 0), 60, 1000)
+    unpaid = test_db.add_lesson(tutor_id, second, datetime(2025, 3, 4, 10, 0), 60, 1500)
+    test_db.add_group_lesson(tutor_id, group_id, datetime(2025, 3, 5, 18, 0), 90, 500)
+    test_db.add_lesson(tutor_id, first, datetime(2025, 3, 31, 19, 0), 60, 1000)
+    test_db.add_lesson(tutor_id, first, datetime(2025, 4, 1, 10, 0), 60, 1000)
+
+    for lesson_id in (paid, unpaid):
+        set_status(test_db, lesson_id, 'completed')
+    test_db.save_lesson_report(paid, first, lesson_held=True, lesson_paid=True)
+    test_db.save_lesson_report(unpaid, second, lesson_held=True, lesson_paid=False)
+    return tutor_id
+
+
+def test_statistics_for_several_periods(test_db, month):
+    """Тест: итоги по нескольким периодам и счетчики учеников за одно обращение"""
+    stats = test_db.get_tutor_statistics(month, {
+        'march': (date(2025, 3, 1), date(2025, 4, 1)),
+        'april': (date(2025, 4, 1), date(2025, 5, 1)),
+        'empty': (date(2024, 1, 1), date(2024, 2, 1)),
+    })
+
+    march = stats['periods']['march']
+    assert march['total_lessons'] == 5
+    assert march['total_earnings'] == 4500
+    assert march['paid_earnings'] == 1000
+    assert march['completed_lessons'] == 2
+    assert march['planned_lessons'] == 3
+    assert march['individual_lessons'] == 3
+    assert march['group_lessons'] == 2
+    assert march['group_sessions'] == 1
+    assert march['students'] == 2
+    assert stats['periods']['april']['total_lessons'] == 1
+    assert stats['periods']['empty']['total_lessons'] == 0
+    assert stats['total_students'] == 3
+    assert stats['active_students'] == 2
+
+    # Старый API - обертка над новым (конец периода включительно)
+    assert test_db.get_earnings_by_period(month, date(2025, 3, 1), date(2025, 3, 3)) == 1000
+
+
+def test_monthly_report_uses_database_statistics(test_db, month):
+    """Тест: отчет за месяц включает последний день и совпадает с подсчетом по списку занятий"""
+    with pytest.MonkeyPatch.context() as mp:
+        service = ReportService()
+        mp.setattr(service, 'db', test_db)
+        report = service.get_monthly_report_data(month, 3, 2025)
+
+    assert len(report['lessons']) == 5
+    expected = PDFReportGenerator._calculate_statistics(None, report['lessons'])
+    assert {key: report['stats'][key] for key in expected} == expected
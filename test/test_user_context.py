@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from database import Database, UserContextCache
+from user_context import UserContextMiddleware
+
+
+@pytest.fixture
+def test_db(tmp_path):
+    database = Database(str(tmp_path / "context.db"))
+    yield database
+    database.close()
+
+
+def test_user_context_roles(test_db):
+    """Тест: контекст определяет репетитора, ученика и родителя"""
+    tutor_id = test_db.add_tutor(100, "Репетитор", "+70000000000")
+    student_id = test_db.add_student("Ученик", "+71111111111", "+72222222222", "active", tutor_id)
+    test_db.update_student_telegram_id(student_id, 200, "student", "student")
+    test_db.update_student_telegram_id(student_id, 300, "parent", "parent")
+
+    assert test_db.get_user_context(100)['role'] == 'tutor'
+    assert test_db.get_user_context(100)['tutor_id'] == tutor_id
+    assert test_db.get_user_context(200)['student_id'] == student_id
+    assert test_db.get_user_context(300)['role'] == 'parent'
+    assert test_db.get_user_context(300)['parent_student_ids'] == (student_id,)
+    assert test_db.get_user_context(400)['role'] is None
+
+
+def test_user_context_cached_and_invalidated(test_db):
+    """Тест: повторные запросы идут из кэша, запись сбрасывается при регистрации"""
+    assert test_db.get_tutor_id_by_telegram_id(100) is None
+
+    with patch.object(test_db, 'get_connection', side_effect=AssertionError("запрос к БД")):
+        assert test_db.get_tutor_id_by_telegram_id(100) is None
+        assert test_db.is_admin(100) is False
+
+    tutor_id = test_db.add_tutor(100, "Репетитор", "+70000000000")
+    assert test_db.get_tutor_id_by_telegram_id(100) == tutor_id
+
+
+def test_user_context_cache_evicts_least_recent():
+    """Тест: LRU-кэш вытесняет давно не использованные записи"""
+    cache = UserContextCache(max_size=2)
+    cache.set(1, {'telegram_id': 1})
+    cache.set(2, {'telegram_id': 2})
+    cache.get(1)
+    cache.set(3, {'telegram_id': 3})
+
+    assert cache.get(2) is None
+    assert cache.get(1) == {'telegram_id': 1}
+    assert cache.get(3) == {'telegram_id': 3}
+
+
+@pytest.mark.asyncio
+async def test_middleware_puts_context_into_data():
+    """Тест: middleware передает контекст обработчику"""
+    context = {'telegram_id': 1, 'role': 'tutor', 'user_role': 'user', 'tutor_id': 5,
+               'student_id': None, 'parent_student_ids': ()}
+    handler = AsyncMock()
+    data = {'event_from_user': SimpleNamespace(id=1)}
+
+    with patch('user_context.db') as mock_db:
+        mock_db.user_contexts.get.return_value = context
+        await UserContextMiddleware()(handler, object(), data)
+
+    assert data['user_context'] is context
+    handler.assert_awaited_once()
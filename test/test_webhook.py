@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from aiohttp.test_utils import TestClient, TestServer
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+
+from webhook import create_webhook_app
+
+PATH = '/telegram/webhook'
+SECRET = 'test-secret'
+
+# Обновление, записанное с реального webhook (идентификаторы изменены)
+UPDATE = {
+    "update_id": 100500,
+    "message": {
+        "message_id": 42,
+        "date": 1735725600,
+        "chat": {"id": 123456, "type": "private", "first_name": "Test"},
+        "from": {"id": 123456, "is_bot": False, "first_name": "Test", "language_code": "ru"},
+        "text": "/start",
+        "entities": [{"offset": 0, "length": 6, "type": "bot_command"}]
+    }
+}
+
+
+@pytest_asyncio.fixture
+async def webhook_client():
+    received = asyncio.Queue()
+    router = Router()
+
+    @router.message()
+    async def on_message(message: Message):
+        await received.put(message)
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    bot = Bot(token='42:TEST')
+
+    client = TestClient(TestServer(create_webhook_app(dp, bot, PATH, SECRET)))
+    await client.start_server()
+    try:
+        yield client, received
+    finally:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_webhook_dispatches_update(webhook_client):
+    """Тест: обновление из POST-запроса доходит до обработчика"""
+    client, received = webhook_client
+
+    response = await client.post(PATH, json=UPDATE, headers={'X-Telegram-Bot-Api-Secret-Token': SECRET})
+
+    assert response.status == 200
+    message = await asyncio.wait_for(received.get(), timeout=5)
+    assert message.text == '/start'
+    assert message.chat.id == 123456
+
+
+@pytest.mark.asyncio
+async def test_webhook_rejects_wrong_secret(webhook_client):
+    """Тест: запрос без верного секретного токена отклоняется"""
+    client, received = webhook_client
+
+    response = await client.post(PATH, json=UPDATE, headers={'X-Telegram-Bot-Api-Secret-Token': 'wrong'})
+
+    assert response.status == 401
+    await asyncio.sleep(0.1)
+    assert received.empty()
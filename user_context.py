@@ -0,0 +1,32 @@
+"""Контекст пользователя для обработчиков: роль и идентификаторы в БД"""
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from database import db
+
+
+class UserContextMiddleware(BaseMiddleware):
+    """Внешний middleware: один раз на апдейт кладет в data['user_context']
+    словарь из db.get_user_context (role, user_role, tutor_id, student_id,
+    parent_student_ids). Обработчик получает его аргументом user_context.
+
+    Контексты берутся из LRU-кэша Database, поэтому обычно апдейт не делает
+    ни одного запроса к БД.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get('event_from_user')
+        if user is not None:
+            context = db.user_contexts.get(user.id)
+            if context is None:
+                context = await db.a.get_user_context(user.id)
+            data['user_context'] = context
+        return await handler(event, data)
@@ -0,0 +1,38 @@
+"""Прием обновлений Telegram через webhook на встроенном aiohttp-сервере"""
+
+import logging
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+logger = logging.getLogger(__name__)
+
+
+def create_webhook_app(dp: Dispatcher, bot: Bot, path: str, secret_token: str = None) -> web.Application:
+    """Создает aiohttp-приложение с обработчиком webhook по пути path.
+
+    Запросы без заголовка X-Telegram-Bot-Api-Secret-Token, равного
+    secret_token, отклоняются с 401. Обновления обрабатываются в фоне:
+    Telegram сразу получает ответ, а следующий запрос не ждет предыдущий.
+    """
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=secret_token,
+        handle_in_background=True,
+    ).register(app, path=path)
+    # Запуск и остановка диспетчера (startup/shutdown) вместе с приложением
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def start_webhook_server(app: web.Application, host: str, port: int) -> web.AppRunner:
+    """Запускает сервер на host:port (обычно за локальным reverse proxy)"""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=host, port=port)
+    await site.start()
+    logger.info(f"Webhook-сервер слушает {host}:{port}")
+    return runner